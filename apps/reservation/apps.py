@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ReservationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reservation'
+
+    def ready(self):
+        from . import checks, db, signals  # noqa: F401
+        from .services.expiracion import iniciar_barredor
+        iniciar_barredor()
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .services.ocupacion import CACHE_ALIAS
+
+CACHES_POR_PROCESO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(deploy=True)
+def cache_ocupacion_compartida(app_configs, **kwargs):
+    """
+    Las versiones de la caché 'ocupacion' firman sensor/list/ y reservacion/list/:
+    en una caché por proceso un cambio en un worker no invalida los ETag de los demás.
+    """
+    backend = settings.CACHES.get(CACHE_ALIAS, {}).get('BACKEND')
+    if backend in CACHES_POR_PROCESO:
+        return [Warning(
+            f"La caché '{CACHE_ALIAS}' usa {backend}, que no se comparte entre procesos.",
+            hint='Con varios workers configure una caché compartida (FileBasedCache, '
+                 'DatabaseCache, Redis o Memcached); si no, los ETag de sensor/list/ y '
+                 'reservacion/list/ quedan vencidos en los demás workers.',
+            id='reservation.W001',
+        )]
+    return []
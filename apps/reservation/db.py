@@ -0,0 +1,75 @@
+"""
+Perfil de producción para SQLite: PRAGMAs al abrir cada conexión y un router que
+envía a la réplica de lectura las consultas de las vistas marcadas con
+lectura_en_replica. Ambos se activan desde config.settings con DJANGO_DB_PROFILE.
+"""
+import asyncio
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DB_ESCRITURA = 'default'
+DB_REPLICA = 'replica'
+
+_lectura_replica = ContextVar('lectura_replica', default=False)
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if connection.alias == DB_REPLICA:
+        # La réplica comparte el archivo: query_only impide escribir por error en ella
+        pragmas['query_only'] = 'ON'
+    if pragmas:
+        with connection.cursor() as cursor:
+            for nombre, valor in pragmas.items():
+                cursor.execute(f'PRAGMA {nombre} = {valor}')
+
+
+def lectura_en_replica(view_func):
+    """
+    Marca una vista de solo lectura: sus consultas fuera de una transacción van a
+    la réplica si el router está configurado. Funciona con vistas asíncronas.
+    """
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def inner(request, *args, **kwargs):
+            token = _lectura_replica.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _lectura_replica.reset(token)
+    else:
+        @wraps(view_func)
+        def inner(request, *args, **kwargs):
+            token = _lectura_replica.set(True)
+            try:
+                return view_func(request, *args, **kwargs)
+            finally:
+                _lectura_replica.reset(token)
+    return inner
+
+
+class ReplicaRouter:
+    """Escrituras y transacciones en la base principal; lecturas marcadas en la réplica."""
+
+    def db_for_read(self, model, **hints):
+        # Dentro de una transacción se lee de la principal para ver las propias escrituras
+        if _lectura_replica.get() and not connections[DB_ESCRITURA].in_atomic_block:
+            return DB_REPLICA
+        return DB_ESCRITURA
+
+    def db_for_write(self, model, **hints):
+        return DB_ESCRITURA
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DB_ESCRITURA
@@ -0,0 +1,104 @@
+"""
+Registro estructurado sin bloquear a los workers. Los registros se encolan con
+ColaHandler y un QueueListener los formatea en JSON y los escribe en su propio
+hilo. El mensaje se formatea allí también, por eso solo viajan argumentos de
+tipos simples: cualquier otro objeto se sustituye por su repr de objeto, que
+nunca consulta la base (el repr de un QuerySet sí lo haría).
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from logging.handlers import QueueHandler, QueueListener
+
+TIPOS_SEGUROS = (str, int, float, bool, type(None), uuid.UUID, datetime, date, Decimal)
+# Atributos propios de LogRecord; el resto son los extra= del llamador
+ATRIBUTOS_RECORD = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+id_peticion = ContextVar('id_peticion', default=None)
+
+
+def valor_seguro(valor):
+    return valor if isinstance(valor, TIPOS_SEGUROS) else object.__repr__(valor)
+
+
+class IdPeticionFilter(logging.Filter):
+    """Copia al registro el id de la petición en curso; corre en el hilo que registra."""
+
+    def filter(self, record):
+        record.request_id = id_peticion.get()
+        return True
+
+
+class MuestreoFilter(logging.Filter):
+    """Deja pasar solo una fracción de los registros por debajo de WARNING."""
+
+    def __init__(self, tasa=1.0):
+        super().__init__()
+        self.tasa = float(tasa)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.tasa
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        datos = {
+            'ts': datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        for clave, valor in vars(record).items():
+            if clave not in ATRIBUTOS_RECORD:
+                datos[clave] = valor
+        if record.exc_info:
+            datos['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    QueueHandler con su propio QueueListener, configurable desde LOGGING. Escribe
+    en stderr o, con archivo, en un FileHandler; ambos con JsonFormatter.
+    """
+
+    def __init__(self, archivo=None, capacidad=10000):
+        super().__init__(queue.Queue(capacidad))
+        destino = logging.FileHandler(archivo, encoding='utf-8') if archivo else logging.StreamHandler(sys.stderr)
+        destino.setFormatter(JsonFormatter())
+        self.listener = QueueListener(self.queue, destino, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self.detener)
+
+    def detener(self):
+        # Vacía la cola y termina el hilo; se puede llamar más de una vez
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record):
+        # A diferencia de QueueHandler.prepare no formatea aquí: solo asegura los argumentos
+        if record.args:
+            if isinstance(record.args, dict):
+                record.args = {clave: valor_seguro(valor) for clave, valor in record.args.items()}
+            else:
+                record.args = tuple(valor_seguro(valor) for valor in record.args)
+        return record
+
+    def enqueue(self, record):
+        # Con la cola llena se descarta el registro antes que bloquear la petición
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+    def close(self):
+        self.detener()
+        super().close()
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.reservation.models import Reservacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve a la tabla histórica, por lotes, las reservaciones inactivas con más '
+        'de --dias de antigüedad. Cada lote es una transacción independiente.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=30, help='Antigüedad mínima de fecha_reservacion')
+        parser.add_argument('--lote', type=int, default=1000, help='Reservaciones por transacción')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 0 or options['lote'] < 1:
+            raise CommandError('--dias debe ser >= 0 y --lote >= 1')
+
+        antes_de = timezone.now() - timezone.timedelta(days=options['dias'])
+        total = 0
+        while True:
+            movidas = Reservacion.objects.archivar(antes_de, lote=options['lote'])
+            total += movidas
+            if movidas < options['lote']:
+                break
+            # Entre lotes se libera el bloqueo de escritura para las peticiones en curso
+            time.sleep(options['pausa'])
+
+        self.stdout.write(self.style.SUCCESS(f'{total} reservaciones archivadas anteriores a {antes_de:%Y-%m-%d %H:%M:%S}'))
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from apps.reservation.management.utils import base_temporal
+from apps.reservation.models import Reservacion, Sensor
+from apps.security.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara peticiones por segundo y latencia p99 de las vistas de sensores y '
+        'reservaciones bajo WSGI (vistas síncronas en hilos) y ASGI (vistas asíncronas). '
+        'Se ejecuta sobre una base de pruebas temporal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modo', choices=['wsgi', 'asgi', 'ambos'], default='ambos')
+        parser.add_argument('--concurrencia', type=int, default=64)
+        parser.add_argument('--peticiones', type=int, default=2000)
+        parser.add_argument('--sensores', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['modo'] == 'ambos':
+            # Cada modo corre en su propio proceso, como en un despliegue real:
+            # la elección de vistas se hace al cargar las rutas
+            for modo in ('wsgi', 'asgi'):
+                env = dict(os.environ, DJANGO_ASYNC_VIEWS='1' if modo == 'asgi' else '0')
+                argumentos = [
+                    sys.executable, sys.argv[0], 'benchmark_asgi', '--modo', modo,
+                    '--concurrencia', str(options['concurrencia']),
+                    '--peticiones', str(options['peticiones']),
+                    '--sensores', str(options['sensores']),
+                ]
+                resultado = subprocess.run(argumentos, env=env, capture_output=True, text=True)
+                if resultado.returncode != 0:
+                    raise CommandError(resultado.stderr)
+                self.stdout.write(resultado.stdout, ending='')
+            return
+
+        if (options['modo'] == 'asgi') != settings.ASYNC_VIEWS:
+            raise CommandError('DJANGO_ASYNC_VIEWS debe ser 1 para ASGI y 0 para WSGI')
+
+        with base_temporal():
+            rutas = self.sembrar(options['sensores'])
+            if options['modo'] == 'wsgi':
+                latencias, duracion = self.medir_wsgi(rutas, options['peticiones'], options['concurrencia'])
+            else:
+                latencias, duracion = asyncio.run(
+                    self.medir_asgi(rutas, options['peticiones'], options['concurrencia'])
+                )
+
+        latencias.sort()
+        self.stdout.write(json.dumps({
+            'modo': options['modo'],
+            'concurrencia': options['concurrencia'],
+            'peticiones': len(latencias),
+            'peticiones_por_segundo': round(len(latencias) / duracion, 1),
+            'p50_ms': round(statistics.median(latencias) * 1000, 2),
+            'p99_ms': round(latencias[int(len(latencias) * 0.99) - 1] * 1000, 2),
+        }))
+
+    def sembrar(self, cantidad):
+        usuario = User.objects.create(username='benchmark', email='benchmark@example.com')
+        sensores = Sensor.objects.bulk_create([
+            Sensor(nombre=f'B{i}', ubicacion=f'Zona {i % 10}') for i in range(cantidad)
+        ])
+        ahora = timezone.now()
+        reservaciones = Reservacion.objects.bulk_create([
+            Reservacion(
+                usuario=usuario, sensor_activado=sensor, placa=f'BEN-{i}',
+                fecha_reservacion=ahora - timezone.timedelta(seconds=i)
+            )
+            for i, sensor in enumerate(sensores[:cantidad // 2])
+        ])
+        rutas = ['/api/sensor/list/']
+        rutas += [f'/api/sensor/list/{sensor.id}/' for sensor in sensores[:20]]
+        rutas += [f'/api/reservacion/list/{reservacion.id}/' for reservacion in reservaciones[:20]]
+        return rutas
+
+    def medir_wsgi(self, rutas, peticiones, concurrencia):
+        def peticion(indice):
+            inicio = time.perf_counter()
+            respuesta = Client().get(rutas[indice % len(rutas)])
+            if respuesta.status_code != 200:
+                raise CommandError(respuesta.content)
+            return time.perf_counter() - inicio
+
+        def cerrar_conexion(_):
+            connection.close()
+
+        with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+            inicio = time.perf_counter()
+            latencias = list(hilos.map(peticion, range(peticiones)))
+            duracion = time.perf_counter() - inicio
+            list(hilos.map(cerrar_conexion, range(concurrencia)))
+        return latencias, duracion
+
+    async def medir_asgi(self, rutas, peticiones, concurrencia):
+        limite = asyncio.Semaphore(concurrencia)
+        cliente = AsyncClient()
+
+        async def peticion(indice):
+            async with limite:
+                inicio = time.perf_counter()
+                respuesta = await cliente.get(rutas[indice % len(rutas)])
+                if respuesta.status_code != 200:
+                    raise CommandError(respuesta.content)
+                return time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        latencias = await asyncio.gather(*(peticion(i) for i in range(peticiones)))
+        return list(latencias), time.perf_counter() - inicio
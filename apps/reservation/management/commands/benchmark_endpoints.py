@@ -0,0 +1,69 @@
+import json
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+
+from apps.reservation.management.endpoints import datos_de_referencia, medir_endpoints
+from apps.reservation.management.semilla import sembrar_datos
+from apps.reservation.management.utils import base_temporal
+from apps.reservation.models import Reservacion, ResumenOcupacion, Sensor
+from apps.security.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cada endpoint de apps.reservation.urls con varios tamaños de datos sembrados '
+        'y comprueba su presupuesto de consultas. Escribe un informe JSON y termina con '
+        'error si algún endpoint lo supera.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='1000,10000,100000', help='Reservaciones históricas por ronda, separadas por comas')
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--salida', help='Archivo donde guardar el informe; por defecto la salida estándar')
+
+    def handle(self, *args, **options):
+        try:
+            tamanos = [int(tamano) for tamano in options['tamanos'].split(',')]
+        except ValueError:
+            raise CommandError('--tamanos debe ser una lista de enteros separados por comas')
+
+        informe = {'repeticiones': options['repeticiones'], 'rondas': []}
+        with base_temporal():
+            for tamano in tamanos:
+                informe['rondas'].append(self.ronda(tamano, options['repeticiones']))
+
+        excedidos = [
+            f"{ronda['reservaciones']}:{nombre}"
+            for ronda in informe['rondas']
+            for nombre, resultado in ronda['endpoints'].items()
+            if not resultado['dentro_del_presupuesto']
+        ]
+        informe['excedidos'] = excedidos
+
+        salida = json.dumps(informe, indent=2)
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                archivo.write(salida)
+        else:
+            self.stdout.write(salida)
+        if excedidos:
+            raise CommandError(f"Presupuesto de consultas excedido: {', '.join(excedidos)}")
+
+    def ronda(self, tamano, repeticiones):
+        self.limpiar()
+        datos = datos_de_referencia(sembrar_datos(reservaciones=tamano))
+        try:
+            endpoints = medir_endpoints(Client(), datos, repeticiones)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        return {'reservaciones': tamano, 'endpoints': endpoints}
+
+    def limpiar(self):
+        Reservacion.objects.all().delete()
+        Sensor.objects.all().delete()
+        ResumenOcupacion.objects.all().delete()
+        User.objects.all().delete()
+        caches['default'].clear()
+        caches['ocupacion'].clear()
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, OperationalError, connection
+from django.utils import timezone
+
+from apps.reservation.management.utils import base_temporal
+from apps.reservation.models import Reservacion, Sensor
+from apps.reservation.services.reservacion import (
+    PlacaReservada, ReservacionConflicto, SensorReservado, reclamar_reservacion
+)
+from apps.reservation.views.reservacion import (
+    get_sensor_or_fail, get_user_or_fail, placa_is_reserved, sensor_is_reserved
+)
+from apps.security.models import User
+
+
+def reclamar_reservacion_previa(username, sensor_id, placa):
+    # Cadena de consultas previa de crear_reservacion, en autocommit
+    user = get_user_or_fail(username)
+    sensor = get_sensor_or_fail(sensor_id)
+    if sensor_is_reserved(sensor):
+        raise SensorReservado(sensor_id)
+    if placa_is_reserved(placa):
+        raise PlacaReservada(placa)
+    reservacion = Reservacion.objects.create(
+        usuario=user,
+        fecha_reservacion=timezone.now(),
+        sensor_activado=sensor,
+        placa=placa,
+        active=True
+    )
+    sensor.estado = True
+    sensor.save(update_fields=['estado'])
+    return reservacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara reclamos de reservación por segundo con --hilos concurrentes sobre '
+        'sensores libres distintos: la cadena de consultas previa frente a '
+        'reclamar_reservacion() transaccional.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--intentos', type=int, default=40, help='Reclamos por hilo')
+        parser.add_argument('--reintentos', type=int, default=200, help='Reintentos ante "database is locked"')
+
+    def handle(self, *args, **options):
+        if options['hilos'] < 1 or options['intentos'] < 1:
+            raise CommandError('--hilos e --intentos deben ser >= 1')
+
+        with base_temporal():
+            User.objects.create(username='benchmark', email='benchmark@example.com')
+            sensores = Sensor.objects.bulk_create([
+                Sensor(nombre=f'B{i}', ubicacion='Centro') for i in range(options['hilos'] * options['intentos'])
+            ])
+            sensores = [sensor.id for sensor in sensores]
+
+            resultados = {}
+            for nombre, reclamar in (('cadena_previa', reclamar_reservacion_previa), ('transaccional', reclamar_reservacion)):
+                Reservacion.objects.all().delete()
+                Sensor.objects.update(estado=False)
+                exitos, errores, duracion = self.medir(reclamar, sensores, options)
+                resultados[nombre] = {
+                    'exitos': exitos,
+                    'errores': errores,
+                    'segundos': round(duracion, 3),
+                    'reclamos_por_s': round(exitos / duracion, 1),
+                }
+
+        self.stdout.write(json.dumps({'hilos': options['hilos'], 'intentos': options['intentos'], **resultados}))
+
+    def medir(self, reclamar, sensores, options):
+        intentos = options['intentos']
+        barrera = threading.Barrier(options['hilos'])
+        lock = threading.Lock()
+        totales = {'exitos': 0, 'errores': 0}
+
+        def trabajador(indice):
+            propios = {'exitos': 0, 'errores': 0}
+            barrera.wait()
+            try:
+                for intento, sensor_id in enumerate(sensores[indice * intentos:(indice + 1) * intentos]):
+                    for _ in range(options['reintentos']):
+                        try:
+                            reclamar('benchmark', sensor_id, f'P-{indice}-{intento}')
+                            propios['exitos'] += 1
+                        except (ReservacionConflicto, IntegrityError):
+                            pass
+                        except OperationalError as e:
+                            if 'locked' not in str(e):
+                                raise
+                            time.sleep(0.001)
+                            continue
+                        break
+                    else:
+                        propios['errores'] += 1
+            finally:
+                connection.close()
+                with lock:
+                    for clave, valor in propios.items():
+                        totales[clave] += valor
+
+        hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(options['hilos'])]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return totales['exitos'], totales['errores'], time.perf_counter() - inicio
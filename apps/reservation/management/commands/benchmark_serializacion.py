@@ -0,0 +1,91 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from apps.reservation.management.utils import base_temporal
+from apps.reservation.models import Reservacion, Sensor
+from apps.reservation.serializers import RESERVACION_LISTADO, a_json
+from apps.security.models import User
+
+
+def serializar_instancias(queryset):
+    # Forma previa de all_reservations: instancias completas y strftime por campo
+    reservations_list = []
+    for reservation in queryset.select_related('usuario', 'sensor_activado'):
+        sensor_activado = {
+                'id': reservation.sensor_activado.id,
+                'nombre': reservation.sensor_activado.nombre,
+                'ubicacion': reservation.sensor_activado.ubicacion,
+                'estado': reservation.sensor_activado.estado,
+                'active': reservation.sensor_activado.active,
+                'createdAt': reservation.sensor_activado.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'updatedAt': reservation.sensor_activado.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
+            } if reservation.sensor_activado else None
+        reservations_list.append({
+            'idReservacion': reservation.id,
+            "usuario": reservation.usuario.username,
+            "fecha_reservacion": reservation.fecha_reservacion.strftime('%Y-%m-%d %H:%M:%S'),
+            "sensor_activado": sensor_activado,
+            'placa': reservation.placa,
+            'activo': reservation.active
+        })
+    return JsonResponse(reservations_list, safe=False)
+
+
+def serializar_proyeccion(queryset):
+    return HttpResponse(
+        a_json(RESERVACION_LISTADO.filas(RESERVACION_LISTADO.valores(queryset))),
+        content_type='application/json'
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el tiempo de serialización del listado de reservaciones por cada 10k filas: '
+        'instancias + strftime frente a la proyección de apps.reservation.serializers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=10000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            self.sembrar(options['filas'])
+            queryset = Reservacion.objects.order_by('fecha_reservacion', 'id')
+            resultados = {
+                nombre: self.medir(funcion, queryset, options['repeticiones'])
+                for nombre, funcion in (('instancias', serializar_instancias), ('proyeccion', serializar_proyeccion))
+            }
+
+        por_10k = 10000 / options['filas']
+        self.stdout.write(json.dumps({
+            'filas': options['filas'],
+            'ms_por_10k_filas': {nombre: round(segundos * 1000 * por_10k, 1) for nombre, segundos in resultados.items()},
+            'aceleracion': round(resultados['instancias'] / resultados['proyeccion'], 2),
+        }))
+
+    def medir(self, funcion, queryset, repeticiones):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion(queryset.all())
+            tiempos.append(time.perf_counter() - inicio)
+        return min(tiempos)
+
+    def sembrar(self, filas):
+        usuario = User.objects.create(username='benchmark', email='benchmark@example.com')
+        sensores = Sensor.objects.bulk_create([
+            Sensor(nombre=f'B{i}', ubicacion=f'Zona {i % 10}') for i in range(200)
+        ])
+        ahora = timezone.now()
+        Reservacion.objects.bulk_create([
+            Reservacion(
+                usuario=usuario, sensor_activado=sensores[i % len(sensores)], placa=f'BEN-{i}',
+                fecha_reservacion=ahora - timezone.timedelta(seconds=i), active=False
+            )
+            for i in range(filas)
+        ], batch_size=1000)
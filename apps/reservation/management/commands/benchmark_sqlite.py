@@ -0,0 +1,117 @@
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from apps.reservation.management.semilla import sembrar_datos
+from apps.reservation.management.utils import base_temporal
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara operaciones por segundo y errores "database is locked" con escritores '
+        '(sensor/update/) y lectores (listados y detalles) concurrentes, con el perfil '
+        'SQLite por defecto y con el de producción (DJANGO_DB_PROFILE=produccion).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--perfil', choices=['base', 'produccion', 'ambos'], default='ambos')
+        parser.add_argument('--hilos', type=int, default=16)
+        parser.add_argument('--duracion', type=float, default=10.0, help='Segundos de carga por perfil')
+        parser.add_argument('--escrituras', type=float, default=0.3, help='Fracción de peticiones que escriben')
+
+    def handle(self, *args, **options):
+        if options['perfil'] == 'ambos':
+            # La configuración de la base se decide al cargar settings: un proceso por perfil
+            for perfil in ('base', 'produccion'):
+                env = dict(os.environ, DJANGO_DB_PROFILE=perfil)
+                argumentos = [
+                    sys.executable, sys.argv[0], 'benchmark_sqlite', '--perfil', perfil,
+                    '--hilos', str(options['hilos']),
+                    '--duracion', str(options['duracion']),
+                    '--escrituras', str(options['escrituras']),
+                ]
+                resultado = subprocess.run(argumentos, env=env, capture_output=True, text=True)
+                if resultado.returncode != 0:
+                    raise CommandError(resultado.stderr)
+                self.stdout.write(resultado.stdout, ending='')
+            return
+
+        produccion = 'replica' in settings.DATABASES
+        if (options['perfil'] == 'produccion') != produccion:
+            raise CommandError('DJANGO_DB_PROFILE debe ser "produccion" solo para --perfil produccion')
+
+        with base_temporal():
+            semilla = sembrar_datos(usuarios=10, sensores=200, reservaciones=5000, activas=20)
+            resultado = self.medir(semilla, options['hilos'], options['duracion'], options['escrituras'])
+
+        self.stdout.write(json.dumps({'perfil': options['perfil'], 'hilos': options['hilos'], **resultado}))
+
+    def medir(self, semilla, hilos, duracion, escrituras):
+        sensores = semilla['sensores']
+        lecturas = ['/api/sensor/list/', '/api/sensor/summary/', '/api/reservacion/list/?limit=50']
+        lecturas += [f'/api/sensor/list/{sensor.id}/' for sensor in sensores[:20]]
+        lecturas += [f'/api/reservacion/list/{reservacion.id}/' for reservacion in semilla['reservaciones'][-20:]]
+        fin = time.perf_counter() + duracion
+        lock = threading.Lock()
+        totales = {'lecturas': 0, 'escrituras': 0, 'errores': 0, 'bloqueos': 0}
+        latencias = []
+
+        def trabajador(indice):
+            aleatorio = random.Random(indice)
+            client = Client()
+            propias = {'lecturas': 0, 'escrituras': 0, 'errores': 0, 'bloqueos': 0}
+            tiempos = []
+            while time.perf_counter() < fin:
+                inicio = time.perf_counter()
+                try:
+                    if aleatorio.random() < escrituras:
+                        tipo = 'escrituras'
+                        respuesta = client.post(
+                            '/api/sensor/update/',
+                            json.dumps({'nombre_sensor': aleatorio.choice(sensores).nombre}),
+                            content_type='application/json'
+                        )
+                    else:
+                        tipo = 'lecturas'
+                        respuesta = client.get(aleatorio.choice(lecturas))
+                    # Cualquier respuesta que no sea 2xx ni 304 es un error; el cuerpo
+                    # dice si fue un bloqueo de SQLite
+                    if not (200 <= respuesta.status_code < 300 or respuesta.status_code == 304):
+                        raise RuntimeError(respuesta.content.decode(errors='replace'))
+                    propias[tipo] += 1
+                    tiempos.append(time.perf_counter() - inicio)
+                except Exception as e:
+                    propias['errores'] += 1
+                    if 'locked' in str(e):
+                        propias['bloqueos'] += 1
+            for alias in connections:
+                connections[alias].close()
+            with lock:
+                for clave, valor in propias.items():
+                    totales[clave] += valor
+                latencias.extend(tiempos)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            list(ejecutor.map(trabajador, range(hilos)))
+        transcurrido = time.perf_counter() - inicio
+
+        latencias.sort()
+        completadas = totales['lecturas'] + totales['escrituras']
+        return {
+            **totales,
+            'operaciones_por_segundo': round(completadas / transcurrido, 1),
+            'p50_ms': round(statistics.median(latencias) * 1000, 2) if latencias else None,
+            'p99_ms': round(latencias[int(len(latencias) * 0.99) - 1] * 1000, 2) if latencias else None,
+        }
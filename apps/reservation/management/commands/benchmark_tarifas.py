@@ -0,0 +1,81 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.utils import timezone
+
+from apps.reservation.management.utils import base_temporal
+from apps.reservation.models import Reservacion, Sensor
+from apps.reservation.services.tarifas import COLUMNAS, precio_reservacion, tarifar, tarifar_columnas
+from apps.security.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la tarifación de --filas reservaciones cerradas: instancias con '
+        'precio_reservacion (sobre --muestra filas, extrapolado) frente a tarifar() '
+        'por columnas, separando lectura y cálculo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000000)
+        parser.add_argument('--muestra', type=int, default=100000, help='Filas para la variante por instancias')
+        parser.add_argument('--lote', type=int, default=10000, help='Filas por lote de tarifar()')
+
+    def handle(self, *args, **options):
+        if options['filas'] < 1 or options['muestra'] < 1:
+            raise CommandError('--filas y --muestra deben ser >= 1')
+
+        with base_temporal():
+            inicio = time.perf_counter()
+            self.sembrar(options['filas'])
+            siembra = time.perf_counter() - inicio
+            queryset = Reservacion.objects.order_by('fecha_reservacion')
+            ahora = timezone.now()
+
+            muestra = min(options['muestra'], options['filas'])
+            inicio = time.perf_counter()
+            for reservacion in queryset.select_related('sensor_activado')[:muestra]:
+                precio_reservacion(reservacion, ahora)
+            instancias = (time.perf_counter() - inicio) * options['filas'] / muestra
+
+            inicio = time.perf_counter()
+            total = sum(centavos for _, centavos in tarifar(queryset, ahora, lote=options['lote']))
+            columnas = time.perf_counter() - inicio
+
+            # Solo el cálculo, con las columnas ya en memoria
+            fechas, fines, activos, ubicaciones = zip(*queryset.values_list(*COLUMNAS))
+            inicio = time.perf_counter()
+            tarifar_columnas(fechas, fines, activos, ubicaciones, ahora)
+            calculo = time.perf_counter() - inicio
+
+        self.stdout.write(json.dumps({
+            'filas': options['filas'],
+            'siembra_s': round(siembra, 2),
+            'instancias_s': round(instancias, 2),
+            'columnas_s': round(columnas, 2),
+            'solo_calculo_s': round(calculo, 2),
+            'reservaciones_por_s': round(options['filas'] / columnas),
+            'aceleracion': round(instancias / columnas, 2),
+            'total_centavos': total,
+        }))
+
+    def sembrar(self, filas):
+        usuario = User.objects.create(username='benchmark', email='benchmark@example.com')
+        sensores = Sensor.objects.bulk_create([
+            Sensor(nombre=f'B{i}', ubicacion=f'Zona {i % 10}') for i in range(200)
+        ])
+        # Una reservación cada 7 minutos hacia atrás: fecha_reservacion es única
+        ahora = timezone.now()
+        for inicio in range(0, filas, 50000):
+            Reservacion.objects.bulk_create([
+                Reservacion(
+                    usuario=usuario, sensor_activado=sensores[i % len(sensores)], placa=f'BEN-{i}',
+                    fecha_reservacion=ahora - timezone.timedelta(minutes=7 * i), active=False
+                )
+                for i in range(inicio, min(inicio + 50000, filas))
+            ], batch_size=5000)
+        # bulk_create fija updated_at al momento actual (auto_now): 95 minutos por
+        # reservación, que con inicios cada 7 minutos recorren todas las bandas
+        Reservacion.objects.update(updated_at=models.F('fecha_reservacion') + timezone.timedelta(minutes=95))
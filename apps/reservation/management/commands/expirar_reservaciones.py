@@ -0,0 +1,40 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.reservation.services.expiracion import barrer, opciones
+
+
+class Command(BaseCommand):
+    help = (
+        'Desactiva las reservaciones activas con más de --ttl minutos y libera sus '
+        'sensores, por lotes, y purga las claves de idempotencia vencidas. Con '
+        '--intervalo se queda en ejecución y repite el barrido.'
+    )
+
+    def add_arguments(self, parser):
+        valores = opciones()
+        parser.add_argument('--ttl', type=int, default=valores['ttl'], help='Minutos desde fecha_reservacion')
+        parser.add_argument('--lote', type=int, default=valores['lote'], help='Reservaciones por transacción')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes')
+        parser.add_argument('--intervalo', type=float, default=0.0, help='Segundos entre barridos; 0 ejecuta uno solo')
+
+    def handle(self, *args, **options):
+        if options['ttl'] < 0 or options['lote'] < 1 or options['intervalo'] < 0:
+            raise CommandError('--ttl y --intervalo deben ser >= 0 y --lote >= 1')
+
+        while True:
+            resultado = barrer(ttl=options['ttl'], lote=options['lote'], pausa=options['pausa'])
+            self.stdout.write(json.dumps({
+                'reservaciones': resultado['reservaciones'],
+                'sensores': resultado['sensores'],
+                'claves': resultado['claves'],
+                'segundos': round(resultado['segundos'], 4),
+            }))
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
+            # En ejecución continua se descartan las conexiones caídas o vencidas
+            close_old_connections()
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.reservation.services.exportacion import FORMATOS, exportar, reservaciones_en_rango
+from apps.reservation.views.reservacion import parse_fecha_parametro
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta las reservaciones con fecha_reservacion en [--desde, --hasta) en CSV '
+        'o NDJSON, leyendo por bloques. Sin --salida escribe en la salida estándar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Fecha ISO 8601 inicial (incluida)')
+        parser.add_argument('--hasta', help='Fecha ISO 8601 final (excluida); por defecto ahora')
+        parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Comprime la salida en gzip')
+        parser.add_argument('--historial', action='store_true', help='Incluye las reservaciones archivadas')
+        parser.add_argument('--salida', help='Archivo de destino')
+
+    def handle(self, *args, **options):
+        try:
+            desde = parse_fecha_parametro(options['desde'])
+            hasta = parse_fecha_parametro(options['hasta']) if options['hasta'] else timezone.now()
+        except ValueError as e:
+            raise CommandError(str(e))
+        if desde >= hasta:
+            raise CommandError('--desde debe ser anterior a --hasta')
+
+        bloques = exportar(
+            reservaciones_en_rango(desde, hasta, options['historial']), options['formato'], options['gzip']
+        )
+        if options['salida']:
+            with open(options['salida'], 'wb') as archivo:
+                for bloque in bloques:
+                    archivo.write(bloque)
+        else:
+            destino = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+            for bloque in bloques:
+                destino.write(bloque)
+            destino.flush()
@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reservation.models import ResumenOcupacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula el resumen de ocupación por ubicación desde la tabla de sensores. '
+        'Con --verificar solo informa las diferencias y termina con error si las hay.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help='Compara sin modificar el resumen')
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            diferencias = ResumenOcupacion.objects.diferencias()
+            for ubicacion, (guardado, real) in sorted(diferencias.items()):
+                self.stdout.write(json.dumps({'ubicacion': ubicacion, 'guardado': guardado, 'real': real}, ensure_ascii=False))
+            if diferencias:
+                raise CommandError(f'{len(diferencias)} ubicaciones con conteos desfasados')
+            self.stdout.write(self.style.SUCCESS('Resumen de ocupación al día'))
+            return
+
+        reales = ResumenOcupacion.objects.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'Resumen de ocupación reconstruido para {len(reales)} ubicaciones'))
@@ -0,0 +1,34 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.reservation.management.semilla import sembrar_datos
+
+
+class Command(BaseCommand):
+    help = (
+        'Siembra la base configurada con usuarios, sensores repartidos en ubicaciones '
+        'y reservaciones históricas usando bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--sensores', type=int, default=200)
+        parser.add_argument('--ubicaciones', type=int, default=10)
+        parser.add_argument('--reservaciones', type=int, default=10000, help='Reservaciones inactivas')
+        parser.add_argument('--activas', type=int, default=50, help='Reservaciones vigentes, una por sensor')
+        parser.add_argument('--semilla', type=int, default=0, help='Semilla del generador aleatorio')
+
+    def handle(self, *args, **options):
+        try:
+            datos = sembrar_datos(
+                usuarios=options['usuarios'],
+                sensores=options['sensores'],
+                ubicaciones=options['ubicaciones'],
+                reservaciones=options['reservaciones'],
+                activas=options['activas'],
+                semilla=options['semilla'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(json.dumps({nombre: len(objetos) for nombre, objetos in datos.items()}))
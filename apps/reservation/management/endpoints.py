@@ -0,0 +1,98 @@
+"""
+Catálogo de endpoints para el benchmark y las pruebas de presupuesto de consultas.
+Cada entrada es (nombre, presupuesto, peticion); peticion(client, datos) hace la
+llamada sobre los datos de sembrar_datos y devuelve la respuesta.
+
+El presupuesto es el máximo de consultas por petición y no depende del tamaño
+de los datos: un endpoint que lo supera al crecer la base tiene un N+1. Fuera de
+una transacción de pruebas BEGIN y COMMIT también cuentan como consultas.
+"""
+import json
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+
+def post_json(client, nombre, datos):
+    return client.post(reverse(nombre), json.dumps(datos), content_type='application/json')
+
+
+def consumir(respuesta):
+    # Las respuestas en streaming ejecutan sus consultas al recorrerse
+    if respuesta.streaming:
+        b''.join(respuesta.streaming_content)
+    return respuesta
+
+
+def reservar_y_liberar(client, datos):
+    sensor = datos['libre']
+    post_json(client, 'crear_reservacion', {
+        'username': datos['usuario'].username, 'sensorId': str(sensor.id), 'placa': 'BENCH-1'
+    })
+    return post_json(client, 'actualizar_reservacion', {'sensorName': sensor.nombre})
+
+
+ENDPOINTS = [
+    ('sensor_list', 1, lambda client, datos: client.get(reverse('detailSensor'))),
+    ('sensor_detail', 2, lambda client, datos: client.get(reverse('detailOneSensor', args=[datos['sensor'].id]))),
+    ('sensor_summary', 1, lambda client, datos: client.get(reverse('sensorSummary'))),
+    ('sensor_update', 5, lambda client, datos: post_json(client, 'updateSensor', {'nombre_sensor': datos['alternar'].nombre})),
+    ('sensor_update_batch', 4, lambda client, datos: post_json(client, 'updateSensorBatch', [
+        {'sensor': sensor.nombre, 'estado': sensor.estado, 'timestamp': timezone.now().isoformat()}
+        for sensor in datos['lote']
+    ])),
+    ('reservacion_list_page', 2, lambda client, datos: client.get(reverse('all_reservations'), {'limit': 100})),
+    ('reservacion_list_stream', 2, lambda client, datos: consumir(client.get(reverse('all_reservations')))),
+    ('reservacion_detail', 2, lambda client, datos: client.get(reverse('getIdReservation', args=[datos['reservacion'].id]))),
+    ('reservacion_get_by_one', 1, lambda client, datos: post_json(client, 'get_one_by_id', {'reservacionId': str(datos['reservacion'].id)})),
+    ('reservacion_analitica', 2, lambda client, datos: client.get(reverse('analitica_ocupacion'))),
+    ('reservacion_save_update', 15, reservar_y_liberar),
+]
+
+
+def datos_de_referencia(semilla):
+    """Elige de lo sembrado los objetos sobre los que se hacen las peticiones."""
+    sensores = semilla['sensores']
+    libres = [sensor for sensor in sensores if not sensor.estado]
+    return {
+        'usuario': semilla['usuarios'][0],
+        'sensor': sensores[0],
+        'libre': libres[-1],
+        'alternar': libres[-2],
+        'lote': sensores[:20],
+        'reservacion': semilla['reservaciones'][-1],
+    }
+
+
+def medir_endpoints(client, datos, repeticiones):
+    """
+    Ejecuta cada endpoint repeticiones veces y devuelve {nombre: resultado} con
+    tiempos, el máximo de consultas y si se respetó el presupuesto. Debe correr
+    fuera de una transacción (TransactionTestCase o una base temporal) para que
+    BEGIN y COMMIT se cuenten como en producción.
+    """
+    endpoints = {}
+    for nombre, presupuesto, peticion in ENDPOINTS:
+        tiempos = []
+        consultas = 0
+        for _ in range(repeticiones):
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = peticion(client, datos)
+                tiempos.append(time.perf_counter() - inicio)
+            consultas = max(consultas, len(capturadas))
+            if respuesta.status_code >= 400:
+                raise RuntimeError(f'{nombre} respondió {respuesta.status_code}')
+        tiempos.sort()
+        endpoints[nombre] = {
+            'ms_p50': round(statistics.median(tiempos) * 1000, 2),
+            'ms_max': round(tiempos[-1] * 1000, 2),
+            'consultas': consultas,
+            'presupuesto': presupuesto,
+            'dentro_del_presupuesto': consultas <= presupuesto,
+        }
+    return endpoints
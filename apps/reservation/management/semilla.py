@@ -0,0 +1,75 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.db import models, transaction
+from django.utils import timezone
+
+from apps.reservation.models import Reservacion, ResumenOcupacion, Sensor
+from apps.reservation.services.ocupacion import avanzar_version_reservaciones_al_confirmar
+from apps.security.models import User
+
+LOTE = 1000
+DURACION_CERRADAS = timezone.timedelta(minutes=95)
+
+
+def sembrar_datos(usuarios=100, sensores=200, ubicaciones=10, reservaciones=10000, activas=50, semilla=0):
+    """
+    Crea con bulk_create usuarios, sensores repartidos entre ubicaciones y
+    reservaciones inactivas de DURACION_CERRADAS a lo largo de los últimos 30
+    días, más `activas` reservaciones vigentes sobre sensores distintos. Devuelve
+    los objetos que las pruebas y los benchmarks usan como referencia.
+    """
+    if activas > sensores:
+        raise ValueError('No puede haber más reservaciones activas que sensores')
+    aleatorio = random.Random(semilla)
+    ahora = timezone.now()
+    # Un único hash para todos: make_password por usuario dominaría el tiempo de siembra
+    password = make_password(None)
+
+    with transaction.atomic():
+        lista_usuarios = User.objects.bulk_create([
+            User(username=f'usuario{i}', email=f'usuario{i}@example.com', password=password)
+            for i in range(usuarios)
+        ], batch_size=LOTE)
+        lista_sensores = Sensor.objects.bulk_create([
+            Sensor(nombre=f'S{i}', ubicacion=f'Zona {i % ubicaciones}', estado=i < activas)
+            for i in range(sensores)
+        ], batch_size=LOTE)
+
+        segundos = 30 * 24 * 60 * 60
+        # fecha_reservacion es única: cada reservación recibe un instante distinto
+        instantes = aleatorio.sample(range(1, max(segundos, reservaciones + 1)), reservaciones)
+        nuevas = []
+        for i, segundo in enumerate(instantes):
+            inicio = ahora - timezone.timedelta(seconds=segundo)
+            nuevas.append(Reservacion(
+                usuario=lista_usuarios[i % usuarios],
+                sensor_activado=lista_sensores[aleatorio.randrange(sensores)],
+                placa=f'HIS-{i:07d}',
+                fecha_reservacion=inicio,
+                active=False,
+            ))
+        for i in range(activas):
+            nuevas.append(Reservacion(
+                usuario=lista_usuarios[i % usuarios],
+                sensor_activado=lista_sensores[i],
+                placa=f'ACT-{i:05d}',
+                fecha_reservacion=ahora - timezone.timedelta(microseconds=i + 1),
+                active=True,
+            ))
+        lista_reservaciones = Reservacion.objects.bulk_create(nuevas, batch_size=LOTE)
+        # bulk_create fija updated_at al momento actual (auto_now): las cerradas
+        # terminan DURACION_CERRADAS después de empezar
+        Reservacion.objects.filter(active=False, placa__startswith='HIS-').update(
+            updated_at=models.F('fecha_reservacion') + DURACION_CERRADAS
+        )
+
+        # bulk_create no envía señales: el resumen de ocupación se recalcula al final
+        ResumenOcupacion.objects.reconstruir()
+        avanzar_version_reservaciones_al_confirmar()
+
+    return {
+        'usuarios': lista_usuarios,
+        'sensores': lista_sensores,
+        'reservaciones': lista_reservaciones,
+    }
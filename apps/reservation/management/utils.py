@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def base_temporal():
+    """Crea una base de pruebas desechable para los comandos de benchmark."""
+    setup_test_environment()
+    nombre_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    # Las conexiones espejo (la réplica del perfil de producción) apuntan a la misma base
+    espejos = {}
+    for alias in connections:
+        espejo = connections[alias].settings_dict.get('TEST', {}).get('MIRROR')
+        if espejo:
+            espejos[alias] = connections[alias].settings_dict['NAME']
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = connections[espejo].settings_dict['NAME']
+    try:
+        yield
+    finally:
+        for alias, nombre in espejos.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = nombre
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
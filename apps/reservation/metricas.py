@@ -0,0 +1,184 @@
+"""
+Métricas de peticiones por vista en formato de texto de Prometheus.
+
+Cada proceso acumula en memoria contadores e histogramas por nombre de URL.
+Con settings.METRICAS_DIR cada proceso vuelca además su registro a un archivo
+propio de ese directorio y /metrics suma los de todos los procesos.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_TAMANO = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Segundos mínimos entre volcados del registro de un proceso a METRICAS_DIR
+INTERVALO_VOLCADO = 1.0
+
+
+class RegistroMetricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ultimo_volcado = 0.0
+        # Funciones sin argumentos que devuelven {serie: valor} de contadores propios
+        self.fuentes = []
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.peticiones = {}
+            self.latencia = {}
+            self.tamano = {}
+            self.consultas = {}
+            self.tiempo_db = {}
+
+    def agregar_fuente(self, fuente):
+        self.fuentes.append(fuente)
+
+    def registrar(self, vista, metodo, codigo, segundos, consultas, tiempo_db, tamano=None):
+        clave = f'{vista}|{metodo}|{codigo}'
+        with self._lock:
+            self.peticiones[clave] = self.peticiones.get(clave, 0) + 1
+            observar(self.latencia, vista, BUCKETS_LATENCIA, segundos)
+            if tamano is not None:
+                observar(self.tamano, vista, BUCKETS_TAMANO, tamano)
+            self.consultas[vista] = self.consultas.get(vista, 0) + consultas
+            self.tiempo_db[vista] = self.tiempo_db.get(vista, 0.0) + tiempo_db
+
+    def datos(self):
+        contadores = {}
+        for fuente in self.fuentes:
+            contadores.update(fuente())
+        with self._lock:
+            return {
+                'contadores': contadores,
+                'peticiones': dict(self.peticiones),
+                'latencia': {vista: list(valores) for vista, valores in self.latencia.items()},
+                'tamano': {vista: list(valores) for vista, valores in self.tamano.items()},
+                'consultas': dict(self.consultas),
+                'tiempo_db': dict(self.tiempo_db),
+            }
+
+    def volcar(self, forzar=False):
+        directorio = getattr(settings, 'METRICAS_DIR', None)
+        if not directorio:
+            return
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo_volcado < INTERVALO_VOLCADO:
+            return
+        self._ultimo_volcado = ahora
+        os.makedirs(directorio, exist_ok=True)
+        # Escritura atómica: quien lee nunca ve un archivo a medias
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as archivo:
+            json.dump(self.datos(), archivo)
+        os.replace(temporal, os.path.join(directorio, f'metricas-{os.getpid()}.json'))
+
+
+def observar(histogramas, vista, buckets, valor):
+    # [conteo por bucket..., conteo +Inf, suma]; se acumula al exportar
+    valores = histogramas.get(vista)
+    if valores is None:
+        valores = histogramas[vista] = [0] * (len(buckets) + 1) + [0.0]
+    valores[bisect_left(buckets, valor)] += 1
+    valores[-1] += valor
+
+
+def combinar(registros):
+    total = {'contadores': {}, 'peticiones': {}, 'latencia': {}, 'tamano': {}, 'consultas': {}, 'tiempo_db': {}}
+    for datos in registros:
+        for seccion in ('contadores', 'peticiones', 'consultas', 'tiempo_db'):
+            for clave, valor in datos.get(seccion, {}).items():
+                total[seccion][clave] = total[seccion].get(clave, 0) + valor
+        for seccion in ('latencia', 'tamano'):
+            for vista, valores in datos[seccion].items():
+                acumulado = total[seccion].get(vista)
+                total[seccion][vista] = valores if acumulado is None else [a + b for a, b in zip(acumulado, valores)]
+    return total
+
+
+def recolectar():
+    """Datos de este proceso o, con METRICAS_DIR, la suma de todos los procesos."""
+    directorio = getattr(settings, 'METRICAS_DIR', None)
+    if not directorio:
+        return registro.datos()
+    registro.volcar(forzar=True)
+    registros = []
+    for nombre in os.listdir(directorio):
+        if nombre.startswith('metricas-') and nombre.endswith('.json'):
+            try:
+                with open(os.path.join(directorio, nombre)) as archivo:
+                    registros.append(json.load(archivo))
+            except (OSError, ValueError):
+                continue
+    return combinar(registros)
+
+
+def escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def etiquetas(**valores):
+    return '{' + ','.join(f'{nombre}="{escapar(valor)}"' for nombre, valor in valores.items()) + '}'
+
+
+def formato_le(limite):
+    return repr(float(limite))
+
+
+def texto_histograma(lineas, nombre, ayuda, histogramas, buckets):
+    lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} histogram']
+    for vista, valores in sorted(histogramas.items()):
+        acumulado = 0
+        for limite, conteo in zip(buckets, valores):
+            acumulado += conteo
+            lineas.append(f'{nombre}_bucket{etiquetas(view=vista, le=formato_le(limite))} {acumulado}')
+        acumulado += valores[len(buckets)]
+        lineas.append(f'{nombre}_bucket{etiquetas(view=vista, le="+Inf")} {acumulado}')
+        lineas.append(f'{nombre}_sum{etiquetas(view=vista)} {valores[-1]}')
+        lineas.append(f'{nombre}_count{etiquetas(view=vista)} {acumulado}')
+
+
+def exportar(datos):
+    lineas = [
+        '# HELP django_http_requests_total Peticiones atendidas por vista, método y código.',
+        '# TYPE django_http_requests_total counter',
+    ]
+    for clave, total in sorted(datos['peticiones'].items()):
+        vista, metodo, codigo = clave.split('|')
+        lineas.append(f'django_http_requests_total{etiquetas(view=vista, method=metodo, status=codigo)} {total}')
+    texto_histograma(
+        lineas, 'django_http_request_duration_seconds', 'Latencia de las peticiones por vista.',
+        datos['latencia'], BUCKETS_LATENCIA
+    )
+    texto_histograma(
+        lineas, 'django_http_response_size_bytes', 'Tamaño del cuerpo de las respuestas no streaming por vista.',
+        datos['tamano'], BUCKETS_TAMANO
+    )
+    lineas += [
+        '# HELP django_db_queries_total Consultas SQL ejecutadas por vista.',
+        '# TYPE django_db_queries_total counter',
+    ]
+    for vista, total in sorted(datos['consultas'].items()):
+        lineas.append(f'django_db_queries_total{etiquetas(view=vista)} {total}')
+    lineas += [
+        '# HELP django_db_query_duration_seconds_total Tiempo en consultas SQL por vista.',
+        '# TYPE django_db_query_duration_seconds_total counter',
+    ]
+    for vista, total in sorted(datos['tiempo_db'].items()):
+        lineas.append(f'django_db_query_duration_seconds_total{etiquetas(view=vista)} {total}')
+    metrica_anterior = None
+    for serie, total in sorted(datos['contadores'].items()):
+        metrica = serie.split('{', 1)[0]
+        if metrica != metrica_anterior:
+            lineas.append(f'# TYPE {metrica} counter')
+            metrica_anterior = metrica
+        lineas.append(f'{serie} {total}')
+    return '\n'.join(lineas) + '\n'
+
+
+registro = RegistroMetricas()
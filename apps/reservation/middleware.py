@@ -0,0 +1,119 @@
+import time
+import uuid
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from .logs import id_peticion
+from .metricas import registro
+
+
+class ContadorConsultas:
+    """execute_wrapper que cuenta las consultas y el tiempo pasado en la base."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+def instalar_contador(contador):
+    # Las conexiones son por hilo: se instala en el hilo que ejecutará las consultas.
+    # Todas las bases cuentan, también la réplica de lectura_en_replica
+    pila = ExitStack()
+    for alias in connections:
+        pila.enter_context(connections[alias].execute_wrapper(contador))
+    return pila
+
+
+class MetricasMiddleware:
+    """
+    Registra por nombre de URL peticiones, latencia, consultas, tiempo de base y
+    tamaño de respuesta. En respuestas streaming solo cuenta lo ocurrido antes de
+    devolver la respuesta; el cuerpo se genera después. Admite las dos cadenas:
+    bajo ASGI no obliga a Django a adaptar las vistas asíncronas a síncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        contador = ContadorConsultas()
+        inicio = time.perf_counter()
+        with instalar_contador(contador):
+            response = self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio, contador)
+        return response
+
+    async def __acall__(self, request):
+        contador = ContadorConsultas()
+        inicio = time.perf_counter()
+        # El ORM de las vistas asíncronas corre en el hilo de sync_to_async de la
+        # petición (thread_sensitive), que tiene su propia conexión
+        pila = await sync_to_async(instalar_contador)(contador)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(pila.close)()
+        self.registrar(request, response, time.perf_counter() - inicio, contador)
+        return response
+
+    def registrar(self, request, response, duracion, contador):
+        match = request.resolver_match
+        vista = match.view_name if match is not None else 'sin_ruta'
+        tamano = None if response.streaming else len(response.content)
+        registro.registrar(
+            vista, request.method, response.status_code, duracion,
+            contador.consultas, contador.segundos, tamano
+        )
+        registro.volcar()
+
+
+class IdPeticionMiddleware:
+    """Asigna a cada petición un id (X-Request-ID si llega uno) que acompaña a sus registros."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.asignar(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            id_peticion.reset(token)
+        response.headers['X-Request-ID'] = request.id
+        return response
+
+    async def __acall__(self, request):
+        # sync_to_async copia el contexto: el id llega también a las partes síncronas
+        token = self.asignar(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            id_peticion.reset(token)
+        response.headers['X-Request-ID'] = request.id
+        return response
+
+    def asignar(self, request):
+        request.id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        return id_peticion.set(request.id)
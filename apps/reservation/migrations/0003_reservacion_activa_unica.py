@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0002_alter_reservacion_sensor_activado'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='reservacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('sensor_activado',), name='reservacion_sensor_activo_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('active', True)), fields=('placa',), name='reservacion_placa_activa_unica'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0003_reservacion_activa_unica'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservacion',
+            index=models.Index(condition=models.Q(('active', True)), fields=['usuario', '-fecha_reservacion'], name='reservacion_usuario_activa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensor',
+            index=models.Index(condition=models.Q(('estado', True)), fields=['ubicacion'], name='sensor_ocupado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sensor',
+            index=models.Index(condition=models.Q(('estado', False)), fields=['ubicacion'], name='sensor_libre_idx'),
+        ),
+    ]
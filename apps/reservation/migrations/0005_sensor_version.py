@@ -0,0 +1,18 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0004_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sensor',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:48
+
+from django.db import migrations, models
+import uuid
+
+
+def poblar_resumen(apps, schema_editor):
+    Sensor = apps.get_model('reservation', 'Sensor')
+    ResumenOcupacion = apps.get_model('reservation', 'ResumenOcupacion')
+    filas = Sensor.objects.values('ubicacion').annotate(
+        libres=models.Count('id', filter=models.Q(estado=False)),
+        ocupados=models.Count('id', filter=models.Q(estado=True)),
+        inactivos=models.Count('id', filter=models.Q(active=False)),
+    )
+    ResumenOcupacion.objects.bulk_create([ResumenOcupacion(**fila) for fila in filas])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservation', '0005_sensor_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenOcupacion',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('ubicacion', models.CharField(max_length=100, unique=True)),
+                ('libres', models.IntegerField(default=0)),
+                ('ocupados', models.IntegerField(default=0)),
+                ('inactivos', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen de ocupación',
+                'verbose_name_plural': 'Resúmenes de ocupación',
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reservation', '0006_resumen_ocupacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservacionHistorica',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('fecha_reservacion', models.DateTimeField()),
+                ('active', models.BooleanField(default=False)),
+                ('placa', models.CharField(max_length=250)),
+                ('sensor_activado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservaciones_historicas', to='reservation.sensor')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservaciones_historicas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Reservacion histórica',
+                'verbose_name_plural': 'Reservaciones históricas',
+                'indexes': [models.Index(fields=['fecha_reservacion'], name='historica_fecha_idx'), models.Index(fields=['usuario', '-fecha_reservacion'], name='historica_usuario_idx'), models.Index(fields=['placa'], name='historica_placa_idx')],
+            },
+        ),
+    ]
@@ -1,8 +1,15 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Least, TruncDay, TruncHour
+from django.utils import timezone
 
 from apps.security.models import ModelBase, User
 
+class ConflictoDeVersion(Exception):
+    def __init__(self, version_actual):
+        super().__init__(f"La versión del sensor cambió, versión actual {version_actual}")
+        self.version_actual = version_actual
+
 class SensorManager(models.Manager):
     def activos(self):
         try:
@@ -17,20 +24,75 @@ class SensorManager(models.Manager):
             raise ValidationError(f"Error al obtener sensores inactivos: {str(e)}")
     
     def contar_activos(self):
+        # Suma del resumen materializado en lugar de un COUNT sobre Sensor
         try:
-            return self.filter(estado=True).count()
+            return ResumenOcupacion.objects.aggregate(total=models.Sum('ocupados'))['total'] or 0
         except Exception as e:
             raise ValidationError(f"Error al contar sensores activos: {str(e)}")
     
     def contar_inactivos(self):
         try:
-            return self.filter(estado=False).count()
+            return ResumenOcupacion.objects.aggregate(total=models.Sum('libres'))['total'] or 0
         except Exception as e:
             raise ValidationError(f"Error al contar sensores inactivos: {str(e)}")
     
+    def alternar_estado(self, **lookup):
+        """Invierte el estado del sensor con un único UPDATE, sin leerlo antes."""
+        nuevo_estado = models.Case(
+            models.When(estado=True, then=models.Value(False)),
+            default=models.Value(True),
+        )
+        sensor, _ = self._actualizar_estado(self.filter(**lookup), nuevo_estado, lookup)
+        return sensor
+
+    def fijar_estado(self, estado, version=None, **lookup):
+        """
+        Fija el estado del sensor con un único UPDATE, que no escribe si el sensor ya
+        tiene ese estado. Si se indica version, solo se aplica cuando coincide con la
+        actual (compare-and-set).
+        """
+        filtro = dict(lookup, version=version) if version is not None else lookup
+        sensor, actualizado = self._actualizar_estado(
+            self.filter(**filtro).exclude(estado=estado), estado, lookup
+        )
+        if not actualizado and version is not None and sensor.version != version:
+            raise ConflictoDeVersion(sensor.version)
+        return sensor
+
+    def ocupar(self, **lookup):
+        """Pasa el sensor de libre a ocupado; falla con ConflictoDeVersion si ya estaba ocupado."""
+        sensor, actualizado = self._actualizar_estado(self.filter(estado=False, **lookup), True, lookup)
+        if not actualizado:
+            raise ConflictoDeVersion(sensor.version)
+        return sensor
+
+    def _actualizar_estado(self, queryset, estado, lookup):
+        # Sin savepoint propio: dentro de otra transacción, un error la revierte completa
+        with transaction.atomic(savepoint=False):
+            actualizados = queryset.update(
+                estado=estado,
+                version=models.F('version') + 1,
+                updated_at=timezone.now(),
+            )
+            if actualizados > 1:
+                # Revierte la transacción: el UPDATE no debe tocar varios sensores
+                raise self.model.MultipleObjectsReturned(f"Más de un sensor coincide con {lookup}")
+            # Relectura dentro de la misma transacción, equivalente a un RETURNING
+            sensor = self.only('id', 'nombre', 'ubicacion', 'estado', 'active', 'version').get(**lookup)
+
+            if actualizados:
+                ResumenOcupacion.objects.ajustar_sensores([(
+                    (sensor.ubicacion, not sensor.estado, sensor.active),
+                    (sensor.ubicacion, sensor.estado, sensor.active),
+                )])
+                from .signals import notificar_cambios_de_estado
+                notificar_cambios_de_estado([(sensor.id, sensor.ubicacion, sensor.estado, sensor.version)])
+            return sensor, bool(actualizados)
+
     def por_rango_de_fechas(self, fecha_inicio, fecha_fin):
+        # Sensores con alguna reservación en el rango; la fecha está en Reservacion
         try:
-            return self.filter(fecha_reservacion__range=(fecha_inicio, fecha_fin))
+            return self.filter(reservacion__fecha_reservacion__range=(fecha_inicio, fecha_fin)).distinct()
         except Exception as e:
             raise ValidationError(f"Error al filtrar por rango de fechas: {str(e)}")
 
@@ -40,6 +102,8 @@ class Sensor(ModelBase):
     ubicacion = models.CharField(max_length=100)
     estado = models.BooleanField(default=False)
     active = models.BooleanField(default=True)
+    # Aumenta en cada cambio de estado; permite compare-and-set a los clientes
+    version = models.PositiveIntegerField(default=0)
     
     objects = SensorManager()
     
@@ -47,12 +111,19 @@ class Sensor(ModelBase):
         verbose_name = 'Sensor'
         verbose_name_plural = 'Sensores'
         unique_together = ['nombre', 'ubicacion']
+        # Las búsquedas por nombre usan el índice único (nombre, ubicacion).
+        # SQLite no usa un índice común para el filtro booleano "estado", por eso
+        # cada estado tiene su índice parcial
+        indexes = [
+            models.Index(fields=['ubicacion'], condition=models.Q(estado=True), name='sensor_ocupado_idx'),
+            models.Index(fields=['ubicacion'], condition=models.Q(estado=False), name='sensor_libre_idx'),
+        ]
         
     def activate(self):
         try:
             if not self.active:
                 self.active = True
-                self.save(update_fields=['active'])
+                self.save(update_fields=['active', 'updated_at'])
         except Exception as e:
             raise ValidationError(f"No se pudo activar el sensor {self.id}: {str(e)}")
     
@@ -60,14 +131,128 @@ class Sensor(ModelBase):
         try:
             if self.active:
                 self.active = False
-                self.save(update_fields=['active'])
+                self.save(update_fields=['active', 'updated_at'])
         except Exception as e:
             raise ValidationError(f"No se pudo desactivar el sensor {self.id}: {str(e)}")
         
     def __str__(self):
         return self.nombre
 
-class ReservacionManager(models.Manager):
+PERIODOS = {'hora': TruncHour, 'dia': TruncDay}
+
+
+def siguiente_periodo(inicio, periodo):
+    """Inicio del periodo que sigue a inicio (hora local, como TruncHour/TruncDay)."""
+    if periodo == 'dia':
+        siguiente = timezone.datetime.combine(inicio.date() + timezone.timedelta(days=1), timezone.datetime.min.time())
+        return timezone.make_aware(siguiente, inicio.tzinfo)
+    return timezone.localtime(inicio + timezone.timedelta(hours=1), inicio.tzinfo)
+
+
+class AnaliticaReservacionMixin:
+    def ocupacion_por_periodo(self, inicio, fin, periodo='hora', ubicacion=None):
+        """
+        Reservaciones y minutos ocupados por periodo, sensor y ubicación. Cada
+        reservación cuenta en el periodo en que empieza y sus minutos se reparten
+        entre los periodos que abarca; su fin es updated_at si está inactiva o el
+        momento actual si sigue activa, acotado a fin.
+
+        La base agrupa por (periodo de inicio, periodo de fin, sensor) y suma los
+        desfases dentro del primer y del último periodo; con eso el reparto es
+        exacto sin leer las reservaciones una a una.
+        """
+        try:
+            truncar = PERIODOS[periodo]
+        except KeyError:
+            raise ValidationError(f"Periodo {periodo} no válido, use {', '.join(PERIODOS)}")
+
+        limite = min(fin, timezone.now())
+        termino = Least(
+            models.Case(
+                models.When(active=True, then=models.Value(limite)),
+                default=models.F('updated_at'),
+                output_field=models.DateTimeField(),
+            ),
+            models.Value(limite, output_field=models.DateTimeField()),
+        )
+        queryset = self.filter(
+            fecha_reservacion__gte=inicio, fecha_reservacion__lt=fin, sensor_activado__isnull=False
+        )
+        if ubicacion:
+            queryset = queryset.filter(sensor_activado__ubicacion=ubicacion)
+        grupos = queryset.annotate(
+            termino=termino,
+        ).annotate(
+            periodo=truncar('fecha_reservacion'),
+            periodo_fin=truncar('termino'),
+        ).values(
+            'periodo', 'periodo_fin', 'sensor_activado_id', 'sensor_activado__nombre', 'sensor_activado__ubicacion'
+        ).annotate(
+            reservaciones=models.Count('id'),
+            desfase_inicio=models.Sum(models.ExpressionWrapper(
+                models.F('fecha_reservacion') - models.F('periodo'), output_field=models.DurationField()
+            )),
+            desfase_fin=models.Sum(models.ExpressionWrapper(
+                models.F('termino') - models.F('periodo_fin'), output_field=models.DurationField()
+            )),
+        ).order_by('periodo', 'sensor_activado__ubicacion', 'sensor_activado__nombre')
+
+        acumulado = {}
+        # Por sensor, cuántas reservaciones cubren completos los periodos desde cada
+        # clave (diferencias: +n al empezar, -n al terminar); se recorren al final
+        cobertura = {}
+        sensores = {}
+
+        def sumar(periodo_inicio, sensor_id, reservaciones, ocupado):
+            fila = acumulado.setdefault((periodo_inicio, sensor_id), [0, timezone.timedelta(0)])
+            fila[0] += reservaciones
+            fila[1] += ocupado
+
+        for grupo in grupos:
+            sensor_id = grupo['sensor_activado_id']
+            sensores[sensor_id] = (grupo['sensor_activado__nombre'], grupo['sensor_activado__ubicacion'])
+            cantidad = grupo['reservaciones']
+            if grupo['periodo_fin'] <= grupo['periodo']:
+                # Mismo periodo: la duración es la diferencia de los desfases
+                sumar(grupo['periodo'], sensor_id, cantidad, grupo['desfase_fin'] - grupo['desfase_inicio'])
+                continue
+            # Primer periodo: del inicio de cada reservación al final del periodo;
+            # último periodo: de su inicio al fin de cada reservación
+            siguiente = siguiente_periodo(grupo['periodo'], periodo)
+            sumar(grupo['periodo'], sensor_id, cantidad, cantidad * (siguiente - grupo['periodo']) - grupo['desfase_inicio'])
+            if grupo['desfase_fin']:
+                sumar(grupo['periodo_fin'], sensor_id, 0, grupo['desfase_fin'])
+            if siguiente < grupo['periodo_fin']:
+                diferencias = cobertura.setdefault(sensor_id, {})
+                diferencias[siguiente] = diferencias.get(siguiente, 0) + cantidad
+                diferencias[grupo['periodo_fin']] = diferencias.get(grupo['periodo_fin'], 0) - cantidad
+
+        # Periodos intermedios completos
+        for sensor_id, diferencias in cobertura.items():
+            claves = sorted(diferencias)
+            activas = 0
+            for actual, proxima in zip(claves, claves[1:]):
+                activas += diferencias[actual]
+                while activas and actual < proxima:
+                    siguiente = siguiente_periodo(actual, periodo)
+                    sumar(actual, sensor_id, 0, activas * (siguiente - actual))
+                    actual = siguiente
+
+        filas = [
+            {
+                'periodo': periodo_inicio,
+                'sensor_activado_id': sensor_id,
+                'sensor_activado__nombre': sensores[sensor_id][0],
+                'sensor_activado__ubicacion': sensores[sensor_id][1],
+                'reservaciones': reservaciones,
+                'ocupado': ocupado,
+            }
+            for (periodo_inicio, sensor_id), (reservaciones, ocupado) in acumulado.items()
+        ]
+        filas.sort(key=lambda fila: (fila['periodo'], fila['sensor_activado__ubicacion'], fila['sensor_activado__nombre']))
+        return filas
+
+class ReservacionManager(AnaliticaReservacionMixin, models.Manager):
     def activas(self):
         try:
             return self.filter(active=True)
@@ -92,6 +277,80 @@ class ReservacionManager(models.Manager):
         except Exception as e:
             raise ValidationError(f"Error al obtener la reservación más reciente por usuario: {str(e)}")
 
+    def historial(self, *args, **kwargs):
+        """
+        Reservaciones vivas y archivadas (UNION ALL). Los filtros se aplican a cada
+        tabla antes de la unión; sobre el resultado solo caben values_list, order_by
+        y cortes.
+        """
+        try:
+            return self.filter(*args, **kwargs).union(
+                ReservacionHistorica.objects.filter(*args, **kwargs), all=True
+            )
+        except Exception as e:
+            raise ValidationError(f"Error al obtener el historial de reservaciones: {str(e)}")
+
+    def archivar(self, antes_de, lote=1000):
+        """
+        Mueve a ReservacionHistorica un lote de reservaciones inactivas con
+        fecha_reservacion anterior a antes_de. Devuelve cuántas se movieron.
+        """
+        with transaction.atomic():
+            filas = list(
+                self.select_for_update()
+                .filter(active=False, fecha_reservacion__lt=antes_de)
+                .order_by('fecha_reservacion')
+                .values(*ReservacionHistorica.CAMPOS)[:lote]
+            )
+            if not filas:
+                return 0
+            ReservacionHistorica.objects.bulk_create([ReservacionHistorica(**fila) for fila in filas])
+            # Borrado físico: Reservacion.delete() de instancia solo desactiva
+            self.filter(pk__in=[fila['id'] for fila in filas]).delete()
+        return len(filas)
+
+    def expirar(self, antes_de, lote=500):
+        """
+        Libera un lote de reservaciones activas con fecha_reservacion anterior a
+        antes_de: un UPDATE sobre Reservacion y otro sobre Sensor en la misma
+        transacción. Devuelve (reservaciones, sensores) liberados.
+        """
+        with transaction.atomic():
+            candidatas = list(
+                self.select_for_update()
+                .filter(active=True, fecha_reservacion__lt=antes_de)
+                .order_by('fecha_reservacion')
+                .values_list('id', 'sensor_activado_id')[:lote]
+            )
+            if not candidatas:
+                return 0, 0
+            ahora = timezone.now()
+            liberadas = self.filter(pk__in=[pk for pk, _ in candidatas], active=True).update(
+                active=False, updated_at=ahora
+            )
+            from .signals import reservaciones_modificadas
+            reservaciones_modificadas()
+            # Tras el UPDATE la transacción ya escribe: solo se liberan los sensores
+            # que se quedaron sin reservación activa
+            sensores = list(
+                Sensor.objects.filter(pk__in={sensor for _, sensor in candidatas if sensor}, estado=True)
+                .exclude(reservacion__active=True)
+                .values_list('id', 'ubicacion', 'active', 'version')
+            )
+            if sensores:
+                Sensor.objects.filter(pk__in=[sensor[0] for sensor in sensores]).update(
+                    estado=False, version=models.F('version') + 1, updated_at=ahora
+                )
+                ResumenOcupacion.objects.ajustar_sensores([
+                    ((ubicacion, True, active), (ubicacion, False, active))
+                    for _, ubicacion, active, _ in sensores
+                ])
+                from .signals import notificar_cambios_de_estado
+                notificar_cambios_de_estado([
+                    (pk, ubicacion, False, version + 1) for pk, ubicacion, _, version in sensores
+                ])
+        return liberadas, len(sensores)
+
 class Reservacion(ModelBase):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     fecha_reservacion = models.DateTimeField()
@@ -104,12 +363,33 @@ class Reservacion(ModelBase):
         verbose_name = 'Reservacion'
         verbose_name_plural = 'Reservaciones'
         unique_together = ['fecha_reservacion']
+        # Las búsquedas activas por sensor y por placa usan los índices parciales
+        # de las restricciones únicas
+        indexes = [
+            models.Index(
+                fields=['usuario', '-fecha_reservacion'],
+                condition=models.Q(active=True),
+                name='reservacion_usuario_activa_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sensor_activado'],
+                condition=models.Q(active=True),
+                name='reservacion_sensor_activo_unico'
+            ),
+            models.UniqueConstraint(
+                fields=['placa'],
+                condition=models.Q(active=True),
+                name='reservacion_placa_activa_unica'
+            ),
+        ]
     
     def activate(self):
         try:
             if not self.active:
                 self.active = True
-                self.save(update_fields=['active'])
+                self.save(update_fields=['active', 'updated_at'])
         except Exception as e:
             raise ValidationError(f"No se pudo activar la reservación {self.id}: {str(e)}")
             
@@ -117,10 +397,198 @@ class Reservacion(ModelBase):
         try:
             if self.active:
                 self.active = False
-                self.save(update_fields=['active'])
+                self.save(update_fields=['active', 'updated_at'])
         except Exception as e:
             raise ValidationError(f"No se pudo desactivar la reservación {self.id}: {str(e)}")
         
     def __str__(self):
         return f"Reservacion {self.id} - {self.fecha_reservacion}"
 
+class ReservacionHistoricaManager(AnaliticaReservacionMixin, models.Manager):
+    pass
+
+class ReservacionHistorica(models.Model):
+    """
+    Reservaciones inactivas archivadas fuera de la tabla viva, con las mismas
+    columnas. Las fechas no son automáticas para conservar las originales.
+    """
+    CAMPOS = ('id', 'created_at', 'updated_at', 'usuario_id', 'fecha_reservacion', 'sensor_activado_id', 'active', 'placa')
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservaciones_historicas')
+    fecha_reservacion = models.DateTimeField()
+    sensor_activado = models.ForeignKey(
+        Sensor, on_delete=models.CASCADE, null=True, blank=True, related_name='reservaciones_historicas'
+    )
+    active = models.BooleanField(default=False)
+    placa = models.CharField(max_length=250)
+
+    objects = ReservacionHistoricaManager()
+
+    class Meta:
+        verbose_name = 'Reservacion histórica'
+        verbose_name_plural = 'Reservaciones históricas'
+        indexes = [
+            models.Index(fields=['fecha_reservacion'], name='historica_fecha_idx'),
+            models.Index(fields=['usuario', '-fecha_reservacion'], name='historica_usuario_idx'),
+            models.Index(fields=['placa'], name='historica_placa_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reservacion histórica {self.id} - {self.fecha_reservacion}"
+
+class ClaveIdempotenciaManager(models.Manager):
+    # Segundos que una petición en curso retiene su clave: si el proceso muere
+    # sin completarla, pasado este plazo un reintento la vuelve a ejecutar
+    CONCESION = 60
+
+    def reservar(self, endpoint, clave, huella, ttl, concesion=CONCESION):
+        """
+        Registra la clave como en curso. Devuelve (registro, True) si es nueva, había
+        vencido o su concesión en curso expiró, o (registro existente, False) si ya
+        se usó. La lectura va primero: en una tormenta de reintentos cada repetición
+        cuesta un SELECT.
+        """
+        ahora = timezone.now()
+        registro = self.filter(endpoint=endpoint, clave=clave).first()
+        if registro is not None:
+            if registro.expira_at > ahora:
+                return registro, False
+            self.filter(pk=registro.pk, expira_at__lte=ahora).delete()
+        try:
+            with transaction.atomic():
+                return self.create(
+                    endpoint=endpoint, clave=clave, huella=huella,
+                    expira_at=ahora + timezone.timedelta(seconds=min(concesion, ttl))
+                ), True
+        except IntegrityError:
+            # Otra petición con la misma clave la registró primero
+            return self.get(endpoint=endpoint, clave=clave), False
+
+    def completar(self, registro, status, cuerpo, content_type, ttl):
+        # Solo si la clave sigue siendo de esta petición (no la tomó un reintento)
+        self.filter(pk=registro.pk).update(
+            status=status, cuerpo=cuerpo, content_type=content_type,
+            expira_at=timezone.now() + timezone.timedelta(seconds=ttl)
+        )
+
+    def purgar(self):
+        """Borra las claves vencidas y las concesiones en curso expiradas."""
+        return self.filter(expira_at__lte=timezone.now()).delete()[0]
+
+class ClaveIdempotencia(models.Model):
+    """
+    Respuesta guardada de una petición con Idempotency-Key; status nulo mientras
+    está en curso, y entonces expira_at marca el fin de la concesión.
+    """
+    endpoint = models.CharField(max_length=100)
+    clave = models.CharField(max_length=255)
+    # sha256 del cuerpo: la misma clave con otro cuerpo es un error del cliente
+    huella = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True)
+    cuerpo = models.BinaryField(default=b'')
+    content_type = models.CharField(max_length=100, default='application/json')
+    expira_at = models.DateTimeField(db_index=True)
+
+    objects = ClaveIdempotenciaManager()
+
+    class Meta:
+        verbose_name = 'Clave de idempotencia'
+        verbose_name_plural = 'Claves de idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'clave'], name='idempotencia_clave_unica'),
+        ]
+
+def conteos_sensor(estado, active):
+    # ocupados/libres siguen a "estado" igual que contar_activos/contar_inactivos;
+    # inactivos cuenta aparte los sensores desactivados
+    return {'ocupados': int(estado), 'libres': int(not estado), 'inactivos': int(not active)}
+
+class ResumenOcupacionManager(models.Manager):
+    CATEGORIAS = ('libres', 'ocupados', 'inactivos')
+
+    def ajustar(self, deltas):
+        """
+        Aplica deltas {ubicacion: {categoria: cambio}} con un UPDATE por ubicación.
+        Debe llamarse dentro de la transacción que modifica los sensores.
+        """
+        for ubicacion, cambios in deltas.items():
+            cambios = {categoria: cambio for categoria, cambio in cambios.items() if cambio}
+            if not cambios:
+                continue
+            actualizados = self.filter(ubicacion=ubicacion).update(
+                updated_at=timezone.now(),
+                **{categoria: models.F(categoria) + cambio for categoria, cambio in cambios.items()}
+            )
+            if not actualizados:
+                try:
+                    with transaction.atomic():
+                        self.create(ubicacion=ubicacion, **cambios)
+                except IntegrityError:
+                    # Otra transacción creó la fila primero
+                    self.ajustar({ubicacion: cambios})
+
+    def ajustar_sensores(self, cambios):
+        """
+        Traduce cambios de sensores a deltas. Cada cambio es (anterior, nuevo) con
+        tuplas (ubicacion, estado, active); None para un sensor creado o eliminado.
+        """
+        deltas = {}
+        for anterior, nuevo in cambios:
+            for datos, signo in ((anterior, -1), (nuevo, 1)):
+                if datos is None:
+                    continue
+                ubicacion, estado, active = datos
+                fila = deltas.setdefault(ubicacion, dict.fromkeys(self.CATEGORIAS, 0))
+                for categoria, valor in conteos_sensor(estado, active).items():
+                    fila[categoria] += signo * valor
+        self.ajustar(deltas)
+
+    def calcular(self):
+        """Conteos por ubicación calculados directamente sobre Sensor."""
+        filas = Sensor.objects.values('ubicacion').annotate(
+            libres=models.Count('id', filter=models.Q(estado=False)),
+            ocupados=models.Count('id', filter=models.Q(estado=True)),
+            inactivos=models.Count('id', filter=models.Q(active=False)),
+        )
+        return {fila.pop('ubicacion'): fila for fila in filas}
+
+    def diferencias(self):
+        """Ubicaciones cuyo resumen no coincide con los sensores: {ubicacion: (guardado, real)}."""
+        reales = self.calcular()
+        guardados = {
+            fila.pop('ubicacion'): fila
+            for fila in self.values('ubicacion', *self.CATEGORIAS)
+        }
+        vacio = dict.fromkeys(self.CATEGORIAS, 0)
+        return {
+            ubicacion: (guardados.get(ubicacion, vacio), reales.get(ubicacion, vacio))
+            for ubicacion in reales.keys() | guardados.keys()
+            if guardados.get(ubicacion, vacio) != reales.get(ubicacion, vacio)
+        }
+
+    def reconstruir(self):
+        with transaction.atomic():
+            reales = self.calcular()
+            self.exclude(ubicacion__in=reales).delete()
+            for ubicacion, conteos in reales.items():
+                self.update_or_create(ubicacion=ubicacion, defaults=conteos)
+        return reales
+
+class ResumenOcupacion(ModelBase):
+    """Conteos materializados de sensores por ubicación, mantenidos en la misma transacción que los cambia."""
+    ubicacion = models.CharField(max_length=100, unique=True)
+    libres = models.IntegerField(default=0)
+    ocupados = models.IntegerField(default=0)
+    inactivos = models.IntegerField(default=0)
+
+    objects = ResumenOcupacionManager()
+
+    class Meta:
+        verbose_name = 'Resumen de ocupación'
+        verbose_name_plural = 'Resúmenes de ocupación'
+
+    def __str__(self):
+        return f"{self.ubicacion}: {self.libres} libres, {self.ocupados} ocupados"
@@ -0,0 +1,124 @@
+import json
+from operator import attrgetter
+
+
+def formatear_fecha(valor):
+    # Igual que strftime('%Y-%m-%d %H:%M:%S'), pero isoformat está implementado en C
+    return valor.isoformat(' ', 'seconds')[:19] if valor is not None else None
+
+
+def texto(valor):
+    return str(valor) if valor is not None else None
+
+
+class Anidado:
+    """Objeto anidado a partir de las columnas de una relación; None si la relación es nula."""
+
+    def __init__(self, relacion, serializador):
+        self.relacion = relacion
+        self.serializador = serializador
+
+
+class Serializador:
+    """
+    Declara una vez los campos de salida como (clave, columna, conversor). Las
+    columnas se piden con values_list, de modo que la base solo devuelve lo que
+    se serializa, y las filas se convierten sin instanciar modelos.
+    """
+
+    def __init__(self, campos):
+        self.columnas = []
+        self.claves = []
+        self._plan = []
+        for clave, columna, *conversor in campos:
+            self.claves.append(clave)
+            if isinstance(columna, Anidado):
+                inicio = len(self.columnas)
+                self.columnas += [f'{columna.relacion}__{c}' for c in columna.serializador.columnas]
+                self._plan.append((clave, inicio, columna.serializador))
+            else:
+                self._plan.append((clave, len(self.columnas), conversor[0] if conversor else None))
+                self.columnas.append(columna)
+
+    def valores(self, queryset):
+        return queryset.values_list(*self.columnas)
+
+    def indice(self, columna):
+        return self.columnas.index(columna)
+
+    def fila(self, row, inicio=0):
+        datos = {}
+        for clave, indice, conversor in self._plan:
+            valor = row[inicio + indice]
+            if conversor is None:
+                datos[clave] = valor
+            elif type(conversor) is Serializador:
+                # La primera columna del anidado es su clave primaria
+                datos[clave] = conversor.fila(row, inicio + indice) if valor is not None else None
+            else:
+                datos[clave] = conversor(valor)
+        return datos
+
+    def instancia(self, obj):
+        return self.fila(tuple(attrgetter(columna.replace('__', '.'))(obj) for columna in self.columnas))
+
+    def filas(self, rows):
+        return [self.fila(row) for row in rows]
+
+
+def a_json(datos):
+    return json.dumps(datos, ensure_ascii=False).encode('utf-8')
+
+
+SENSOR = Serializador([
+    ('id', 'id', texto),
+    ('nombre', 'nombre'),
+    ('ubicacion', 'ubicacion'),
+    ('estado', 'estado'),
+])
+
+SENSOR_COMPLETO = Serializador([
+    ('id', 'id', texto),
+    ('nombre', 'nombre'),
+    ('ubicacion', 'ubicacion'),
+    ('estado', 'estado'),
+    ('active', 'active'),
+    ('createdAt', 'created_at', formatear_fecha),
+    ('updatedAt', 'updated_at', formatear_fecha),
+])
+
+RESERVACION_LISTADO = Serializador([
+    ('idReservacion', 'id', texto),
+    ('usuario', 'usuario__username'),
+    ('fecha_reservacion', 'fecha_reservacion', formatear_fecha),
+    ('sensor_activado', Anidado('sensor_activado', SENSOR_COMPLETO)),
+    ('placa', 'placa'),
+    ('activo', 'active'),
+])
+
+RESERVACION_DETALLE = Serializador([
+    ('idReservacion', 'id', texto),
+    ('usuario', 'usuario__username'),
+    ('fecha_reservacion', 'fecha_reservacion', formatear_fecha),
+    ('sensor_activado', 'sensor_activado__nombre'),
+    ('placa', 'placa'),
+    ('activo', 'active'),
+])
+
+RESERVACION_EXPORTACION = Serializador([
+    ('idReservacion', 'id', texto),
+    ('usuario', 'usuario__username'),
+    ('fecha_reservacion', 'fecha_reservacion', formatear_fecha),
+    ('actualizada', 'updated_at', formatear_fecha),
+    ('sensor', 'sensor_activado__nombre'),
+    ('ubicacion', 'sensor_activado__ubicacion'),
+    ('placa', 'placa'),
+    ('activo', 'active'),
+])
+
+RESUMEN_OCUPACION = Serializador([
+    ('ubicacion', 'ubicacion'),
+    ('libres', 'libres'),
+    ('ocupados', 'ocupados'),
+    ('inactivos', 'inactivos'),
+])
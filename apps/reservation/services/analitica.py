@@ -0,0 +1,57 @@
+from django.core.cache import caches
+from django.utils import timezone
+
+from ..models import Reservacion, ReservacionHistorica
+
+CACHE_ALIAS = 'default'
+# Un rango ya cerrado no cambia; se guarda un día y se vuelve a calcular si se desaloja
+TIMEOUT_RANGO_CERRADO = 60 * 60 * 24
+
+
+def clave_cache(inicio, fin, periodo, ubicacion):
+    return f'analitica:{periodo}:{inicio.timestamp()}:{fin.timestamp()}:{ubicacion or ""}'
+
+
+def ocupacion_por_periodo(inicio, fin, periodo='hora', ubicacion=None):
+    """
+    Filas {periodo, sensorId, sensor, ubicacion, reservaciones, minutosOcupados}
+    de la tabla viva y la histórica: reservaciones que empiezan en el periodo y
+    minutos ocupados dentro de él. Si el rango ya terminó el resultado se cachea.
+    """
+    cerrado = fin <= timezone.now()
+    if cerrado:
+        cache = caches[CACHE_ALIAS]
+        clave = clave_cache(inicio, fin, periodo, ubicacion)
+        filas = cache.get(clave)
+        if filas is not None:
+            return filas
+
+    # Cada tabla agrega en SQL; aquí se suman los grupos que se repiten (en ambas
+    # tablas o por reservaciones que abarcan varios periodos)
+    grupos = {}
+    for manager in (Reservacion.objects, ReservacionHistorica.objects):
+        for fila in manager.ocupacion_por_periodo(inicio, fin, periodo, ubicacion):
+            clave_grupo = (fila['periodo'], fila['sensor_activado_id'])
+            grupo = grupos.get(clave_grupo)
+            if grupo is None:
+                grupos[clave_grupo] = fila
+            else:
+                grupo['reservaciones'] += fila['reservaciones']
+                grupo['ocupado'] += fila['ocupado']
+
+    filas = [
+        {
+            'periodo': fila['periodo'].isoformat(),
+            'sensorId': str(fila['sensor_activado_id']),
+            'sensor': fila['sensor_activado__nombre'],
+            'ubicacion': fila['sensor_activado__ubicacion'],
+            'reservaciones': fila['reservaciones'],
+            'minutosOcupados': round(fila['ocupado'].total_seconds() / 60, 2),
+        }
+        for fila in sorted(grupos.values(), key=lambda fila: (
+            fila['periodo'], fila['sensor_activado__ubicacion'], fila['sensor_activado__nombre']
+        ))
+    ]
+    if cerrado:
+        cache.set(clave, filas, timeout=TIMEOUT_RANGO_CERRADO)
+    return filas
@@ -0,0 +1,123 @@
+"""
+Ingesta diferida (write-behind) de reportes de sensores. Los reportes se
+acumulan en memoria, uno por sensor (el más reciente), y un hilo de fondo los
+escribe con aplicar_eventos_sensor(solo_cambios=True) como mucho cada
+ANTIGUEDAD_MAXIMA segundos. Así las escrituras crecen con los cambios reales de
+estado y no con la frecuencia de los reportes.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from .sensor import SIN_CAMBIOS, aplicar_eventos_sensor
+
+logger = logging.getLogger(__name__)
+
+CAPACIDAD = 10000
+ANTIGUEDAD_MAXIMA = 2.0
+
+
+class BufferSensores:
+    def __init__(self, capacidad=CAPACIDAD, antiguedad_maxima=ANTIGUEDAD_MAXIMA):
+        self.capacidad = capacidad
+        self.antiguedad_maxima = antiguedad_maxima
+        self._lock = threading.Lock()
+        # Serializa los vaciados del hilo de fondo, del cierre y de las pruebas
+        self._lock_vaciado = threading.Lock()
+        self._pendientes = {}
+        self._despertar = threading.Event()
+        self._detenido = threading.Event()
+        self._hilo = None
+        self.recibidos = 0
+        self.escritos = 0
+
+    def reportar(self, nombre, estado, timestamp):
+        """
+        Acepta un reporte; devuelve False si el buffer está lleno y el sensor no
+        tenía ya un reporte pendiente (el llamador decide si aplicarlo en línea).
+        """
+        self._iniciar()
+        with self._lock:
+            previo = self._pendientes.get(nombre)
+            if previo is None and len(self._pendientes) >= self.capacidad:
+                self._despertar.set()
+                return False
+            # Un reporte más viejo que el pendiente no lo reemplaza
+            if previo is None or previo[1] <= timestamp:
+                self._pendientes[nombre] = (estado, timestamp)
+            self.recibidos += 1
+            if len(self._pendientes) >= self.capacidad:
+                self._despertar.set()
+        return True
+
+    def pendientes(self):
+        with self._lock:
+            return len(self._pendientes)
+
+    def vaciar(self):
+        """Escribe los reportes pendientes en un único lote; devuelve los sensores modificados."""
+        with self._lock_vaciado:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, {}
+            if not pendientes:
+                return 0
+            eventos = [
+                {'sensor': nombre, 'estado': estado, 'timestamp': timestamp.isoformat()}
+                for nombre, (estado, timestamp) in pendientes.items()
+            ]
+            resultados = []
+            for inicio in range(0, len(eventos), 1000):
+                resultados += aplicar_eventos_sensor(eventos[inicio:inicio + 1000], solo_cambios=True)
+            escritos = sum(1 for resultado in resultados if resultado['status'] == 'actualizado')
+            self.escritos += escritos
+            logger.debug(
+                'Buffer de sensores vaciado: %d reportes, %d escritos, %d sin cambios',
+                len(eventos), escritos, sum(1 for resultado in resultados if resultado['status'] == SIN_CAMBIOS)
+            )
+            return escritos
+
+    def detener(self):
+        """Detiene el hilo y escribe lo pendiente; se registra con atexit."""
+        self._detenido.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.antiguedad_maxima + 5)
+            self._hilo = None
+        self.vaciar()
+
+    def _iniciar(self):
+        if self._hilo is not None or self._detenido.is_set():
+            return
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._ejecutar, name='buffer-sensores', daemon=True)
+                self._hilo.start()
+                atexit.register(self.detener)
+
+    def _ejecutar(self):
+        while not self._detenido.is_set():
+            self._despertar.wait(self.antiguedad_maxima)
+            self._despertar.clear()
+            if self._detenido.is_set():
+                break
+            close_old_connections()
+            try:
+                self.vaciar()
+            except Exception:
+                # Los reportes del lote fallido se pierden; los siguientes los reemplazan
+                logger.exception('Error al vaciar el buffer de sensores')
+        connection.close()
+
+
+def crear_buffer():
+    opciones = getattr(settings, 'SENSOR_WRITE_BEHIND', {})
+    return BufferSensores(
+        capacidad=opciones.get('CAPACIDAD', CAPACIDAD),
+        antiguedad_maxima=opciones.get('ANTIGUEDAD_MAXIMA', ANTIGUEDAD_MAXIMA),
+    )
+
+
+buffer_sensores = crear_buffer()
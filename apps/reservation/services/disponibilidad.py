@@ -0,0 +1,99 @@
+"""
+Índice en memoria de sensores libres por ubicación para sensor/available/.
+
+Cada proceso guarda los sensores activos (id -> nombre, ubicación) y, por
+ubicación, el conjunto ordenado de los libres. Los cambios de estado de este
+proceso se aplican como deltas al recibir estado_sensor_cambiado; el índice
+recuerda la versión de la instantánea de ocupación a la que corresponde y, si
+la versión compartida avanzó por cambios que no vio (otro proceso, un borrado,
+altas o cambios de ubicación), se reconstruye desde la base en la siguiente
+búsqueda.
+"""
+import threading
+
+from ..metricas import registro
+from ..models import Sensor
+from .ocupacion import get_cache, version_actual
+
+
+class IndiceDisponibilidad:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._sensores = {}
+        # ubicacion -> {sensor_id: None}: un dict como conjunto que conserva el orden
+        self._libres = {}
+        self.reconstrucciones = 0
+
+    def buscar(self, ubicacion=None, limite=10):
+        """
+        Devuelve (libres, total): hasta limite sensores libres y activos como
+        (id, nombre, ubicacion), de una ubicación o de todas, y cuántos hay en total.
+        """
+        version = version_actual(get_cache())
+        with self._lock:
+            if version != self._version:
+                self._reconstruir(version)
+            if ubicacion is not None:
+                grupos = [(ubicacion, self._libres.get(ubicacion, {}))]
+            else:
+                grupos = sorted(self._libres.items())
+            libres = []
+            for nombre_ubicacion, ids in grupos:
+                for sensor_id in ids:
+                    if len(libres) == limite:
+                        break
+                    libres.append((sensor_id, self._sensores[sensor_id][0], nombre_ubicacion))
+            return libres, sum(len(ids) for _, ids in grupos)
+
+    def aplicar(self, cambios, version):
+        """
+        Aplica [(sensor_id, ubicacion, estado, version), ...] ya confirmados. version
+        es la que dejó el aviso en la caché; si no sigue a la del índice, hubo
+        cambios que este proceso no vio y el índice queda para reconstruir.
+        """
+        with self._lock:
+            if self._version is None or version is None or version != self._version + 1:
+                self._version = None
+                return
+            for sensor_id, ubicacion, estado, _ in cambios:
+                datos = self._sensores.get(sensor_id)
+                if datos is None:
+                    # Sensor inactivo: no figura en el índice
+                    continue
+                if datos[1] != ubicacion:
+                    self._version = None
+                    return
+                if estado:
+                    self._libres.get(ubicacion, {}).pop(sensor_id, None)
+                else:
+                    self._libres.setdefault(ubicacion, {})[sensor_id] = None
+            self._version = version
+
+    def invalidar(self):
+        with self._lock:
+            self._version = None
+
+    def _reconstruir(self, version):
+        # La versión se leyó antes de consultar: un cambio concurrente la deja vencida
+        self._sensores = {}
+        self._libres = {}
+        filas = (
+            Sensor.objects.filter(active=True)
+            .order_by('ubicacion', 'nombre')
+            .values_list('id', 'nombre', 'ubicacion', 'estado')
+        )
+        for sensor_id, nombre, ubicacion, estado in filas.iterator(chunk_size=2000):
+            self._sensores[sensor_id] = (nombre, ubicacion)
+            if not estado:
+                self._libres.setdefault(ubicacion, {})[sensor_id] = None
+        self._version = version
+        self.reconstrucciones += 1
+
+    def contadores(self):
+        """Contadores para apps.reservation.metricas."""
+        return {'django_availability_index_rebuilds_total': self.reconstrucciones}
+
+
+disponibilidad = IndiceDisponibilidad()
+registro.agregar_fuente(disponibilidad.contadores)
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import deque
+
+CAPACIDAD_BUFFER = 1000
+
+
+class HubSensores:
+    """
+    Difusión en proceso de los cambios de estado de los sensores. Los eventos se
+    numeran y se guardan en un buffer circular acotado para reanudar con Last-Event-ID.
+    Cada proceso tiene su propia secuencia, identificada por una época aleatoria.
+    """
+
+    def __init__(self, capacidad=CAPACIDAD_BUFFER):
+        self.epoca = uuid.uuid4().hex[:8]
+        self._buffer = deque(maxlen=capacidad)
+        self._ultimo_id = 0
+        self._condicion = threading.Condition()
+        self._esperas_async = set()
+
+    @property
+    def ultimo_id(self):
+        return self._ultimo_id
+
+    def publicar(self, cambios):
+        with self._condicion:
+            for sensor_id, _, estado, version in cambios:
+                self._ultimo_id += 1
+                datos = json.dumps({'id': str(sensor_id), 'estado': estado, 'version': version})
+                self._buffer.append((self._ultimo_id, datos))
+            self._condicion.notify_all()
+            esperas = list(self._esperas_async)
+        for loop, evento in esperas:
+            loop.call_soon_threadsafe(evento.set)
+
+    def eventos_desde(self, ultimo_id):
+        """
+        Devuelve (eventos, completo). completo es False cuando el buffer ya descartó
+        eventos posteriores a ultimo_id y el cliente debe recargar el listado.
+        """
+        with self._condicion:
+            primero = self._buffer[0][0] if self._buffer else self._ultimo_id + 1
+            eventos = [evento for evento in self._buffer if evento[0] > ultimo_id]
+        return eventos, ultimo_id >= primero - 1
+
+    def esperar(self, ultimo_id, timeout):
+        with self._condicion:
+            return self._condicion.wait_for(lambda: self._ultimo_id > ultimo_id, timeout)
+
+    async def aesperar(self, ultimo_id, timeout):
+        evento = asyncio.Event()
+        espera = (asyncio.get_running_loop(), evento)
+        with self._condicion:
+            if self._ultimo_id > ultimo_id:
+                return True
+            self._esperas_async.add(espera)
+        try:
+            await asyncio.wait_for(evento.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._condicion:
+                self._esperas_async.discard(espera)
+
+    def id_evento(self, numero):
+        return f'{self.epoca}-{numero}'
+
+    def parse_last_event_id(self, valor):
+        """Número de secuencia de un Last-Event-ID de este proceso, o None si no es válido."""
+        epoca, _, numero = (valor or '').partition('-')
+        if epoca != self.epoca or not numero.isdigit():
+            return None
+        return int(numero)
+
+
+hub_sensores = HubSensores()
+
+
+INTERVALO_PING = 15
+DURACION_MAXIMA = 300
+
+
+def formatear_evento(hub, numero, datos):
+    return f'id: {hub.id_evento(numero)}\nevent: sensor\ndata: {datos}\n\n'
+
+
+def inicio_flujo(hub, last_event_id):
+    """Devuelve (ultimo_id, preambulo) para un cliente que se conecta o reconecta."""
+    preambulo = 'retry: 3000\n\n'
+    ultimo_id = hub.parse_last_event_id(last_event_id)
+    if ultimo_id is None:
+        if last_event_id:
+            # Otro proceso u otra ejecución: no se puede reanudar
+            preambulo += 'event: reset\ndata: {}\n\n'
+        ultimo_id = hub.ultimo_id
+    return ultimo_id, preambulo
+
+
+def pendientes(hub, ultimo_id):
+    eventos, completo = hub.eventos_desde(ultimo_id)
+    bloque = '' if completo else 'event: reset\ndata: {}\n\n'
+    bloque += ''.join(formatear_evento(hub, numero, datos) for numero, datos in eventos)
+    return (eventos[-1][0] if eventos else ultimo_id), bloque
+
+
+def flujo_eventos(hub, last_event_id, duracion=DURACION_MAXIMA):
+    """
+    Generador SSE síncrono. Termina tras duracion segundos para liberar el hilo;
+    EventSource se reconecta solo y reanuda con Last-Event-ID.
+    """
+    ultimo_id, preambulo = inicio_flujo(hub, last_event_id)
+    yield preambulo
+    fin = time.monotonic() + duracion
+    while time.monotonic() < fin:
+        ultimo_id, bloque = pendientes(hub, ultimo_id)
+        if bloque:
+            yield bloque
+        elif not hub.esperar(ultimo_id, min(INTERVALO_PING, max(fin - time.monotonic(), 0))):
+            yield ': ping\n\n'
+
+
+async def aflujo_eventos(hub, last_event_id, duracion=DURACION_MAXIMA):
+    """Variante asíncrona de flujo_eventos, sin ocupar un hilo por cliente."""
+    ultimo_id, preambulo = inicio_flujo(hub, last_event_id)
+    yield preambulo
+    fin = time.monotonic() + duracion
+    while time.monotonic() < fin:
+        ultimo_id, bloque = pendientes(hub, ultimo_id)
+        if bloque:
+            yield bloque
+        elif not await hub.aesperar(ultimo_id, min(INTERVALO_PING, max(fin - time.monotonic(), 0))):
+            yield ': ping\n\n'
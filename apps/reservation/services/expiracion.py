@@ -0,0 +1,142 @@
+"""
+Expiración de reservaciones abandonadas. Una reservación activa con más de
+TTL_MINUTOS desde fecha_reservacion se desactiva y su sensor queda libre,
+por lotes (ReservacionManager.expirar). El barrido se ejecuta con el comando
+expirar_reservaciones o con un hilo del proceso (HILO en
+settings.RESERVACION_EXPIRACION), nunca con ambos.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from ..metricas import registro
+from ..models import ClaveIdempotencia, Reservacion
+
+logger = logging.getLogger(__name__)
+
+TTL_MINUTOS = 120
+LOTE = 500
+INTERVALO = 60.0
+
+
+def opciones():
+    valores = getattr(settings, 'RESERVACION_EXPIRACION', {})
+    return {
+        'ttl': valores.get('TTL_MINUTOS', TTL_MINUTOS),
+        'lote': valores.get('LOTE', LOTE),
+        'intervalo': valores.get('INTERVALO', INTERVALO),
+    }
+
+
+class Estadisticas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.barridos = 0
+        self.reservaciones = 0
+        self.sensores = 0
+        self.claves = 0
+        self.segundos = 0.0
+
+    def registrar(self, reservaciones, sensores, claves, segundos):
+        with self._lock:
+            self.barridos += 1
+            self.reservaciones += reservaciones
+            self.sensores += sensores
+            self.claves += claves
+            self.segundos += segundos
+
+    def contadores(self):
+        """Contadores para apps.reservation.metricas."""
+        with self._lock:
+            return {
+                'django_reservation_sweeps_total': self.barridos,
+                'django_reservation_sweep_duration_seconds_total': self.segundos,
+                'django_reservations_expired_total': self.reservaciones,
+                'django_reservation_sensors_released_total': self.sensores,
+                'django_idempotency_keys_purged_total': self.claves,
+            }
+
+
+estadisticas = Estadisticas()
+registro.agregar_fuente(estadisticas.contadores)
+
+
+def barrer(ttl=None, lote=None, pausa=0.0):
+    """
+    Expira, lote a lote, las reservaciones activas con más de ttl minutos y
+    purga las claves de idempotencia vencidas. Devuelve {'reservaciones',
+    'sensores', 'claves', 'segundos'} del barrido completo.
+    """
+    valores = opciones()
+    ttl = valores['ttl'] if ttl is None else ttl
+    lote = valores['lote'] if lote is None else lote
+
+    inicio = time.perf_counter()
+    antes_de = timezone.now() - timedelta(minutes=ttl)
+    reservaciones = sensores = 0
+    while True:
+        liberadas, libres = Reservacion.objects.expirar(antes_de, lote=lote)
+        reservaciones += liberadas
+        sensores += libres
+        if liberadas < lote:
+            break
+        # Entre lotes se libera el bloqueo de escritura para las peticiones en curso
+        time.sleep(pausa)
+
+    claves = ClaveIdempotencia.objects.purgar()
+
+    segundos = time.perf_counter() - inicio
+    estadisticas.registrar(reservaciones, sensores, claves, segundos)
+    if reservaciones or claves:
+        logger.info(
+            'Barrido de expiración: %d reservaciones y %d sensores liberados, %d claves purgadas en %.3f s',
+            reservaciones, sensores, claves, segundos
+        )
+    return {'reservaciones': reservaciones, 'sensores': sensores, 'claves': claves, 'segundos': segundos}
+
+
+class BarredorReservaciones:
+    """Hilo que ejecuta barrer() cada intervalo segundos hasta detener()."""
+
+    def __init__(self, intervalo=None, **opciones_barrido):
+        self.intervalo = opciones()['intervalo'] if intervalo is None else intervalo
+        self.opciones_barrido = opciones_barrido
+        self._detenido = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._ejecutar, name='barredor-reservaciones', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detenido.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=self.intervalo + 5)
+            self._hilo = None
+
+    def _ejecutar(self):
+        while not self._detenido.wait(self.intervalo):
+            close_old_connections()
+            try:
+                barrer(**self.opciones_barrido)
+            except Exception:
+                logger.exception('Error en el barrido de expiración de reservaciones')
+        connection.close()
+
+
+barredor = None
+
+
+def iniciar_barredor():
+    """Arranca el hilo del proceso si settings.RESERVACION_EXPIRACION['HILO'] lo pide."""
+    global barredor
+    if barredor is None and getattr(settings, 'RESERVACION_EXPIRACION', {}).get('HILO'):
+        barredor = BarredorReservaciones()
+        barredor.iniciar()
+    return barredor
@@ -0,0 +1,78 @@
+"""
+Exportación de reservaciones por rango de fecha_reservacion en CSV o NDJSON.
+Las filas se leen con values_list en bloques (iterator) y cada bloque se
+convierte en bytes antes de leer el siguiente, de modo que la memoria no
+depende del tamaño de la exportación. Opcionalmente la salida va en gzip.
+"""
+import csv
+import io
+import json
+import zlib
+
+from ..models import Reservacion
+from ..serializers import RESERVACION_EXPORTACION
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+TAMANO_BLOQUE = 2000
+
+
+def reservaciones_en_rango(desde, hasta, historial=False):
+    """Proyección de RESERVACION_EXPORTACION para desde <= fecha_reservacion < hasta."""
+    filtros = {'fecha_reservacion__gte': desde, 'fecha_reservacion__lt': hasta}
+    if historial:
+        queryset = Reservacion.objects.historial(**filtros)
+    else:
+        queryset = Reservacion.objects.filter(**filtros)
+    return RESERVACION_EXPORTACION.valores(queryset).order_by('fecha_reservacion', 'id')
+
+
+def bloques_csv(filas, tamano=TAMANO_BLOQUE):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    claves = RESERVACION_EXPORTACION.claves
+    escritor.writerow(claves)
+    pendientes = 0
+    for fila in filas:
+        datos = RESERVACION_EXPORTACION.fila(fila)
+        escritor.writerow([datos[clave] for clave in claves])
+        pendientes += 1
+        if pendientes == tamano:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def bloques_ndjson(filas, tamano=TAMANO_BLOQUE):
+    lineas = []
+    for fila in filas:
+        lineas.append(json.dumps(RESERVACION_EXPORTACION.fila(fila), ensure_ascii=False))
+        if len(lineas) == tamano:
+            yield ('\n'.join(lineas) + '\n').encode('utf-8')
+            lineas = []
+    if lineas:
+        yield ('\n'.join(lineas) + '\n').encode('utf-8')
+
+
+def comprimir(bloques, nivel=6):
+    # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+def exportar(queryset, formato='csv', gzip=False, tamano=TAMANO_BLOQUE):
+    """Generador de bytes con las filas del queryset (una proyección de reservaciones_en_rango)."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato {formato} no válido, use {', '.join(FORMATOS)}")
+    generar = bloques_csv if formato == 'csv' else bloques_ndjson
+    bloques = generar(queryset.iterator(chunk_size=tamano), tamano)
+    return comprimir(bloques) if gzip else bloques
@@ -0,0 +1,107 @@
+"""
+Caché en memoria de nombre -> id para usuarios y sensores, acotada (LRU) y con
+TTL. Las señales de User y Sensor invalidan las entradas afectadas, de modo que
+el TTL solo cubre cambios hechos fuera del ORM (update(), SQL directo).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from apps.security.models import User
+from ..metricas import registro
+from ..models import Sensor
+
+CAPACIDAD = 10000
+TTL = 300
+
+
+class ResolutorIdentidades:
+    def __init__(self, nombre, cargar, capacidad=CAPACIDAD, ttl=TTL):
+        self.nombre = nombre
+        self.cargar = cargar
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        # Cambia con cada invalidación: una carga iniciada antes no se guarda
+        self._generacion = 0
+        self.aciertos = 0
+        self.fallos = 0
+
+    def resolver(self, clave):
+        """Id para la clave, o None si no existe (los None no se guardan)."""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[1] > ahora:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            self.fallos += 1
+            generacion = self._generacion
+
+        # La consulta se hace fuera del bloqueo para no serializar a los demás hilos
+        valor = self.cargar(clave)
+        if valor is not None:
+            with self._lock:
+                if generacion != self._generacion:
+                    return valor
+                self._entradas[clave] = (valor, ahora + self.ttl)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.capacidad:
+                    self._entradas.popitem(last=False)
+        return valor
+
+    def invalidar(self, clave=None, valor=None):
+        """Elimina la entrada de la clave y cualquiera que apunte al valor (renombrados)."""
+        with self._lock:
+            self._generacion += 1
+            self._entradas.pop(clave, None)
+            if valor is not None:
+                for vieja in [k for k, (v, _) in self._entradas.items() if v == valor]:
+                    del self._entradas[vieja]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'entradas': len(self._entradas)}
+
+
+def cargar_usuario(username):
+    return User.objects.filter(username=username).values_list('id', flat=True).first()
+
+
+def cargar_sensor(nombre):
+    # El nombre solo es único por ubicación: sin un único sensor no hay id que guardar
+    ids = list(Sensor.objects.filter(nombre=nombre).values_list('id', flat=True)[:2])
+    return ids[0] if len(ids) == 1 else None
+
+
+usuarios = ResolutorIdentidades('usuarios', cargar_usuario)
+sensores = ResolutorIdentidades('sensores', cargar_sensor)
+
+
+def id_usuario(username):
+    return usuarios.resolver(username)
+
+
+def id_sensor(nombre):
+    return sensores.resolver(nombre)
+
+
+def contadores():
+    """Contadores para apps.reservation.metricas."""
+    datos = {}
+    for resolutor in (usuarios, sensores):
+        estadisticas = resolutor.estadisticas()
+        for resultado, clave in (('hit', 'aciertos'), ('miss', 'fallos')):
+            datos[f'django_identity_cache_requests_total{{cache="{resolutor.nombre}",result="{resultado}"}}'] = estadisticas[clave]
+    return datos
+
+
+registro.agregar_fuente(contadores)
@@ -0,0 +1,107 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import transaction
+
+from ..models import Sensor
+from ..serializers import SENSOR, a_json
+
+CACHE_ALIAS = 'ocupacion'
+VERSION_KEY = 'ocupacion:version'
+SNAPSHOT_KEY = 'ocupacion:snapshot'
+# Avanza con cada alta, cambio o borrado de reservaciones (y de usuarios, cuyo
+# username aparece en el listado); junto con VERSION_KEY firma reservacion/list/
+RESERVACIONES_VERSION_KEY = 'reservaciones:version'
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def version_actual(cache, clave=VERSION_KEY):
+    version = cache.get(clave)
+    if version is None:
+        # Se parte de un valor único para que una instantánea previa a un
+        # desalojo de la versión nunca vuelva a ser válida
+        cache.add(clave, time.time_ns(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def obtener_snapshot():
+    """
+    Devuelve (version, bytes) con el listado de sensores serializado en JSON.
+    Mientras la versión no cambie la respuesta sale de la caché sin consultar la base.
+    """
+    cache = get_cache()
+    valores = cache.get_many([VERSION_KEY, SNAPSHOT_KEY])
+    version = valores.get(VERSION_KEY)
+    snapshot = valores.get(SNAPSHOT_KEY)
+    if version is not None and snapshot is not None and snapshot[0] == version:
+        return snapshot
+
+    # La versión se lee antes de consultar: si cambia mientras se construye,
+    # la instantánea queda guardada con una versión ya vencida
+    version = version_actual(cache)
+    snapshot = (version, a_json(SENSOR.filas(SENSOR.valores(Sensor.objects.all()))))
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+async def aobtener_snapshot():
+    """Variante asíncrona de obtener_snapshot."""
+    cache = get_cache()
+    valores = await cache.aget_many([VERSION_KEY, SNAPSHOT_KEY])
+    version = valores.get(VERSION_KEY)
+    snapshot = valores.get(SNAPSHOT_KEY)
+    if version is not None and snapshot is not None and snapshot[0] == version:
+        return snapshot
+
+    version = await sync_to_async(version_actual)(cache)
+    filas = [fila async for fila in SENSOR.valores(Sensor.objects.all())]
+    snapshot = (version, a_json(SENSOR.filas(filas)))
+    await cache.aset(SNAPSHOT_KEY, snapshot, timeout=None)
+    return snapshot
+
+
+def invalidar_snapshot():
+    """Avanza la versión de los sensores; devuelve la nueva o None si se había desalojado."""
+    cache = get_cache()
+    try:
+        version = cache.incr(VERSION_KEY)
+    except ValueError:
+        version_actual(cache)
+        version = None
+    cache.delete(SNAPSHOT_KEY)
+    return version
+
+
+def invalidar_snapshot_al_confirmar():
+    # Se invalida después del commit para que ningún lector reconstruya con datos sin confirmar
+    transaction.on_commit(invalidar_snapshot)
+
+
+def versiones_reservaciones():
+    """
+    (versión de reservaciones, versión de sensores) con una sola lectura de la
+    caché. Solo son coherentes entre workers si la caché es compartida.
+    """
+    cache = get_cache()
+    valores = cache.get_many([RESERVACIONES_VERSION_KEY, VERSION_KEY])
+    return (
+        valores.get(RESERVACIONES_VERSION_KEY) or version_actual(cache, RESERVACIONES_VERSION_KEY),
+        valores.get(VERSION_KEY) or version_actual(cache),
+    )
+
+
+def avanzar_version_reservaciones():
+    cache = get_cache()
+    try:
+        cache.incr(RESERVACIONES_VERSION_KEY)
+    except ValueError:
+        version_actual(cache, RESERVACIONES_VERSION_KEY)
+
+
+def avanzar_version_reservaciones_al_confirmar():
+    transaction.on_commit(avanzar_version_reservaciones)
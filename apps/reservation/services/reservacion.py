@@ -0,0 +1,70 @@
+from django.db import IntegrityError, transaction
+from django.http import Http404
+from django.utils import timezone
+
+from ..models import ConflictoDeVersion, Reservacion, Sensor
+from .identidades import id_usuario
+
+
+class ReservacionConflicto(Exception):
+    pass
+
+
+class SensorReservado(ReservacionConflicto):
+    pass
+
+
+class PlacaReservada(ReservacionConflicto):
+    pass
+
+
+def reclamar_reservacion(username, sensor_id, placa):
+    """
+    Crea una reservación en una sola transacción: el sensor se reclama con un
+    UPDATE condicional (estado=False -> True) y las restricciones únicas parciales
+    sobre reservaciones activas detectan los conflictos de sensor y placa.
+    """
+    try:
+        with transaction.atomic():
+            # La escritura va primero para que la transacción tome el bloqueo de
+            # escritura desde el inicio y no tenga que promoverlo desde una lectura
+            ahora = timezone.now()
+            try:
+                Sensor.objects.ocupar(pk=sensor_id)
+            except Sensor.DoesNotExist:
+                raise Http404(f"Sensor con id {sensor_id} no encontrado")
+            except ConflictoDeVersion:
+                raise SensorReservado(f'El sensor con ID {sensor_id} ya está reservado')
+
+            usuario_id = id_usuario(username)
+            if usuario_id is None:
+                raise Http404(f"Usuario con el username {username} no se encontrado")
+
+            return Reservacion.objects.create(
+                usuario_id=usuario_id,
+                fecha_reservacion=ahora,
+                sensor_activado_id=sensor_id,
+                placa=placa,
+                active=True
+            )
+    except IntegrityError as e:
+        raise conflicto_desde_integrity_error(e, sensor_id, placa) from e
+
+
+def liberar_reservacion(reservacion):
+    """Desactiva la reservación y libera su sensor en la misma transacción."""
+    with transaction.atomic():
+        reservacion.active = False
+        reservacion.save(update_fields=['active', 'updated_at'])
+
+        Sensor.objects.fijar_estado(False, pk=reservacion.sensor_activado_id)
+
+
+def conflicto_desde_integrity_error(error, sensor_id, placa):
+    mensaje = str(error)
+    # PostgreSQL informa el nombre de la restricción, SQLite las columnas afectadas
+    if 'reservacion_placa_activa_unica' in mensaje or 'reservacion.placa' in mensaje:
+        return PlacaReservada(f'La placa con la {placa} ya se encuentra reservada')
+    if 'reservacion_sensor_activo_unico' in mensaje or 'reservacion.sensor_activado_id' in mensaje:
+        return SensorReservado(f'El sensor con ID {sensor_id} ya está reservado')
+    return error
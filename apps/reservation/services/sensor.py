@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import ResumenOcupacion, Sensor
+from ..signals import notificar_cambios_de_estado
+
+logger = logging.getLogger(__name__)
+
+MAX_EVENTOS_POR_LOTE = 1000
+
+ACTUALIZADO = 'actualizado'
+DESCARTADO = 'descartado'
+NO_ENCONTRADO = 'no_encontrado'
+AMBIGUO = 'ambiguo'
+INVALIDO = 'invalido'
+SIN_CAMBIOS = 'sin_cambios'
+
+
+def parse_timestamp(valor):
+    if isinstance(valor, bool):
+        raise ValueError(f'Timestamp {valor} no válido')
+    if isinstance(valor, (int, float)):
+        try:
+            return datetime.fromtimestamp(valor, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            # Fuera del rango de datetime (1e20, o inf si el JSON traía 1e400)
+            raise ValueError(f'Timestamp {valor} no válido')
+    fecha = parse_datetime(valor) if isinstance(valor, str) else None
+    if fecha is None:
+        raise ValueError(f'Timestamp {valor} no válido')
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha, dt_timezone.utc)
+    return fecha
+
+
+def aplicar_eventos_sensor(eventos, solo_cambios=False):
+    """
+    Aplica un lote de eventos {sensor, estado, timestamp} con una consulta IN y un
+    bulk_update dentro de una transacción. Devuelve un resultado por evento, en el
+    mismo orden recibido. Con solo_cambios no se escriben los sensores que ya
+    tienen el estado reportado.
+    """
+    resultados = [None] * len(eventos)
+    ahora = timezone.now()
+    # nombre -> (indice, estado, timestamp) del evento más reciente por sensor
+    ultimos = {}
+
+    for indice, evento in enumerate(eventos):
+        nombre = evento.get('sensor') if isinstance(evento, dict) else None
+        try:
+            if not isinstance(nombre, str) or not isinstance(evento.get('estado'), bool):
+                raise ValueError('Cada evento requiere sensor (texto) y estado (booleano)')
+            # Un reloj adelantado en la pasarela no debe bloquear los eventos siguientes
+            timestamp = min(parse_timestamp(evento.get('timestamp')), ahora)
+        except ValueError as e:
+            resultados[indice] = {'sensor': nombre, 'status': INVALIDO, 'message': str(e)}
+            continue
+
+        previo = ultimos.get(nombre)
+        if previo is not None and previo[2] > timestamp:
+            resultados[indice] = {'sensor': nombre, 'status': DESCARTADO}
+            continue
+        if previo is not None:
+            resultados[previo[0]] = {'sensor': nombre, 'status': DESCARTADO}
+        ultimos[nombre] = (indice, evento['estado'], timestamp)
+
+    with transaction.atomic():
+        encontrados = {}
+        for sensor in Sensor.objects.select_for_update().filter(nombre__in=ultimos).only('id', 'nombre', 'ubicacion', 'estado', 'active', 'version', 'updated_at'):
+            encontrados.setdefault(sensor.nombre, []).append(sensor)
+
+        por_actualizar = []
+        transiciones = []
+        for nombre, (indice, estado, timestamp) in ultimos.items():
+            sensores = encontrados.get(nombre, [])
+            if not sensores:
+                resultados[indice] = {'sensor': nombre, 'status': NO_ENCONTRADO}
+            elif len(sensores) > 1:
+                resultados[indice] = {'sensor': nombre, 'status': AMBIGUO}
+            elif sensores[0].updated_at > timestamp:
+                resultados[indice] = {'sensor': nombre, 'status': DESCARTADO}
+            elif solo_cambios and sensores[0].estado == estado:
+                resultados[indice] = {'sensor': nombre, 'status': SIN_CAMBIOS}
+            else:
+                sensor = sensores[0]
+                transiciones.append((
+                    (sensor.ubicacion, sensor.estado, sensor.active),
+                    (sensor.ubicacion, estado, sensor.active),
+                ))
+                sensor.estado = estado
+                sensor.updated_at = timestamp
+                sensor.version += 1
+                por_actualizar.append(sensor)
+                resultados[indice] = {'sensor': nombre, 'status': ACTUALIZADO, 'estado': estado, 'version': sensor.version}
+
+        if por_actualizar:
+            Sensor.objects.bulk_update(por_actualizar, fields=['estado', 'version', 'updated_at'])
+            ResumenOcupacion.objects.ajustar_sensores(transiciones)
+            notificar_cambios_de_estado([
+                (sensor.id, sensor.ubicacion, sensor.estado, sensor.version) for sensor in por_actualizar
+            ])
+
+    logger.debug('Lote de %d eventos aplicado, %d sensores actualizados', len(eventos), len(por_actualizar))
+    return resultados
@@ -0,0 +1,167 @@
+"""
+Tarifas por duración de las reservaciones.
+
+Cada ubicación tiene bandas horarias (hora local) con un precio por hora en
+centavos; las ubicaciones sin tabla propia usan la de '*'. La duración va de
+fecha_reservacion a updated_at si la reservación está cerrada, o al momento
+actual si sigue activa, y se cobra por fracciones iniciadas con un mínimo.
+
+El costo se calcula con una función acumulada por tarifa: costo(fin) -
+costo(inicio), con una búsqueda binaria sobre las bandas, de modo que el precio
+no depende de cuántas horas o días abarque la reservación. Para lotes grandes
+tarifar() lee solo las columnas necesarias con values_list.
+"""
+import threading
+from bisect import bisect_right
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+SEGUNDOS_DIA = 86400
+CENTAVO = Decimal('0.01')
+
+# Columnas de Reservacion (o ReservacionHistorica) que necesita precio()
+COLUMNAS = ('fecha_reservacion', 'updated_at', 'active', 'sensor_activado__ubicacion')
+
+
+class Tarifa:
+    def __init__(self, bandas, fraccion_minutos=1, minimo=0):
+        bandas = sorted(bandas)
+        if not bandas or bandas[0][0] != 0 or bandas[-1][1] != 24 or any(
+            anterior[1] != siguiente[0] for anterior, siguiente in zip(bandas, bandas[1:])
+        ):
+            raise ImproperlyConfigured('Las bandas de una tarifa deben cubrir de 0 a 24 horas sin huecos')
+        if fraccion_minutos < 1:
+            raise ImproperlyConfigured('fraccion_minutos debe ser >= 1')
+
+        self.fraccion = int(fraccion_minutos * 60)
+        self.minimo = minimo
+        self._inicios = []
+        self._precios = []
+        # Costo acumulado (centavos x segundo / hora) al inicio de cada banda
+        self._acumulados = []
+        acumulado = 0
+        for hora_inicio, hora_fin, centavos_hora in bandas:
+            self._inicios.append(int(hora_inicio * 3600))
+            self._precios.append(centavos_hora)
+            self._acumulados.append(acumulado)
+            acumulado += int((hora_fin - hora_inicio) * 3600) * centavos_hora
+        self._costo_dia = acumulado
+
+    def acumulado(self, segundos):
+        """Costo desde el origen hasta segundos (hora local desde la época)."""
+        dias, resto = divmod(segundos, SEGUNDOS_DIA)
+        banda = bisect_right(self._inicios, resto) - 1
+        return dias * self._costo_dia + self._acumulados[banda] + (resto - self._inicios[banda]) * self._precios[banda]
+
+    def importe(self, inicio, fin):
+        """Centavos a cobrar entre dos instantes en segundos locales."""
+        duracion = max(fin - inicio, 0)
+        cobrada = -(-duracion // self.fraccion) * self.fraccion
+        total = self.acumulado(inicio + cobrada) - self.acumulado(inicio)
+        # Redondeo al centavo más cercano
+        return max((total + 1800) // 3600, self.minimo)
+
+
+class Tarifario:
+    def __init__(self, tablas):
+        if '*' not in tablas:
+            raise ImproperlyConfigured("TARIFAS necesita una tabla '*' para las demás ubicaciones")
+        self.tarifas = {ubicacion: Tarifa(**tabla) for ubicacion, tabla in tablas.items()}
+        self.por_defecto = self.tarifas['*']
+
+    def para(self, ubicacion):
+        return self.tarifas.get(ubicacion, self.por_defecto)
+
+
+_lock = threading.Lock()
+_tarifario = (None, None)
+
+
+def obtener_tarifario():
+    """Tarifario de settings.TARIFAS, reconstruido solo si el ajuste cambia."""
+    global _tarifario
+    tablas = getattr(settings, 'TARIFAS', None)
+    if tablas is None:
+        raise ImproperlyConfigured('Falta el ajuste TARIFAS')
+    configuracion, tarifario = _tarifario
+    if configuracion is not tablas:
+        with _lock:
+            tarifario = Tarifario(tablas)
+            _tarifario = (tablas, tarifario)
+    return tarifario
+
+
+def segundos_locales(valor, zona):
+    # Segundos enteros desde la época en la hora local, para las bandas horarias
+    return int(valor.timestamp()) + int(valor.astimezone(zona).utcoffset().total_seconds())
+
+
+def precio(fecha_reservacion, updated_at, active, ubicacion, ahora=None):
+    """Precio en centavos de una reservación a partir de las COLUMNAS."""
+    zona = timezone.get_current_timezone()
+    fin = (ahora or timezone.now()) if active else updated_at
+    return obtener_tarifario().para(ubicacion).importe(
+        segundos_locales(fecha_reservacion, zona), segundos_locales(fin, zona)
+    )
+
+
+def precio_reservacion(reservacion, ahora=None):
+    """Precio en centavos de una instancia de Reservacion."""
+    ubicacion = reservacion.sensor_activado.ubicacion if reservacion.sensor_activado_id else None
+    return precio(reservacion.fecha_reservacion, reservacion.updated_at, reservacion.active, ubicacion, ahora)
+
+
+def tarifar_columnas(fechas, fines, activos, ubicaciones, ahora=None):
+    """
+    Precios en centavos para columnas paralelas (listas o tuplas del mismo largo).
+    Las conversiones por fila se limitan a dos timestamps y una búsqueda binaria.
+    """
+    zona = timezone.get_current_timezone()
+    ahora = ahora or timezone.now()
+    tarifario = obtener_tarifario()
+    tarifas = {}
+    desplazamientos = {}
+
+    def local(valor):
+        # La zona horaria solo cambia de desplazamiento cada varios meses: se
+        # memoriza por hora UTC
+        hora = int(valor.timestamp()) // 3600
+        desplazamiento = desplazamientos.get(hora)
+        if desplazamiento is None:
+            desplazamiento = desplazamientos[hora] = int(valor.astimezone(zona).utcoffset().total_seconds())
+        return int(valor.timestamp()) + desplazamiento
+
+    precios = []
+    for fecha, fin, active, ubicacion in zip(fechas, fines, activos, ubicaciones):
+        tarifa = tarifas.get(ubicacion)
+        if tarifa is None:
+            tarifa = tarifas[ubicacion] = tarifario.para(ubicacion)
+        precios.append(tarifa.importe(local(fecha), local(ahora if active else fin)))
+    return precios
+
+
+def tarifar(queryset, ahora=None, lote=10000):
+    """
+    Genera (id, centavos) para cada reservación del queryset. Las filas se leen
+    por lotes con values_list y se tarifan columna a columna.
+    """
+    ahora = ahora or timezone.now()
+    filas = queryset.values_list('id', *COLUMNAS).iterator(chunk_size=lote)
+    while True:
+        bloque = []
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) == lote:
+                break
+        if not bloque:
+            return
+        ids, fechas, fines, activos, ubicaciones = zip(*bloque)
+        yield from zip(ids, tarifar_columnas(fechas, fines, activos, ubicaciones, ahora))
+
+
+def a_moneda(centavos):
+    """Importe exacto en unidades de moneda: Decimal con dos decimales, nunca float."""
+    return (Decimal(centavos) / 100).quantize(CENTAVO)
@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from apps.security.models import User
+from .models import Reservacion, ReservacionHistorica, ResumenOcupacion, Sensor
+from .services import identidades
+from .services.disponibilidad import disponibilidad
+from .services.eventos import hub_sensores
+from .services.ocupacion import (
+    avanzar_version_reservaciones_al_confirmar, invalidar_snapshot, invalidar_snapshot_al_confirmar
+)
+
+# Se envía después del commit con cambios=[(sensor_id, ubicacion, estado, version), ...]
+estado_sensor_cambiado = Signal()
+
+
+def notificar_cambios_de_estado(cambios):
+    if cambios:
+        transaction.on_commit(lambda: estado_sensor_cambiado.send(sender=Sensor, cambios=cambios))
+
+
+@receiver(estado_sensor_cambiado)
+def publicar_cambios_de_estado(sender, cambios, **kwargs):
+    disponibilidad.aplicar(cambios, invalidar_snapshot())
+    hub_sensores.publicar(cambios)
+
+
+CAMPOS_RESUMEN = ('ubicacion', 'estado', 'active')
+
+
+@receiver(pre_save, sender=Sensor)
+def sensor_por_guardar(sender, instance, update_fields=None, **kwargs):
+    # Valores previos para ajustar el resumen de ocupación y detectar el cambio de
+    # estado en post_save; sin estado, ubicación ni active en update_fields no se leen
+    instance._resumen_anterior = None
+    if instance._state.adding or (update_fields is not None and not set(update_fields) & set(CAMPOS_RESUMEN)):
+        return
+    instance._resumen_anterior = sender.objects.filter(pk=instance.pk).values_list(*CAMPOS_RESUMEN).first()
+
+
+@receiver(post_save, sender=Sensor)
+def sensor_guardado(sender, instance, created, update_fields=None, **kwargs):
+    anterior = getattr(instance, '_resumen_anterior', None)
+    if created or anterior is not None:
+        # Con update_fields solo cambian esas columnas; el resto conserva el valor de la base
+        nuevo = tuple(
+            getattr(instance, campo) if anterior is None or update_fields is None or campo in update_fields
+            else anterior[indice]
+            for indice, campo in enumerate(CAMPOS_RESUMEN)
+        )
+        ResumenOcupacion.objects.ajustar_sensores([(anterior, nuevo)])
+    if update_fields is None or set(update_fields) - {'estado', 'version', 'updated_at'}:
+        # Altas, renombrados, cambios de ubicación y activaciones no llegan como deltas de estado
+        transaction.on_commit(disponibilidad.invalidar)
+    if estado_cambiado(anterior, instance, update_fields):
+        notificar_cambios_de_estado([(instance.id, instance.ubicacion, instance.estado, instance.version)])
+    else:
+        # Sin evento para los clientes, pero el listado de sensores pudo cambiar;
+        # el índice sigue a la nueva versión si no se invalidó arriba
+        transaction.on_commit(lambda: disponibilidad.aplicar([], invalidar_snapshot()))
+
+
+def estado_cambiado(anterior, instance, update_fields):
+    if anterior is None or (update_fields is not None and 'estado' not in update_fields):
+        return False
+    return anterior[CAMPOS_RESUMEN.index('estado')] != instance.estado
+
+
+@receiver(post_delete, sender=Sensor)
+def sensor_eliminado(sender, instance, **kwargs):
+    ResumenOcupacion.objects.ajustar_sensores([((instance.ubicacion, instance.estado, instance.active), None)])
+    invalidar_snapshot_al_confirmar()
+
+
+def invalidar_identidad(resolutor, clave, valor):
+    # También tras el commit: una lectura concurrente pudo guardar el valor anterior
+    resolutor.invalidar(clave=clave, valor=valor)
+    transaction.on_commit(lambda: resolutor.invalidar(clave=clave, valor=valor))
+
+
+@receiver(post_save, sender=Sensor)
+@receiver(post_delete, sender=Sensor)
+def sensor_identidad_cambiada(sender, instance, **kwargs):
+    invalidar_identidad(identidades.sensores, instance.nombre, instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_identidad_cambiada(sender, instance, **kwargs):
+    invalidar_identidad(identidades.usuarios, instance.username, instance.pk)
+
+
+def reservaciones_modificadas():
+    """Para escrituras sin señales (update() sobre querysets de reservaciones)."""
+    avanzar_version_reservaciones_al_confirmar()
+
+
+@receiver(post_save, sender=Reservacion)
+@receiver(post_delete, sender=Reservacion)
+@receiver(post_save, sender=ReservacionHistorica)
+@receiver(post_delete, sender=ReservacionHistorica)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def reservacion_modificada(sender, **kwargs):
+    avanzar_version_reservaciones_al_confirmar()
@@ -1,3 +1,1303 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+import json
+import re
+import uuid
+from contextlib import contextmanager
+from unittest import mock
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection, models
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.security.models import User
+from apps.reservation.management.endpoints import datos_de_referencia, medir_endpoints
+from apps.reservation.management.semilla import sembrar_datos
+from apps.reservation.checks import cache_ocupacion_compartida
+from apps.reservation.db import ReplicaRouter, configurar_sqlite, lectura_en_replica
+from apps.reservation.logs import ColaHandler, IdPeticionFilter, MuestreoFilter, id_peticion
+from apps.reservation.metricas import RegistroMetricas, registro
+from apps.reservation.middleware import IdPeticionMiddleware, MetricasMiddleware, instalar_contador
+from apps.reservation.serializers import RESERVACION_LISTADO
+from apps.reservation.services import identidades, tarifas
+from apps.reservation.services.buffer_sensores import BufferSensores
+from apps.reservation.services.disponibilidad import disponibilidad
+from apps.reservation.services.expiracion import barrer, estadisticas
+from apps.reservation.services.identidades import id_sensor, id_usuario
+from apps.reservation.models import ClaveIdempotencia, Reservacion, ReservacionHistorica, ResumenOcupacion, Sensor
+from apps.reservation.services.eventos import HubSensores, flujo_eventos, hub_sensores
+from apps.reservation.services.ocupacion import get_cache
+from apps.reservation.services.sensor import aplicar_eventos_sensor
+from apps.reservation.services.reservacion import (
+    PlacaReservada, ReservacionConflicto, SensorReservado, liberar_reservacion, reclamar_reservacion
+)
+from apps.reservation.views.reservacion import (
+    actualizar_reservacion_async, crear_reservacion_async, getIdReservation_async, stream_reservations
+)
+from apps.reservation.views.sensor import detail_one_sensors_async, detail_sensor_async
+
+
+class ReclamarReservacionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def test_reclama_sensor_libre(self):
+        reservacion = reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+
+        self.sensor.refresh_from_db()
+        self.assertTrue(self.sensor.estado)
+        self.assertEqual(reservacion.sensor_activado_id, self.sensor.id)
+
+    def test_sensor_ocupado_es_conflicto(self):
+        reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+
+        with self.assertRaises(SensorReservado):
+            reclamar_reservacion('cliente', self.sensor.id, 'XYZ-987')
+
+    def test_placa_reservada_revierte_el_reclamo(self):
+        otro = Sensor.objects.create(nombre='A2', ubicacion='Norte')
+        reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+
+        with self.assertRaises(PlacaReservada):
+            reclamar_reservacion('cliente', otro.id, 'ABC-123')
+
+        otro.refresh_from_db()
+        self.assertFalse(otro.estado)
+
+    def test_query_count(self):
+        # SAVEPOINT, UPDATE del sensor, relectura, UPDATE del resumen, usuario, INSERT, RELEASE
+        with self.assertNumQueries(7):
+            reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+
+
+class PlanDeConsultasTest(TestCase):
+    # "SCAN tabla" sin índice indica un recorrido completo de la tabla en SQLite
+    RECORRIDO_COMPLETO = re.compile(r'\bSCAN (\w+)(?! USING (COVERING )?INDEX)\s*$', re.MULTILINE)
+
+    def setUp(self):
+        self.user = User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def assertUsaIndices(self, queryset):
+        plan = queryset.explain()
+        self.assertIsNone(self.RECORRIDO_COMPLETO.search(plan), f'{queryset.query}\n{plan}')
+
+    def test_consultas_de_reservacion(self):
+        self.assertUsaIndices(Reservacion.objects.filter(sensor_activado=self.sensor, active=True))
+        self.assertUsaIndices(Reservacion.objects.filter(placa='ABC-123', active=True))
+        self.assertUsaIndices(
+            Reservacion.objects.activas().filter(usuario=self.user).select_related('sensor_activado')
+            .order_by('-fecha_reservacion')[:1]
+        )
+        self.assertUsaIndices(Reservacion.objects.filter(id=uuid.uuid4()))
+
+    def test_consultas_de_sensor(self):
+        self.assertUsaIndices(Sensor.objects.activos())
+        self.assertUsaIndices(Sensor.objects.inactivos())
+        self.assertUsaIndices(Sensor.objects.filter(nombre='A1'))
+        self.assertUsaIndices(Sensor.objects.activos().filter(nombre='A1'))
+
+
+class SnapshotOcupacionTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def listar(self):
+        return self.client.get(reverse('detailSensor')).json()
+
+    def test_lectura_estable_sin_consultas(self):
+        self.listar()
+        with self.assertNumQueries(0):
+            sensores = self.listar()
+        self.assertEqual(sensores, [{'id': str(self.sensor.id), 'nombre': 'A1', 'ubicacion': 'Norte', 'estado': False}])
+
+    def test_save_de_sensor_invalida(self):
+        self.listar()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.estado = True
+            self.sensor.save(update_fields=['estado'])
+        self.assertTrue(self.listar()[0]['estado'])
+
+    def test_reservacion_invalida(self):
+        self.listar()
+        with self.captureOnCommitCallbacks(execute=True):
+            reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+        self.assertTrue(self.listar()[0]['estado'])
+
+
+class LoteEventosSensorTest(TestCase):
+    def setUp(self):
+        self.a1 = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.a2 = Sensor.objects.create(nombre='A2', ubicacion='Norte')
+
+    def enviar(self, eventos):
+        return self.client.post(reverse('updateSensorBatch'), eventos, content_type='application/json')
+
+    def test_lote_en_consultas_constantes(self):
+        ahora = timezone.now().isoformat()
+        eventos = [
+            {'sensor': 'A1', 'estado': True, 'timestamp': ahora},
+            {'sensor': 'A2', 'estado': True, 'timestamp': ahora},
+            {'sensor': 'X9', 'estado': True, 'timestamp': ahora},
+            {'sensor': 'A2', 'estado': 'si', 'timestamp': ahora},
+        ]
+        # SAVEPOINT, SELECT ... IN, UPDATE, UPDATE del resumen, RELEASE
+        with self.assertNumQueries(5):
+            respuesta = self.enviar(eventos)
+
+        self.assertEqual(
+            [resultado['status'] for resultado in respuesta.json()['resultados']],
+            ['actualizado', 'actualizado', 'no_encontrado', 'invalido']
+        )
+        self.assertEqual(Sensor.objects.filter(estado=True).count(), 2)
+
+    def test_timestamp_fuera_de_rango_es_invalido(self):
+        respuesta = self.client.post(
+            reverse('updateSensorBatch'),
+            '[{"sensor": "A1", "estado": true, "timestamp": 1e20},'
+            ' {"sensor": "A2", "estado": true, "timestamp": 1e400}]',
+            content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual([resultado['status'] for resultado in respuesta.json()['resultados']], ['invalido', 'invalido'])
+
+    def test_descarta_eventos_fuera_de_orden(self):
+        antes = (timezone.now() - timedelta(minutes=5)).isoformat()
+        despues = timezone.now().isoformat()
+        respuesta = self.enviar([
+            {'sensor': 'A1', 'estado': True, 'timestamp': despues},
+            {'sensor': 'A1', 'estado': False, 'timestamp': antes},
+            {'sensor': 'A2', 'estado': True, 'timestamp': antes},
+        ])
+
+        self.assertEqual(
+            [resultado['status'] for resultado in respuesta.json()['resultados']],
+            ['actualizado', 'descartado', 'descartado']
+        )
+        self.a1.refresh_from_db()
+        self.assertTrue(self.a1.estado)
+
+
+class BufferSensoresTest(TestCase):
+    def setUp(self):
+        self.a1 = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.a2 = Sensor.objects.create(nombre='A2', ubicacion='Norte')
+        Sensor.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        # Sin hilo de fondo: las pruebas vacían el buffer explícitamente
+        self.buffer = BufferSensores(capacidad=2, antiguedad_maxima=60)
+        parche = mock.patch.object(self.buffer, '_iniciar')
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_conserva_el_ultimo_estado_y_escribe_solo_cambios(self):
+        ahora = timezone.now()
+        for segundos, estado in [(3, True), (2, False), (1, True)]:
+            self.buffer.reportar('A1', estado, ahora - timedelta(seconds=segundos))
+        # Un reporte atrasado no reemplaza al pendiente
+        self.buffer.reportar('A1', False, ahora - timedelta(seconds=10))
+        self.buffer.reportar('A2', False, ahora)
+        self.assertEqual(self.buffer.pendientes(), 2)
+
+        self.assertEqual(self.buffer.vaciar(), 1)
+        self.assertEqual(self.buffer.pendientes(), 0)
+        self.a1.refresh_from_db()
+        self.a2.refresh_from_db()
+        self.assertTrue(self.a1.estado)
+        self.assertEqual(self.a2.version, 0)
+        self.assertEqual(ResumenOcupacion.objects.get(ubicacion='Norte').ocupados, 1)
+
+        # Sin pendientes no hay consultas
+        with self.assertNumQueries(0):
+            self.assertEqual(self.buffer.vaciar(), 0)
+
+    def test_capacidad_acotada(self):
+        ahora = timezone.now()
+        self.assertTrue(self.buffer.reportar('A1', True, ahora))
+        self.assertTrue(self.buffer.reportar('A2', True, ahora))
+        self.assertFalse(self.buffer.reportar('A3', True, ahora))
+        # Un sensor ya pendiente se sigue aceptando
+        self.assertTrue(self.buffer.reportar('A1', False, ahora))
+
+    def test_endpoint_de_reportes(self):
+        with mock.patch('apps.reservation.views.sensor.buffer_sensores', self.buffer):
+            respuesta = self.client.post(reverse('sensorReport'), [
+                {'sensor': 'A1', 'estado': True, 'timestamp': timezone.now().isoformat()},
+                {'sensor': 'A2', 'estado': 'si'},
+                {'sensor': 'A2', 'estado': True, 'timestamp': 1e20},
+            ], content_type='application/json')
+
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta.json()['aceptados'], 1)
+        self.assertEqual(len(respuesta.json()['invalidos']), 2)
+        self.assertFalse(Sensor.objects.get(pk=self.a1.pk).estado)
+        self.buffer.vaciar()
+        self.assertTrue(Sensor.objects.get(pk=self.a1.pk).estado)
+
+
+class ExpiracionReservacionesTest(TestCase):
+    def setUp(self):
+        User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensores = [Sensor.objects.create(nombre=f'A{i}', ubicacion='Norte') for i in range(3)]
+        for i, sensor in enumerate(self.sensores):
+            reclamar_reservacion('cliente', sensor.id, f'ABC-{i}')
+        # Dos abandonadas y una reciente
+        for horas, placa in ((5, 'ABC-0'), (3, 'ABC-1')):
+            Reservacion.objects.filter(placa=placa).update(fecha_reservacion=timezone.now() - timedelta(hours=horas))
+
+    def test_libera_por_lotes_con_updates_de_conjunto(self):
+        # Por lote: SAVEPOINT, SELECT, UPDATE reservaciones, SELECT sensores,
+        # UPDATE sensores, UPDATE del resumen, RELEASE
+        with self.assertNumQueries(7):
+            self.assertEqual(Reservacion.objects.expirar(timezone.now() - timedelta(hours=2)), (2, 2))
+
+        self.assertEqual(list(Reservacion.objects.activas().values_list('placa', flat=True)), ['ABC-2'])
+        self.assertEqual(
+            list(Sensor.objects.filter(estado=True).values_list('nombre', flat=True)), ['A2']
+        )
+        self.assertEqual(Sensor.objects.get(nombre='A0').version, 2)
+        self.assertEqual(ResumenOcupacion.objects.diferencias(), {})
+
+    def test_barrido_registra_duracion_y_filas(self):
+        antes = estadisticas.contadores()
+        resultado = barrer(ttl=120, lote=1)
+
+        self.assertEqual((resultado['reservaciones'], resultado['sensores']), (2, 2))
+        despues = estadisticas.contadores()
+        self.assertEqual(despues['django_reservations_expired_total'] - antes['django_reservations_expired_total'], 2)
+        self.assertEqual(despues['django_reservation_sweeps_total'] - antes['django_reservation_sweeps_total'], 1)
+        self.assertGreater(despues['django_reservation_sweep_duration_seconds_total'], antes['django_reservation_sweep_duration_seconds_total'])
+
+    def test_comando_sin_reservaciones_vencidas(self):
+        salida = io.StringIO()
+        call_command('expirar_reservaciones', '--ttl', '600', stdout=salida)
+        self.assertEqual(json.loads(salida.getvalue())['reservaciones'], 0)
+        self.assertEqual(Reservacion.objects.activas().count(), 3)
+
+
+class DisponibilidadTest(TestCase):
+    def setUp(self):
+        User.objects.create(username='cliente', email='cliente@example.com')
+        self.a1 = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.a2 = Sensor.objects.create(nombre='A2', ubicacion='Norte')
+        self.b1 = Sensor.objects.create(nombre='B1', ubicacion='Sur')
+        disponibilidad.invalidar()
+
+    def disponibles(self, **parametros):
+        return self.client.get(reverse('sensorAvailable'), parametros).json()
+
+    def test_deltas_de_estado_sin_reconstruir(self):
+        self.assertEqual(self.disponibles(ubicacion='Norte')['libres'], 2)
+        reconstrucciones = disponibilidad.reconstrucciones
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reclamar_reservacion('cliente', self.a1.id, 'ABC-123')
+        with self.assertNumQueries(0):
+            datos = self.disponibles(ubicacion='Norte')
+        self.assertEqual([sensor['nombre'] for sensor in datos['sensores']], ['A2'])
+        self.assertEqual(disponibilidad.reconstrucciones, reconstrucciones)
+
+        datos = self.disponibles(limite=2)
+        self.assertEqual([sensor['nombre'] for sensor in datos['sensores']], ['A2', 'B1'])
+        self.assertEqual(datos['libres'], 2)
+
+    def test_cambios_no_vistos_reconstruyen(self):
+        self.disponibles()
+        # Otro proceso avanzó la versión compartida
+        get_cache().incr('ocupacion:version')
+        with self.assertNumQueries(1):
+            self.disponibles()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.b1.delete()
+            Sensor.objects.create(nombre='B2', ubicacion='Sur')
+        self.assertEqual([sensor['nombre'] for sensor in self.disponibles(ubicacion='Sur')['sensores']], ['B2'])
+
+    def test_limite_invalido(self):
+        respuesta = self.client.get(reverse('sensorAvailable'), {'limite': 0})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+TARIFAS_PRUEBA = {
+    '*': {'bandas': [(0, 7, 500), (7, 22, 1000), (22, 24, 500)], 'fraccion_minutos': 15, 'minimo': 0},
+    'Centro': {'bandas': [(0, 24, 2000)], 'minimo': 300},
+}
+
+
+@override_settings(TARIFAS=TARIFAS_PRUEBA)
+class TarifasTest(TestCase):
+    def fecha(self, dia, hora, minuto=0):
+        return timezone.make_aware(timezone.datetime(2024, 3, dia, hora, minuto))
+
+    def test_bandas_fracciones_y_minimo(self):
+        casos = [
+            ((1, 8), (1, 9), 'Norte', 1000),
+            # Cruza de la banda diurna a la nocturna
+            ((1, 21, 30), (1, 22, 30), 'Norte', 750),
+            # Un minuto cobra la fracción de 15
+            ((1, 8), (1, 8, 1), 'Norte', 250),
+            # Dos días completos: 2 x (7 x 500 + 15 x 1000 + 2 x 500)
+            ((1, 8), (3, 8), 'Norte', 39000),
+            ((1, 8), (1, 8, 5), 'Centro', 300),
+            ((1, 8), (1, 10), None, 2000),
+        ]
+        for inicio, fin, ubicacion, esperado in casos:
+            with self.subTest(inicio=inicio, fin=fin, ubicacion=ubicacion):
+                self.assertEqual(tarifas.precio(self.fecha(*inicio), self.fecha(*fin), False, ubicacion), esperado)
+
+        # Activa: se cobra hasta ahora
+        self.assertEqual(tarifas.precio(self.fecha(1, 8), None, True, 'Norte', ahora=self.fecha(1, 9)), 1000)
+
+    def test_lote_por_columnas_coincide_con_instancias(self):
+        usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        sensores = [Sensor.objects.create(nombre='A1', ubicacion='Norte'), Sensor.objects.create(nombre='C1', ubicacion='Centro')]
+        for i in range(6):
+            Reservacion.objects.create(
+                usuario=usuario, sensor_activado=sensores[i % 2], placa=f'P-{i}',
+                fecha_reservacion=self.fecha(1, 5 + 3 * i), active=False
+            )
+        Reservacion.objects.update(updated_at=models.F('fecha_reservacion') + timedelta(minutes=100))
+
+        ahora = timezone.now()
+        esperados = {
+            reservacion.id: tarifas.precio_reservacion(reservacion, ahora)
+            for reservacion in Reservacion.objects.select_related('sensor_activado')
+        }
+        with self.assertNumQueries(1):
+            calculados = dict(tarifas.tarifar(Reservacion.objects.all(), ahora, lote=4))
+        self.assertEqual(calculados, esperados)
+
+    def test_get_one_by_id_devuelve_precio(self):
+        usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        sensor = Sensor.objects.create(nombre='C1', ubicacion='Centro')
+        reservacion = Reservacion.objects.create(
+            usuario=usuario, sensor_activado=sensor, placa='P-1', fecha_reservacion=self.fecha(1, 8), active=False
+        )
+        Reservacion.objects.filter(pk=reservacion.pk).update(updated_at=self.fecha(1, 9, 30))
+
+        with self.assertNumQueries(1):
+            respuesta = self.client.post(
+                reverse('get_one_by_id'), {'reservacionId': str(reservacion.id)}, content_type='application/json'
+            )
+        self.assertEqual(respuesta.json()['precio'], '30.00')
+
+    def test_a_moneda_es_exacto(self):
+        self.assertEqual(tarifas.a_moneda(1999), Decimal('19.99'))
+        self.assertEqual(str(tarifas.a_moneda(10)), '0.10')
+        self.assertEqual(sum(tarifas.a_moneda(10) for _ in range(3)), Decimal('0.30'))
+
+
+class TarifaConfiguracionTest(SimpleTestCase):
+    def test_tarifas_solo_desde_settings(self):
+        with self.settings(TARIFAS=None):
+            with self.assertRaises(ImproperlyConfigured):
+                tarifas.obtener_tarifario()
+
+    def test_bandas_incompletas(self):
+        with self.assertRaises(ImproperlyConfigured):
+            tarifas.Tarifa([(0, 7, 500), (8, 24, 1000)])
+        with self.assertRaises(ImproperlyConfigured):
+            tarifas.Tarifario({'Norte': {'bandas': [(0, 24, 100)]}})
+
+
+class ExportacionReservacionesTest(TestCase):
+    def setUp(self):
+        usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.inicio = timezone.now() - timedelta(days=10)
+        for dia in range(5):
+            Reservacion.objects.create(
+                usuario=usuario, sensor_activado=sensor, placa=f'P,{dia}',
+                fecha_reservacion=self.inicio + timedelta(days=dia), active=False
+            )
+
+    def exportar(self, **parametros):
+        respuesta = self.client.get(reverse('exportar_reservaciones'), {
+            'desde': (self.inicio + timedelta(days=1)).isoformat(),
+            'hasta': (self.inicio + timedelta(days=4)).isoformat(),
+            **parametros,
+        })
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_csv_en_streaming_por_rango(self):
+        respuesta, contenido = self.exportar()
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        filas = list(csv.DictReader(io.StringIO(contenido.decode())))
+        self.assertEqual([fila['placa'] for fila in filas], ['P,1', 'P,2', 'P,3'])
+        self.assertEqual((filas[0]['usuario'], filas[0]['sensor'], filas[0]['ubicacion']), ('cliente', 'A1', 'Norte'))
+
+    def test_ndjson_con_gzip(self):
+        respuesta, contenido = self.exportar(formato='ndjson', gzip='1')
+        self.assertEqual(respuesta['Content-Type'], 'application/gzip')
+        lineas = gzip.decompress(contenido).decode().splitlines()
+        self.assertEqual([json.loads(linea)['placa'] for linea in lineas], ['P,1', 'P,2', 'P,3'])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.client.get(reverse('exportar_reservaciones')).status_code, 400)
+        respuesta = self.client.get(reverse('exportar_reservaciones'), {'desde': self.inicio.isoformat(), 'formato': 'xml'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_comando_escribe_archivo(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'reservaciones.ndjson')
+            call_command(
+                'exportar_reservaciones', '--desde', self.inicio.isoformat(), '--formato', 'ndjson', '--salida', ruta
+            )
+            with open(ruta, encoding='utf-8') as archivo:
+                self.assertEqual(len(archivo.read().splitlines()), 5)
+
+
+class ResumenOcupacionTest(TestCase):
+    def setUp(self):
+        self.a1 = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.a2 = Sensor.objects.create(nombre='A2', ubicacion='Norte')
+        self.b1 = Sensor.objects.create(nombre='B1', ubicacion='Sur')
+        User.objects.create(username='cliente', email='cliente@example.com')
+
+    def resumen(self):
+        return {
+            fila['ubicacion']: (fila['libres'], fila['ocupados'], fila['inactivos'])
+            for fila in self.client.get(reverse('sensorSummary')).json()['ubicaciones']
+        }
+
+    def test_contadores_siguen_los_cambios(self):
+        reclamar_reservacion('cliente', self.a1.id, 'ABC-123')
+        Sensor.objects.alternar_estado(nombre='B1')
+        self.a2.active = False
+        self.a2.save()
+        self.b1.delete()  # borrado lógico: active=False
+        aplicar_eventos_sensor([{'sensor': 'A1', 'estado': False, 'timestamp': timezone.now().isoformat()}])
+
+        self.assertEqual(self.resumen(), {'Norte': (2, 0, 1), 'Sur': (0, 1, 1)})
+        self.assertEqual(ResumenOcupacion.objects.diferencias(), {})
+
+    def test_resumen_sin_count_sobre_sensor(self):
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(reverse('sensorSummary'))
+        self.assertEqual(respuesta.json()['totales'], {'libres': 3, 'ocupados': 0, 'inactivos': 0})
+
+    def test_reconstruir_corrige_desfase(self):
+        Sensor.objects.filter(nombre='A1').update(estado=True)
+        self.assertEqual(set(ResumenOcupacion.objects.diferencias()), {'Norte'})
+
+        ResumenOcupacion.objects.reconstruir()
+        self.assertEqual(ResumenOcupacion.objects.diferencias(), {})
+        self.assertEqual(Sensor.objects.contar_activos(), 1)
+
+
+class ArchivoReservacionesTest(TestCase):
+    def setUp(self):
+        self.usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        ahora = timezone.now()
+        self.viejas = [
+            Reservacion.objects.create(
+                usuario=self.usuario, sensor_activado=self.sensor, placa=f'OLD-{i}',
+                fecha_reservacion=ahora - timedelta(days=60, minutes=i), active=False
+            )
+            for i in range(5)
+        ]
+        self.reciente = Reservacion.objects.create(
+            usuario=self.usuario, sensor_activado=self.sensor, placa='NEW-1',
+            fecha_reservacion=ahora - timedelta(days=1), active=False
+        )
+        self.activa = Reservacion.objects.create(
+            usuario=self.usuario, sensor_activado=self.sensor, placa='NEW-2',
+            fecha_reservacion=ahora - timedelta(days=90), active=True
+        )
+
+    def test_archiva_por_lotes(self):
+        call_command('archivar_reservaciones', dias=30, lote=2, stdout=io.StringIO())
+
+        self.assertEqual(
+            set(Reservacion.objects.values_list('placa', flat=True)), {'NEW-1', 'NEW-2'}
+        )
+        historica = ReservacionHistorica.objects.get(pk=self.viejas[0].pk)
+        self.assertEqual(historica.created_at, self.viejas[0].created_at)
+        self.assertEqual(ReservacionHistorica.objects.count(), 5)
+
+    def test_historial_une_ambas_tablas(self):
+        Reservacion.objects.archivar(timezone.now() - timedelta(days=30))
+
+        detalle = self.client.get(reverse('getIdReservation', args=[self.viejas[0].pk]))
+        self.assertEqual(detalle.json()['placa'], 'OLD-0')
+
+        vivas = self.client.get(reverse('all_reservations'), {'limit': 10}).json()['results']
+        self.assertEqual(len(vivas), 2)
+        pagina = self.client.get(reverse('all_reservations'), {'limit': 4, 'historial': 1}).json()
+        siguiente = self.client.get(
+            reverse('all_reservations'), {'limit': 4, 'historial': 1, 'after': pagina['next']}
+        ).json()
+        placas = [fila['placa'] for fila in pagina['results'] + siguiente['results']]
+        self.assertEqual(placas, ['NEW-2', 'OLD-4', 'OLD-3', 'OLD-2', 'OLD-1', 'OLD-0', 'NEW-1'])
+
+
+class AnaliticaOcupacionTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        self.a1 = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.b1 = Sensor.objects.create(nombre='B1', ubicacion='Sur')
+        self.inicio = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=2)
+        # (sensor, minuto de inicio, minutos de duración)
+        for i, (sensor, desde, minutos) in enumerate([(self.a1, 10, 30), (self.a1, 50, 20), (self.b1, 70, 15)]):
+            reservacion = Reservacion.objects.create(
+                usuario=usuario, sensor_activado=sensor, placa=f'P-{i}',
+                fecha_reservacion=self.inicio + timedelta(minutes=desde), active=False
+            )
+            Reservacion.objects.filter(pk=reservacion.pk).update(
+                updated_at=reservacion.fecha_reservacion + timedelta(minutes=minutos)
+            )
+        Reservacion.objects.archivar(self.inicio + timedelta(minutes=60))
+
+    def consultar(self, **parametros):
+        parametros = {'desde': self.inicio.isoformat(), 'hasta': (self.inicio + timedelta(hours=2)).isoformat(), **parametros}
+        return self.client.get(reverse('analitica_ocupacion'), parametros)
+
+    def test_agrega_por_hora_y_cachea_rangos_cerrados(self):
+        resultados = self.consultar().json()['resultados']
+        # La reservación de A1 de 50 a 70 minutos reparte 10 minutos en cada hora
+        self.assertEqual(
+            [(fila['sensor'], fila['reservaciones'], fila['minutosOcupados']) for fila in resultados],
+            [('A1', 2, 40.0), ('A1', 0, 10.0), ('B1', 1, 15.0)]
+        )
+        self.assertEqual(resultados[1]['periodo'], (self.inicio + timedelta(hours=1)).isoformat())
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.consultar().json()['resultados'], resultados)
+
+    def test_reservacion_larga_se_reparte_entre_periodos(self):
+        sensor = Sensor.objects.create(nombre='C1', ubicacion='Centro')
+        reservacion = Reservacion.objects.create(
+            usuario=User.objects.get(username='cliente'), sensor_activado=sensor, placa='LARGA',
+            fecha_reservacion=self.inicio + timedelta(minutes=30), active=False
+        )
+        Reservacion.objects.filter(pk=reservacion.pk).update(updated_at=self.inicio + timedelta(hours=3, minutes=30))
+
+        parametros = {'hasta': (self.inicio + timedelta(hours=5)).isoformat(), 'ubicacion': 'Centro'}
+        resultados = self.consultar(**parametros).json()['resultados']
+        self.assertEqual(
+            [(fila['periodo'], fila['reservaciones'], fila['minutosOcupados']) for fila in resultados],
+            [((self.inicio + timedelta(hours=hora)).isoformat(), int(hora == 0), 30.0 if hora in (0, 3) else 60.0)
+             for hora in range(4)]
+        )
+        # Por día los minutos suman la duración completa aunque cruce la medianoche
+        total = sum(fila['minutosOcupados'] for fila in self.consultar(periodo='dia', **parametros).json()['resultados'])
+        self.assertEqual(total, 180.0)
+
+    def test_por_dia_y_ubicacion(self):
+        resultados = self.consultar(periodo='dia', ubicacion='Sur').json()['resultados']
+        self.assertEqual([(fila['ubicacion'], fila['reservaciones']) for fila in resultados], [('Sur', 1)])
+        self.assertEqual(self.consultar(periodo='semana').status_code, 400)
+
+    def test_sensores_por_rango_de_fechas(self):
+        sensores = Sensor.objects.por_rango_de_fechas(self.inicio + timedelta(minutes=60), self.inicio + timedelta(hours=2))
+        self.assertEqual(list(sensores), [self.b1])
+
+
+class PresupuestoConsultasTest(TransactionTestCase):
+    # Fuera de la transacción de TestCase: BEGIN y COMMIT se cuentan y los bloques
+    # atomic(savepoint=False) emiten sus sentencias, igual que en benchmark_endpoints
+    def setUp(self):
+        caches['default'].clear()
+        get_cache().clear()
+        identidades.usuarios.limpiar()
+        identidades.sensores.limpiar()
+        self.datos = datos_de_referencia(sembrar_datos(usuarios=5, sensores=30, ubicaciones=3, reservaciones=300, activas=5))
+
+    def test_endpoints_dentro_del_presupuesto(self):
+        for nombre, resultado in medir_endpoints(self.client, self.datos, repeticiones=2).items():
+            with self.subTest(endpoint=nombre):
+                self.assertLessEqual(resultado['consultas'], resultado['presupuesto'])
+
+
+class MetricasTest(TestCase):
+    def setUp(self):
+        registro.reiniciar()
+        get_cache().clear()
+        Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def metricas(self):
+        return self.client.get(reverse('metrics')).content.decode()
+
+    def test_expone_contadores_e_histogramas(self):
+        self.client.get(reverse('detailSensor'))
+        self.client.get(reverse('detailSensor'))
+        texto = self.metricas()
+
+        self.assertIn('django_http_requests_total{view="detailSensor",method="GET",status="200"} 2', texto)
+        self.assertIn('django_http_request_duration_seconds_count{view="detailSensor"} 2', texto)
+        self.assertIn('django_http_request_duration_seconds_bucket{view="detailSensor",le="+Inf"} 2', texto)
+        # La primera petición construye la instantánea; la segunda sale de la caché
+        self.assertIn('django_db_queries_total{view="detailSensor"} 1', texto)
+        self.assertRegex(texto, r'django_http_response_size_bytes_sum\{view="detailSensor"\} \d+')
+
+    async def test_cadena_asincrona(self):
+        await self.async_client.get(reverse('detailSensor'))
+        texto = (await self.async_client.get(reverse('metrics'))).content.decode()
+
+        self.assertIn('django_http_requests_total{view="detailSensor",method="GET",status="200"} 1', texto)
+        self.assertIn('django_db_queries_total{view="detailSensor"} 1', texto)
+
+    def test_no_fuerza_la_cadena_sincrona(self):
+        async def vista(request):
+            return HttpResponse()
+
+        self.assertTrue(iscoroutinefunction(MetricasMiddleware(vista)))
+        self.assertFalse(iscoroutinefunction(MetricasMiddleware(lambda request: HttpResponse())))
+
+    def test_cuenta_las_consultas_de_todas_las_bases(self):
+        class Conexion:
+            def __init__(self):
+                self.envolturas = []
+
+            @contextmanager
+            def execute_wrapper(self, envoltura):
+                self.envolturas.append(envoltura)
+                try:
+                    yield
+                finally:
+                    self.envolturas.remove(envoltura)
+
+        conexiones = {'default': Conexion(), 'replica': Conexion()}
+        with mock.patch('apps.reservation.middleware.connections', conexiones):
+            pila = instalar_contador('contador')
+        self.assertEqual([conexion.envolturas for conexion in conexiones.values()], [['contador'], ['contador']])
+        pila.close()
+        self.assertEqual([conexion.envolturas for conexion in conexiones.values()], [[], []])
+
+    def test_suma_los_archivos_de_otros_procesos(self):
+        with tempfile.TemporaryDirectory() as directorio, self.settings(METRICAS_DIR=directorio):
+            otro = RegistroMetricas()
+            otro.registrar('detailSensor', 'GET', 200, 0.02, 3, 0.001, 100)
+            with open(os.path.join(directorio, 'metricas-1.json'), 'w') as archivo:
+                json.dump(otro.datos(), archivo)
+
+            self.client.get(reverse('detailSensor'))
+            texto = self.metricas()
+
+        self.assertIn('django_http_requests_total{view="detailSensor",method="GET",status="200"} 2', texto)
+        self.assertIn('django_db_queries_total{view="detailSensor"} 4', texto)
+
+
+class PerfilSQLiteTest(TestCase):
+    def test_router_envia_lecturas_marcadas_a_la_replica(self):
+        router = ReplicaRouter()
+        leer = lectura_en_replica(lambda request: router.db_for_read(Sensor))
+
+        self.assertEqual(router.db_for_read(Sensor), 'default')
+        # El TestCase corre dentro de una transacción: se lee de la principal
+        self.assertEqual(leer(None), 'default')
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            self.assertEqual(leer(None), 'replica')
+        self.assertEqual(router.db_for_write(Sensor), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'reservation'))
+
+    def test_pragmas_al_abrir_la_conexion(self):
+        with self.settings(SQLITE_PRAGMAS={'cache_size': -1234}):
+            configurar_sqlite(sender=None, connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+
+class RegistroEstructuradoTest(TestCase):
+    def setUp(self):
+        self.salida = io.StringIO()
+        self.handler = ColaHandler()
+        destino = self.handler.listener.handlers[0]
+        destino.setStream(self.salida)
+        self.handler.addFilter(IdPeticionFilter())
+        self.logger = logging.getLogger('apps.reservation.pruebas')
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def registros(self):
+        self.handler.detener()
+        return [json.loads(linea) for linea in self.salida.getvalue().splitlines()]
+
+    def test_json_con_id_de_peticion_sin_consultas(self):
+        Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        token = id_peticion.set('abc123')
+        try:
+            with self.assertNumQueries(0):
+                self.logger.info('Sensores: %s', Sensor.objects.all(), extra={'ubicacion': 'Norte'})
+        finally:
+            id_peticion.reset(token)
+
+        registro, = self.registros()
+        self.assertEqual(registro['request_id'], 'abc123')
+        self.assertEqual(registro['ubicacion'], 'Norte')
+        self.assertIn('QuerySet object at', registro['message'])
+
+    def test_muestreo_conserva_advertencias(self):
+        muestreo = MuestreoFilter(tasa=0)
+        self.logger.addFilter(muestreo)
+        try:
+            self.logger.debug('descartado')
+            self.logger.warning('conservado')
+        finally:
+            self.logger.removeFilter(muestreo)
+        self.assertEqual([registro['message'] for registro in self.registros()], ['conservado'])
+
+    def test_respuesta_lleva_x_request_id(self):
+        respuesta = self.client.get(reverse('sensorSummary'), HTTP_X_REQUEST_ID='peticion-1')
+        self.assertEqual(respuesta.headers['X-Request-ID'], 'peticion-1')
+
+    async def test_id_de_peticion_en_la_cadena_asincrona(self):
+        async def vista(request):
+            return HttpResponse(id_peticion.get())
+
+        middleware = IdPeticionMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        respuesta = await middleware(AsyncRequestFactory().get('/', headers={'X-Request-ID': 'peticion-2'}))
+        self.assertEqual((respuesta.content, respuesta.headers['X-Request-ID']), (b'peticion-2', 'peticion-2'))
+
+
+class IdentidadesTest(TestCase):
+    def setUp(self):
+        identidades.usuarios.limpiar()
+        identidades.sensores.limpiar()
+        self.usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def test_aciertos_y_fallos(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(id_usuario('cliente'), self.usuario.id)
+            self.assertEqual(id_usuario('cliente'), self.usuario.id)
+        self.assertIsNone(id_usuario('nadie'))
+        self.assertEqual(identidades.usuarios.estadisticas(), {'aciertos': 1, 'fallos': 2, 'entradas': 1})
+        self.assertIn(
+            'django_identity_cache_requests_total{cache="usuarios",result="hit"} 1',
+            self.client.get(reverse('metrics')).content.decode()
+        )
+
+    def test_invalidacion_por_senales(self):
+        id_sensor('A1')
+        self.sensor.nombre = 'A2'
+        self.sensor.save()
+        self.assertIsNone(id_sensor('A1'))
+        self.assertEqual(id_sensor('A2'), self.sensor.id)
+
+        # Otro A2 en otra ubicación hace ambiguo el nombre
+        Sensor.objects.create(nombre='A2', ubicacion='Sur')
+        self.assertIsNone(id_sensor('A2'))
+
+    def test_lru_acotado(self):
+        resolutor = identidades.ResolutorIdentidades('prueba', lambda clave: clave.upper(), capacidad=2)
+        for clave in ('a', 'b', 'a', 'c'):
+            resolutor.resolver(clave)
+        self.assertEqual(list(resolutor._entradas), ['a', 'c'])
+
+    def test_liberar_sin_leer_el_sensor(self):
+        reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+        id_sensor('A1')
+        respuesta = self.client.post(reverse('actualizar_reservacion'), {'sensorName': 'A1'}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(Reservacion.objects.get(placa='ABC-123').active)
+
+
+class IdempotenciaTest(TestCase):
+    def setUp(self):
+        User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def reservar(self, clave, placa='ABC-123'):
+        return self.client.post(
+            reverse('crear_reservacion'),
+            {'username': 'cliente', 'sensorId': str(self.sensor.id), 'placa': placa},
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY=clave
+        )
+
+    def test_reintento_devuelve_la_respuesta_guardada(self):
+        primera = self.reservar('k-1')
+        self.assertEqual(primera.status_code, 200)
+
+        # Solo se consulta la clave: ni Reservacion ni Sensor
+        with self.assertNumQueries(1):
+            repetida = self.reservar('k-1')
+        self.assertEqual(repetida.content, primera.content)
+        self.assertEqual(repetida.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(Reservacion.objects.count(), 1)
+
+        # Otra clave vuelve a ejecutar la vista y recibe el conflicto
+        self.assertEqual(self.reservar('k-2').status_code, 400)
+
+    def test_clave_con_otro_cuerpo_o_en_curso(self):
+        self.reservar('k-1')
+        self.assertEqual(self.reservar('k-1', placa='XYZ-999').status_code, 422)
+
+        ClaveIdempotencia.objects.create(
+            endpoint='reservacion/save', clave='k-3', huella=hashlib.sha256(b'{}').hexdigest(),
+            expira_at=timezone.now() + timedelta(minutes=1)
+        )
+        respuesta = self.client.post(
+            reverse('crear_reservacion'), {}, content_type='application/json', HTTP_IDEMPOTENCY_KEY='k-3'
+        )
+        self.assertEqual(respuesta.status_code, 409)
+
+    def test_clave_vencida_se_vuelve_a_ejecutar(self):
+        self.reservar('k-1')
+        ClaveIdempotencia.objects.update(expira_at=timezone.now() - timedelta(seconds=1))
+        respuesta = self.reservar('k-1')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertNotIn('Idempotent-Replayed', respuesta.headers)
+
+    def test_concesion_en_curso_expirada_se_retoma(self):
+        cuerpo = json.dumps({'username': 'cliente', 'sensorId': str(self.sensor.id), 'placa': 'ABC-123'})
+        ClaveIdempotencia.objects.create(
+            endpoint='reservacion/save', clave='k-1', huella=hashlib.sha256(cuerpo.encode()).hexdigest(),
+            expira_at=timezone.now() - timedelta(seconds=1)
+        )
+        respuesta = self.reservar('k-1')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(ClaveIdempotencia.objects.get(clave='k-1').status, 200)
+        # Completada, la clave dura el ttl completo y no la concesión
+        self.assertGreater(
+            ClaveIdempotencia.objects.get(clave='k-1').expira_at, timezone.now() + timedelta(hours=1)
+        )
+
+    def test_el_barrido_purga_las_claves_vencidas(self):
+        self.reservar('k-1')
+        self.reservar('k-2', placa='XYZ-999')
+        ClaveIdempotencia.objects.filter(clave='k-1').update(expira_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(barrer()['claves'], 1)
+        self.assertEqual(list(ClaveIdempotencia.objects.values_list('clave', flat=True)), ['k-2'])
+
+
+class EstadoSensorTest(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def actualizar(self, datos):
+        return self.client.post(reverse('updateSensor'), datos, content_type='application/json')
+
+    def test_alternar_en_un_update(self):
+        # UPDATE por nombre, SELECT de relectura y UPDATE del resumen, sin leer el
+        # sensor antes (la transacción es la del TestCase)
+        with self.assertNumQueries(3):
+            respuesta = self.actualizar({'nombre_sensor': 'A1'})
+
+        self.assertEqual(respuesta.json()['estado'], True)
+        self.assertEqual(respuesta.json()['version'], 1)
+        self.assertFalse(self.actualizar({'nombre_sensor': 'A1'}).json()['estado'])
+
+    def test_compare_and_set(self):
+        self.assertEqual(self.actualizar({'nombre_sensor': 'A1', 'estado': True, 'version': 0}).status_code, 200)
+
+        respuesta = self.actualizar({'nombre_sensor': 'A1', 'estado': False, 'version': 0})
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['version'], 1)
+
+    def test_sensor_inexistente(self):
+        self.assertEqual(self.actualizar({'nombre_sensor': 'X9'}).status_code, 404)
+
+    def test_base_bloqueada_es_503(self):
+        with mock.patch.object(Sensor.objects, 'alternar_estado', side_effect=OperationalError('database is locked')):
+            respuesta = self.actualizar({'nombre_sensor': 'A1'})
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertIn('locked', respuesta.json()['error'])
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        self.reservacion = reclamar_reservacion('cliente', self.sensor.id, 'ABC-123')
+
+    def revalidar(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+
+    def test_304_sin_construir_la_respuesta(self):
+        urls = [
+            reverse('detailSensor'),
+            reverse('detailOneSensor', args=[self.sensor.id]),
+            reverse('getIdReservation', args=[self.reservacion.id]),
+            reverse('all_reservations') + '?limit=10',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                respuesta = self.revalidar(url)
+                self.assertEqual(respuesta.status_code, 304)
+
+        # Solo la consulta de la firma
+        etag = self.client.get(urls[2])['ETag']
+        with self.assertNumQueries(1):
+            self.client.get(urls[2], HTTP_IF_NONE_MATCH=etag)
+
+    def test_if_modified_since(self):
+        url = reverse('getIdReservation', args=[self.reservacion.id])
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_evento_con_timestamp_atrasado_invalida_el_listado(self):
+        url = reverse('all_reservations') + '?limit=10'
+        etag = self.client.get(url)['ETag']
+        # La firma del listado no consulta la base
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Sensor.objects.filter(pk=self.sensor.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('updateSensorBatch'), [
+                {'sensor': 'A1', 'estado': False, 'timestamp': (timezone.now() - timedelta(hours=1)).isoformat()},
+            ], content_type='application/json')
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.json()['results'][0]['sensor_activado']['estado'])
+
+    def test_check_de_despliegue_exige_cache_compartida(self):
+        self.assertEqual([aviso.id for aviso in cache_ocupacion_compartida(None)], ['reservation.W001'])
+        compartida = {
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'ocupacion': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/ocupacion'},
+        }
+        with override_settings(CACHES=compartida):
+            self.assertEqual(cache_ocupacion_compartida(None), [])
+
+    def test_cambio_de_estado_invalida_el_etag(self):
+        url = reverse('getIdReservation', args=[self.reservacion.id])
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            liberar_reservacion(self.reservacion)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(
+            self.client.get(reverse('detailSensor'), HTTP_IF_NONE_MATCH=etag).status_code, 200
+        )
+
+
+class PaginacionReservacionesTest(TestCase):
+    def setUp(self):
+        usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        ahora = timezone.now()
+        self.ids = [
+            str(Reservacion.objects.create(
+                usuario=usuario, placa=f'P-{i}', fecha_reservacion=ahora + timedelta(seconds=i), active=False
+            ).id)
+            for i in range(5)
+        ]
+
+    def listar(self, **parametros):
+        return self.client.get(reverse('all_reservations'), parametros)
+
+    def test_recorrido_con_cursor(self):
+        ids, parametros = [], {'limit': 2}
+        while True:
+            respuesta = self.listar(**parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            pagina = respuesta.json()
+            self.assertLessEqual(len(pagina['results']), 2)
+            ids += [reservacion['idReservacion'] for reservacion in pagina['results']]
+            if pagina['next'] is None:
+                break
+            parametros['after'] = pagina['next']
+        self.assertEqual(ids, self.ids)
+
+    def test_cursor_mal_formado_o_alterado(self):
+        def cursor(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        valido = self.listar(limit=2).json()['next']
+        fecha, reservacion_id = base64.urlsafe_b64decode(valido).decode().split('|')
+        cursores = [
+            'no-es-base64!',
+            'Zm9v',
+            cursor(f'{fecha}|no-es-uuid'),
+            cursor(f'no-es-fecha|{reservacion_id}'),
+            cursor(f'{fecha}|{reservacion_id}|extra'),
+            # Sin zona horaria
+            cursor(f'{fecha[:19]}|{reservacion_id}'),
+        ]
+        for alterado in cursores:
+            with self.subTest(cursor=alterado):
+                respuesta = self.listar(limit=2, after=alterado)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertEqual(respuesta.json()['status'], 'error')
+
+    def test_limites_de_limit(self):
+        for limit in ('0', '-1', 'diez', '1.5'):
+            with self.subTest(limit=limit):
+                self.assertEqual(self.listar(limit=limit).status_code, 400)
+
+        self.assertEqual(len(self.listar(limit=1).json()['results']), 1)
+        # Por encima del máximo se recorta en lugar de rechazarse
+        with mock.patch('apps.reservation.views.reservacion.MAX_PAGE_SIZE', 3):
+            pagina = self.listar(limit=1000).json()
+        self.assertEqual(len(pagina['results']), 3)
+        self.assertIsNotNone(pagina['next'])
+
+    def test_listado_completo_en_streaming(self):
+        respuesta = self.listar()
+        self.assertTrue(respuesta.streaming)
+        reservaciones = json.loads(b''.join(respuesta.streaming_content))
+        self.assertEqual([reservacion['idReservacion'] for reservacion in reservaciones], self.ids)
+
+        # Varios bloques se unen con comas y una base vacía es una lista vacía
+        filas = RESERVACION_LISTADO.valores(Reservacion.objects.all()).order_by('fecha_reservacion', 'id')
+        for chunk_size in (1, 2, 5):
+            with self.subTest(chunk_size=chunk_size):
+                contenido = b''.join(stream_reservations(filas.iterator(), chunk_size=chunk_size))
+                self.assertEqual([reservacion['idReservacion'] for reservacion in json.loads(contenido)], self.ids)
+        self.assertEqual(b''.join(stream_reservations(iter([]))), b'[]')
+
+
+class SerializadoresTest(TestCase):
+    def test_misma_salida_que_la_serializacion_por_instancias(self):
+        from apps.reservation.management.commands.benchmark_serializacion import (
+            serializar_instancias, serializar_proyeccion
+        )
+        usuario = User.objects.create(username='cliente', email='cliente@example.com')
+        sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        ahora = timezone.now()
+        Reservacion.objects.create(usuario=usuario, sensor_activado=sensor, placa='ABC-1', fecha_reservacion=ahora)
+        Reservacion.objects.create(usuario=usuario, placa='ABC-2', fecha_reservacion=ahora + timedelta(seconds=1))
+
+        queryset = Reservacion.objects.order_by('fecha_reservacion')
+        self.assertEqual(
+            json.loads(serializar_proyeccion(queryset).content),
+            json.loads(serializar_instancias(queryset).content)
+        )
+
+
+class EventosSensorTest(TestCase):
+    def setUp(self):
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def leer(self, hub, last_event_id=None):
+        return ''.join(flujo_eventos(hub, last_event_id, duracion=0.05))
+
+    def test_reanuda_desde_last_event_id(self):
+        hub = HubSensores()
+        hub.publicar([(self.sensor.id, 'Norte', True, 1)])
+        hub.publicar([(self.sensor.id, 'Norte', False, 2)])
+
+        flujo = self.leer(hub, hub.id_evento(1))
+        self.assertNotIn(f'id: {hub.id_evento(1)}\n', flujo)
+        self.assertIn(f'id: {hub.id_evento(2)}\n', flujo)
+        self.assertIn('"estado": false, "version": 2', flujo)
+
+    def test_reset_si_el_buffer_ya_no_tiene_el_evento(self):
+        hub = HubSensores(capacidad=2)
+        for version in range(1, 5):
+            hub.publicar([(self.sensor.id, 'Norte', version % 2 == 1, version)])
+
+        self.assertIn('event: reset', self.leer(hub, hub.id_evento(1)))
+        self.assertIn('event: reset', self.leer(hub, 'otro-proceso-1'))
+        self.assertNotIn('event: reset', self.leer(hub, hub.id_evento(3)))
+
+    def test_update_sensor_publica_el_cambio(self):
+        inicio = hub_sensores.ultimo_id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('updateSensor'), {'nombre_sensor': 'A1'}, content_type='application/json')
+
+        eventos, _ = hub_sensores.eventos_desde(inicio)
+        self.assertEqual(json.loads(eventos[-1][1]), {'id': str(self.sensor.id), 'estado': True, 'version': 1})
+
+    def test_save_sin_cambio_de_estado_no_publica(self):
+        get_cache().clear()
+        self.client.get(reverse('detailSensor'))
+        inicio = hub_sensores.ultimo_id
+
+        self.sensor.nombre = 'A2'
+        # Sin estado ni columnas del resumen en update_fields: solo el UPDATE
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(1):
+            self.sensor.save(update_fields=['nombre'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.save()
+            Sensor.objects.create(nombre='B1', ubicacion='Sur')
+
+        self.assertEqual(hub_sensores.eventos_desde(inicio)[0], [])
+        # El listado sí refleja el cambio
+        nombres = [sensor['nombre'] for sensor in self.client.get(reverse('detailSensor')).json()]
+        self.assertEqual(sorted(nombres), ['A2', 'B1'])
+
+        self.sensor.estado = True
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sensor.save()
+        eventos, _ = hub_sensores.eventos_desde(inicio)
+        self.assertEqual(len(eventos), 1)
+
+
+class AlternarEstadoConcurrenteTest(TransactionTestCase):
+    HILOS = 8
+    CAMBIOS_POR_HILO = 25
+
+    def test_sin_actualizaciones_perdidas(self):
+        Sensor.objects.create(nombre='A1', ubicacion='Norte')
+        barrera = threading.Barrier(self.HILOS)
+
+        def trabajador():
+            barrera.wait()
+            try:
+                for _ in range(self.CAMBIOS_POR_HILO):
+                    while True:
+                        try:
+                            Sensor.objects.alternar_estado(nombre='A1')
+                            break
+                        except OperationalError:
+                            time.sleep(0.001)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajador) for _ in range(self.HILOS)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        sensor = Sensor.objects.get(nombre='A1')
+        self.assertEqual(sensor.version, self.HILOS * self.CAMBIOS_POR_HILO)
+        self.assertEqual(sensor.estado, (self.HILOS * self.CAMBIOS_POR_HILO) % 2 == 1)
+
+
+class VistasAsincronasTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.factory = AsyncRequestFactory()
+        User.objects.create(username='cliente', email='cliente@example.com')
+        self.sensor = Sensor.objects.create(nombre='A1', ubicacion='Norte')
+
+    def post(self, datos):
+        return self.factory.post('/', json.dumps(datos), content_type='application/json')
+
+    async def test_ciclo_de_reservacion(self):
+        datos = {'username': 'cliente', 'sensorId': str(self.sensor.id), 'placa': 'ABC-123'}
+        with self.assertLogs('apps.reservation.views.reservacion', logging.INFO) as registros:
+            respuesta = await crear_reservacion_async(self.post(datos))
+            self.assertEqual(respuesta.status_code, 200)
+            reservacion_id = json.loads(respuesta.content)['reservacion_id']
+            self.assertEqual((await crear_reservacion_async(self.post(datos))).status_code, 400)
+
+            respuesta = await getIdReservation_async(self.factory.get('/'), reservacion_id)
+            self.assertEqual(json.loads(respuesta.content)['sensor_activado'], 'A1')
+
+            respuesta = await actualizar_reservacion_async(self.post({'sensorName': 'A1'}))
+            self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(await Reservacion.objects.filter(active=True).aexists())
+
+        # Los mismos registros que las vistas síncronas
+        self.assertEqual(
+            [registro.getMessage().split(' ')[0:2] for registro in registros.records],
+            [['Reservación', reservacion_id], ['Reservación', 'rechazada:'], ['Reservación', reservacion_id]]
+        )
+        self.assertEqual(registros.records[0].usuario, 'cliente')
+        self.assertTrue(registros.records[2].getMessage().endswith('liberada'))
+
+    async def test_detalle_de_sensores(self):
+        respuesta = await detail_sensor_async(self.factory.get('/'))
+        self.assertEqual(json.loads(respuesta.content)[0]['nombre'], 'A1')
+
+        respuesta = await detail_one_sensors_async(self.factory.get('/'), self.sensor.id)
+        self.assertEqual(json.loads(respuesta.content)['id'], str(self.sensor.id))
+
+        respuesta = await detail_one_sensors_async(self.factory.get('/'), uuid.uuid4())
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class ReclamarReservacionConcurrenteTest(TransactionTestCase):
+    HILOS = 8
+    INTENTOS_POR_HILO = 40
+    REINTENTOS = 200
+
+    def setUp(self):
+        User.objects.create(username='cliente', email='cliente@example.com')
+
+    def crear_sensores(self, cantidad):
+        sensores = [Sensor(nombre=f'S{i}', ubicacion='Centro') for i in range(cantidad)]
+        Sensor.objects.bulk_create(sensores)
+        return [sensor.id for sensor in sensores]
+
+    def ejecutar(self, reclamar, sensores_por_hilo):
+        exitos, errores = [], []
+        barrera = threading.Barrier(self.HILOS)
+
+        def trabajador(indice):
+            barrera.wait()
+            try:
+                for intento, sensor_id in enumerate(sensores_por_hilo(indice)):
+                    placa = f'P-{indice}-{intento}'
+                    for _ in range(self.REINTENTOS):
+                        try:
+                            exitos.append(reclamar('cliente', sensor_id, placa).id)
+                        except (ReservacionConflicto, IntegrityError):
+                            pass
+                        except OperationalError as e:
+                            # SQLite responde 'database is locked' al agotar la espera del bloqueo
+                            if 'locked' not in str(e):
+                                raise
+                            time.sleep(0.001)
+                            continue
+                        break
+                    else:
+                        errores.append(sensor_id)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajador, args=(i,)) for i in range(self.HILOS)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        return exitos, errores, time.perf_counter() - inicio
+
+    def test_sin_doble_reserva(self):
+        # Todos los hilos compiten por los mismos sensores
+        sensores = self.crear_sensores(10)
+        exitos, errores, _ = self.ejecutar(
+            reclamar_reservacion,
+            lambda indice: [sensores[i % len(sensores)] for i in range(self.INTENTOS_POR_HILO)]
+        )
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(exitos), len(sensores))
+        for sensor_id in sensores:
+            self.assertEqual(Reservacion.objects.filter(sensor_activado_id=sensor_id, active=True).count(), 1)
+        self.assertEqual(Sensor.objects.filter(estado=True).count(), len(sensores))
+
+    def test_sin_doble_reserva_con_sensores_distintos(self):
+        # Cada hilo reclama sensores libres distintos; el rendimiento frente a la
+        # cadena previa se mide con el comando benchmark_reclamos
+        sensores = self.crear_sensores(self.HILOS * self.INTENTOS_POR_HILO)
+        exitos, errores, _ = self.ejecutar(
+            reclamar_reservacion,
+            lambda indice: sensores[indice * self.INTENTOS_POR_HILO:(indice + 1) * self.INTENTOS_POR_HILO]
+        )
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(exitos), len(sensores))
+        self.assertEqual(Reservacion.objects.filter(active=True).count(), len(sensores))
+        self.assertEqual(
+            Reservacion.objects.filter(active=True).values('sensor_activado').distinct().count(), len(sensores)
+        )
+        self.assertEqual(Sensor.objects.filter(estado=True).count(), len(sensores))
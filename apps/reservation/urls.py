@@ -1,6 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from apps.reservation.views.reservacion import crear_reservacion, actualizar_reservacion, all_reservations, get_one_by_id, getIdReservation
-from apps.reservation.views.sensor import createSensor, detail_one_sensors,updateSensor, deleteSensor, detail_sensor
+from apps.reservation.views import reservacion, sensor
+from apps.reservation.views.reservacion import all_reservations, analitica_ocupacion, exportar_reservaciones, get_one_by_id
+from apps.reservation.views.sensor import createSensor, updateSensor, updateSensorBatch, reportarSensor, deleteSensor, sensor_disponibles, sensor_resumen
+
+# Bajo ASGI (settings.ASYNC_VIEWS) las mismas rutas usan las variantes asíncronas
+if settings.ASYNC_VIEWS:
+    crear_reservacion = reservacion.crear_reservacion_async
+    actualizar_reservacion = reservacion.actualizar_reservacion_async
+    getIdReservation = reservacion.getIdReservation_async
+    detail_sensor = sensor.detail_sensor_async
+    detail_one_sensors = sensor.detail_one_sensors_async
+    sensor_eventos = sensor.sensor_eventos_async
+else:
+    crear_reservacion = reservacion.crear_reservacion
+    actualizar_reservacion = reservacion.actualizar_reservacion
+    getIdReservation = reservacion.getIdReservation
+    detail_sensor = sensor.detail_sensor
+    detail_one_sensors = sensor.detail_one_sensors
+    sensor_eventos = sensor.sensor_eventos
 
 urlpatterns = []
 
@@ -10,6 +28,11 @@ urlpatterns += [
     path('sensor/save/', createSensor, name='createSensor'),  # Endpoint para crear un sensor
     path('sensor/list/', detail_sensor, name='detailSensor'), # Endpoint para listar todos los sensores
     path('sensor/update/', updateSensor, name='updateSensor'),  # Endpoint para actualizar un sensor
+    path('sensor/update/batch/', updateSensorBatch, name='updateSensorBatch'),  # Endpoint para actualizar varios sensores en lote
+    path('sensor/report/', reportarSensor, name='sensorReport'),  # Endpoint de reportes frecuentes, escritos en diferido
+    path('sensor/available/', sensor_disponibles, name='sensorAvailable'),  # Endpoint con los primeros sensores libres de una ubicación
+    path('sensor/summary/', sensor_resumen, name='sensorSummary'),  # Endpoint con los conteos de ocupación por ubicación
+    path('sensor/eventos/', sensor_eventos, name='sensorEventos'),  # Endpoint SSE con los cambios de estado de los sensores
     path('sensor/list/<uuid:idSensor>/', detail_one_sensors, name='detailOneSensor'),  # Endpoint para obtener detalles de un sensor
     path('sensor/delete/<uuid:idSensor>/', deleteSensor, name='deleteSensor'), # Endpoint para eliminar un sensor
 ]
@@ -19,6 +42,8 @@ urlpatterns += [
     path('reservacion/save/', crear_reservacion, name='crear_reservacion'), # Endpoint para crear un reservacion
     path('reservacion/update/', actualizar_reservacion, name='actualizar_reservacion'), #Endpoint para actualizar una reservacion
     path('reservacion/list/', all_reservations, name='all_reservations'), # Endpoint para obtener todo el detalle de reservaciones
+    path('reservacion/analitica/', analitica_ocupacion, name='analitica_ocupacion'), # Endpoint con reservaciones y minutos ocupados por hora o día
+    path('reservacion/export/', exportar_reservaciones, name='exportar_reservaciones'), # Endpoint de exportación en CSV o NDJSON por rango de fechas
     path('reservacion/getByOne/', get_one_by_id, name='get_one_by_id'), # Endpoint para obtener solo una reservacion
     path('reservacion/list/<uuid:reservacion_id>/', getIdReservation, name='getIdReservation'), # Endpoint para el desc
 ]
\ No newline at end of file
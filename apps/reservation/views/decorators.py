@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+from calendar import timegm
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from apps.security.decorators import async_csrf_exempt  # noqa: F401
+
+
+def conditional_get(firma_func):
+    """
+    Equivalente a django.views.decorators.http.condition, pero con una sola función
+    firma_func(request, *args, **kwargs) que devuelve (etag, last_modified) o None,
+    para obtener ambos valores con una única consulta. Funciona también con vistas
+    asíncronas. Si la firma coincide con If-None-Match / If-Modified-Since se responde
+    304 sin ejecutar la vista.
+    """
+    def decorator(view_func):
+        def preparar(request, firma):
+            if request.method not in ('GET', 'HEAD') or firma is None:
+                return None, None, None
+            etag, last_modified = firma
+            etag = quote_etag(etag) if etag else None
+            last_modified = timegm(last_modified.utctimetuple()) if last_modified else None
+            return etag, last_modified, get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+        def completar(response, etag, last_modified):
+            if response.status_code in (200, 304):
+                if etag and not response.has_header('ETag'):
+                    response.headers['ETag'] = etag
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+            return response
+
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def inner(request, *args, **kwargs):
+                firma = await sync_to_async(firma_func)(request, *args, **kwargs) if request.method in ('GET', 'HEAD') else None
+                etag, last_modified, response = preparar(request, firma)
+                if response is None:
+                    response = await view_func(request, *args, **kwargs)
+                return completar(response, etag, last_modified)
+        else:
+            @wraps(view_func)
+            def inner(request, *args, **kwargs):
+                firma = firma_func(request, *args, **kwargs) if request.method in ('GET', 'HEAD') else None
+                etag, last_modified, response = preparar(request, firma)
+                if response is None:
+                    response = view_func(request, *args, **kwargs)
+                return completar(response, etag, last_modified)
+
+        return inner
+
+    return decorator
+
+
+IDEMPOTENCIA_TTL = 24 * 60 * 60
+
+
+def idempotente(endpoint, ttl=IDEMPOTENCIA_TTL):
+    """
+    Soporte de Idempotency-Key. La primera petición con una clave se ejecuta y su
+    respuesta (salvo errores 5xx, que se pueden reintentar) se guarda durante ttl
+    segundos. Las repeticiones reciben esa respuesta sin ejecutar la vista; si la
+    original sigue en curso se responde 409 y si el cuerpo no coincide, 422. Una
+    clave en curso cuya concesión expiró (el proceso murió) se vuelve a ejecutar.
+    """
+    from ..models import ClaveIdempotencia
+
+    def reservar(request, clave):
+        huella = hashlib.sha256(request.body).hexdigest()
+        registro, nueva = ClaveIdempotencia.objects.reservar(endpoint, clave, huella, ttl)
+        if nueva:
+            return registro, None
+        if registro.huella != huella:
+            return None, JsonResponse({
+                'status': 'error',
+                'message': 'La Idempotency-Key ya se usó con otro cuerpo'
+            }, status=422)
+        if registro.status is None:
+            return None, JsonResponse({
+                'status': 'error',
+                'message': 'La petición original con esta Idempotency-Key sigue en curso'
+            }, status=409)
+        response = HttpResponse(bytes(registro.cuerpo), status=registro.status, content_type=registro.content_type)
+        response.headers['Idempotent-Replayed'] = 'true'
+        return None, response
+
+    def guardar(registro, response):
+        if response.status_code >= 500 or response.streaming:
+            # Sin respuesta definitiva: la clave se libera para el reintento
+            ClaveIdempotencia.objects.filter(pk=registro.pk).delete()
+        else:
+            ClaveIdempotencia.objects.completar(
+                registro, response.status_code, response.content, response.get('Content-Type', ''), ttl
+            )
+        return response
+
+    def clave_invalida(clave):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'La Idempotency-Key debe tener entre 1 y 255 caracteres'
+        }, status=400) if not 0 < len(clave) <= 255 else None
+
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def inner(request, *args, **kwargs):
+                clave = request.headers.get('Idempotency-Key')
+                if clave is None or request.method != 'POST':
+                    return await view_func(request, *args, **kwargs)
+                error = clave_invalida(clave)
+                if error is not None:
+                    return error
+                registro, response = await sync_to_async(reservar)(request, clave)
+                if response is not None:
+                    return response
+                try:
+                    response = await view_func(request, *args, **kwargs)
+                except BaseException:
+                    await sync_to_async(ClaveIdempotencia.objects.filter(pk=registro.pk).delete)()
+                    raise
+                return await sync_to_async(guardar)(registro, response)
+        else:
+            @wraps(view_func)
+            def inner(request, *args, **kwargs):
+                clave = request.headers.get('Idempotency-Key')
+                if clave is None or request.method != 'POST':
+                    return view_func(request, *args, **kwargs)
+                error = clave_invalida(clave)
+                if error is not None:
+                    return error
+                registro, response = reservar(request, clave)
+                if response is not None:
+                    return response
+                try:
+                    response = view_func(request, *args, **kwargs)
+                except BaseException:
+                    ClaveIdempotencia.objects.filter(pk=registro.pk).delete()
+                    raise
+                return guardar(registro, response)
+
+        return inner
+
+    return decorator
@@ -0,0 +1,10 @@
+from django.http import HttpResponse, JsonResponse
+
+from ..metricas import exportar, recolectar
+
+
+def metrics(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    return HttpResponse(exportar(recolectar()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,13 +1,36 @@
+import base64
 import uuid
-from django.shortcuts import get_object_or_404
-from django.http import Http404, JsonResponse
+from datetime import datetime
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from apps.security.models import User
 from ..models import Reservacion, Sensor
+from ..serializers import RESERVACION_DETALLE, RESERVACION_LISTADO, a_json
+from ..services import tarifas
+from ..services.analitica import ocupacion_por_periodo
+from ..services.exportacion import FORMATOS, exportar, reservaciones_en_rango
+from ..services.identidades import id_sensor
+from ..services.ocupacion import versiones_reservaciones
+from ..services.reservacion import ReservacionConflicto, liberar_reservacion, reclamar_reservacion
+from ..db import lectura_en_replica
+from .decorators import async_csrf_exempt, conditional_get, idempotente
 import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+DIAS_ANALITICA = 7
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 2000
 
 @csrf_exempt
+@idempotente('reservacion/save')
 def crear_reservacion(request):
     if request.method != 'POST':
         return JsonResponse({
@@ -22,35 +45,25 @@ def crear_reservacion(request):
         placa = data.get('placa')
         
         # Validar que el sensorId sea UUID válidos
-        
-        print(sensor_id)
+        logger.debug('Reservación solicitada para el sensor %s', sensor_id)
         try:
             uuid_sensor_id = uuid.UUID(sensor_id)
         except ValueError:
             return JsonResponse({
                 'status': 'error',
-                'message': f'Sensor ID {uuid_sensor_id} no válido'
+                'message': f'Sensor ID {sensor_id} no válido'
             }, status=404)
         
-        user = get_user_or_fail(username)
-        sensor = get_sensor_or_fail(uuid_sensor_id)
-        
-        # Verificar si el sensor ya está reservado
-        if sensor_is_reserved(sensor):
-            return JsonResponse({
-                'status': 'error',
-                'message': f'El sensor con ID {sensor_id} ya está reservado'
-            }, status=400)
-            
-        
-        if placa_is_reserved(placa):
+        try:
+            reservacion = reclamar_reservacion(username, uuid_sensor_id, placa)
+        except ReservacionConflicto as e:
+            logger.info('Reservación rechazada: %s', str(e), extra={'sensor': str(uuid_sensor_id)})
             return JsonResponse({
                 'status': 'error',
-                'message': f'La placa con la {placa} ya se encuentra reservada'
+                'message': str(e)
             }, status=400)
-
-        reservacion = create_reservacion(user, sensor, placa)
         
+        logger.info('Reservación %s creada', reservacion.id, extra={'usuario': username, 'sensor': str(uuid_sensor_id)})
         return JsonResponse({
             'status': 'success',
             'message': 'Reservación creada con éxito',
@@ -70,54 +83,229 @@ def crear_reservacion(request):
         }, status=500)
 
 
-def create_reservacion(user, sensor, placa):
-    reservacion = Reservacion.objects.create(
-        usuario=user,
-        fecha_reservacion=timezone.now(),
-        sensor_activado=sensor,
-        placa=placa,
-        active=True
-    )
-    
-    sensor.estado = True 
-    sensor.save(update_fields=['estado'])
-    
-    return reservacion
+def quiere_historial(request):
+    return request.GET.get('historial') in ('1', 'true')
+
+def firma_reservaciones(request):
+    # Versiones mantenidas por las señales de reservaciones, usuarios y sensores:
+    # sin consultas, y cualquier cambio de estado de un sensor anidado la mueve.
+    # Requiere que la caché 'ocupacion' sea compartida entre workers (reservation.W001)
+    version_reservaciones, version_sensores = versiones_reservaciones()
+    alcance = 'historial' if quiere_historial(request) else 'vivas'
+    return f'reservaciones-{alcance}-{version_reservaciones}-{version_sensores}', None
+
+def firma_reservacion(request, reservacion_id):
+    # Un corte en lugar de first(): sobre una unión, first() agrega la columna pk.
+    # La versión del sensor cambia con cada cambio de estado; su updated_at puede
+    # venir del reloj de la pasarela y no avanzar
+    filas = list(Reservacion.objects.historial(pk=reservacion_id).values_list(
+        'updated_at', 'sensor_activado__version', 'sensor_activado__updated_at'
+    )[:1])
+    if not filas:
+        return None
+    updated_at, version_sensor, sensor_updated_at = filas[0]
+    last_modified = max(fecha for fecha in (updated_at, sensor_updated_at) if fecha)
+    return f'reservacion-{reservacion_id}-{updated_at.timestamp()}-{version_sensor}', last_modified
 
 @csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_reservaciones)
 def all_reservations(request):
     if request.method != 'GET':
         return JsonResponse({
             'status': 'error',
             'message': 'Método no permitido'
         }, status=405)
-    
-    reservations = Reservacion.objects.all().select_related('usuario', 'sensor_activado')
-    
-    reservations_list = []
-    
-    for reservation in reservations:
-        sensor_activado = {
-                'id': reservation.sensor_activado.id,
-                'nombre': reservation.sensor_activado.nombre,
-                'ubicacion': reservation.sensor_activado.ubicacion,
-                'estado': reservation.sensor_activado.estado,
-                'active': reservation.sensor_activado.active,
-                'createdAt': reservation.sensor_activado.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'updatedAt': reservation.sensor_activado.updated_at.strftime('%Y-%m-%d %H:%M:%S'),
-            } if reservation.sensor_activado else None
-        reservations_list.append({
-            'idReservacion': reservation.id,
-            "usuario": reservation.usuario.username,
-            "fecha_reservacion": reservation.fecha_reservacion.strftime('%Y-%m-%d %H:%M:%S'),
-            "sensor_activado": sensor_activado,
-            'placa': reservation.placa,
-            'activo': reservation.active
-        })
-    
-    return JsonResponse(reservations_list, safe=False)
+
+    # Con historial=1 también se listan las reservaciones archivadas
+    if quiere_historial(request):
+        reservaciones = Reservacion.objects.historial
+    else:
+        reservaciones = Reservacion.objects.filter
+
+    # Sin parámetros de paginación se envía el listado completo en streaming
+    if 'limit' not in request.GET and 'after' not in request.GET:
+        reservations = RESERVACION_LISTADO.valores(reservaciones()).order_by('fecha_reservacion', 'id')
+        # El cuerpo se genera después de salir de la vista: se fija ahora la base de lectura
+        reservations = reservations.using(reservations.db)
+        return StreamingHttpResponse(
+            stream_reservations(reservations.iterator(chunk_size=STREAM_CHUNK_SIZE)),
+            content_type='application/json'
+        )
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_PAGE_SIZE))
+        if limit < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'El parámetro limit debe ser un entero positivo'
+        }, status=400)
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    after = request.GET.get('after')
+    if after:
+        try:
+            fecha_reservacion, reservacion_id = decode_cursor(after)
+        except ValueError:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Cursor {after} no válido'
+            }, status=400)
+        filtros = [
+            Q(fecha_reservacion__gt=fecha_reservacion) |
+            Q(fecha_reservacion=fecha_reservacion, id__gt=reservacion_id)
+        ]
+    else:
+        filtros = []
+    reservations = RESERVACION_LISTADO.valores(reservaciones(*filtros)).order_by('fecha_reservacion', 'id')
+
+    # Se pide un registro extra para saber si existe una página siguiente
+    rows = list(reservations[:limit + 1])
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_next:
+        next_cursor = encode_cursor(
+            rows[-1][RESERVACION_LISTADO.indice('fecha_reservacion')],
+            rows[-1][RESERVACION_LISTADO.indice('id')]
+        )
+    return HttpResponse(
+        a_json({'results': RESERVACION_LISTADO.filas(rows), 'next': next_cursor}),
+        content_type='application/json'
+    )
+
+
+def stream_reservations(rows, chunk_size=STREAM_CHUNK_SIZE):
+    # Se envía un bloque de bytes por cada chunk leído de la base
+    yield b'['
+    separator = b''
+    chunk = []
+    for row in rows:
+        chunk.append(RESERVACION_LISTADO.fila(row))
+        if len(chunk) == chunk_size:
+            yield separator + a_json(chunk)[1:-1]
+            separator = b','
+            chunk = []
+    if chunk:
+        yield separator + a_json(chunk)[1:-1]
+    yield b']'
+
+
+def encode_cursor(fecha_reservacion, reservacion_id):
+    raw = f'{fecha_reservacion.isoformat()}|{reservacion_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    # binascii.Error y UnicodeDecodeError también son ValueError
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    fecha_reservacion, reservacion_id = raw.split('|')
+    fecha = datetime.fromisoformat(fecha_reservacion)
+    if timezone.is_naive(fecha):
+        raise ValueError(f'Cursor {cursor} no válido')
+    return fecha, uuid.UUID(reservacion_id)
+
+def parse_fecha_parametro(valor):
+    fecha = parse_datetime(valor)
+    if fecha is None:
+        raise ValueError(f'Fecha {valor} no válida')
+    return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+@csrf_exempt
+@lectura_en_replica
+def analitica_ocupacion(request):
+    if request.method != 'GET':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Método no permitido'
+        }, status=405)
+
+    # Sin rango explícito se devuelven los últimos DIAS_ANALITICA días
+    try:
+        hasta = parse_fecha_parametro(request.GET['hasta']) if 'hasta' in request.GET else timezone.now()
+        desde = (
+            parse_fecha_parametro(request.GET['desde']) if 'desde' in request.GET
+            else hasta - timezone.timedelta(days=DIAS_ANALITICA)
+        )
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    if desde >= hasta:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'El parámetro desde debe ser anterior a hasta'
+        }, status=400)
+
+    periodo = request.GET.get('periodo', 'hora')
+    try:
+        resultados = ocupacion_por_periodo(desde, hasta, periodo, request.GET.get('ubicacion'))
+    except ValidationError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': e.messages[0]
+        }, status=400)
+
+    return HttpResponse(a_json({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'periodo': periodo,
+        'resultados': resultados,
+    }), content_type='application/json')
 
 @csrf_exempt
+@lectura_en_replica
+def exportar_reservaciones(request):
+    if request.method != 'GET':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Método no permitido'
+        }, status=405)
+
+    try:
+        desde = parse_fecha_parametro(request.GET['desde'])
+        hasta = parse_fecha_parametro(request.GET['hasta']) if 'hasta' in request.GET else timezone.now()
+    except KeyError:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'El parámetro desde es obligatorio'
+        }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=400)
+    if desde >= hasta:
+        return JsonResponse({
+            'status': 'error',
+            'message': 'El parámetro desde debe ser anterior a hasta'
+        }, status=400)
+
+    formato = request.GET.get('formato', 'csv')
+    if formato not in FORMATOS:
+        return JsonResponse({
+            'status': 'error',
+            'message': f"Formato {formato} no válido, use {', '.join(FORMATOS)}"
+        }, status=400)
+    gzip = request.GET.get('gzip') in ('1', 'true')
+
+    reservations = reservaciones_en_rango(desde, hasta, quiere_historial(request))
+    # El cuerpo se genera después de salir de la vista: se fija ahora la base de lectura
+    reservations = reservations.using(reservations.db)
+    nombre = f'reservaciones-{desde:%Y%m%d}-{hasta:%Y%m%d}.{formato}' + ('.gz' if gzip else '')
+    response = StreamingHttpResponse(
+        exportar(reservations, formato, gzip),
+        content_type='application/gzip' if gzip else FORMATOS[formato]
+    )
+    response.headers['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
+
+@csrf_exempt
+@lectura_en_replica
 def get_one_by_id(request):
     if request.method != 'POST':
         return JsonResponse({
@@ -127,22 +315,15 @@ def get_one_by_id(request):
     
     try:
         data_reservacion = json.loads(request.body)
-        print(data_reservacion)
         reservacion_id = data_reservacion.get('reservacionId')
+        logger.debug('Consulta de la reservación %s', reservacion_id)
 
-        reservation = get_reservation_or_fail(reservacion_id)
-    
-        data = {
-            'idReservacion': reservation.id,
-            "usuario": reservation.usuario.username,
-            "fecha_reservacion": reservation.fecha_reservacion.strftime('%Y-%m-%d %H:%M:%S'),
-            "sensor_activado": reservation.sensor_activado.nombre,
-            'placa': reservation.placa,
-            'precio': 10,
-            'activo': reservation.active
-        } 
-        
-        return JsonResponse(data, safe=True)
+        fila = get_reservation_row_or_fail(reservacion_id, *tarifas.COLUMNAS)
+        data = RESERVACION_DETALLE.fila(fila)
+        # Como texto ("30.00"): un número JSON volvería a ser float en los clientes
+        data['precio'] = str(tarifas.a_moneda(tarifas.precio(*fila[len(RESERVACION_DETALLE.columnas):])))
+
+        return HttpResponse(a_json(data), content_type='application/json')
     except Http404 as e:
         return JsonResponse({
             'status': 'error',
@@ -156,6 +337,8 @@ def get_one_by_id(request):
         }, status=500)
     
 @csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_reservacion)
 def getIdReservation(request, reservacion_id):
     if request.method != 'GET':
         return JsonResponse({
@@ -164,18 +347,9 @@ def getIdReservation(request, reservacion_id):
         }, status=405)
     
     try:
-        reservation = get_reservation_or_fail(reservacion_id)
-    
-        data = {
-            'idReservacion': reservation.id,
-            "usuario": reservation.usuario.username,
-            "fecha_reservacion": reservation.fecha_reservacion.strftime('%Y-%m-%d %H:%M:%S'),
-            "sensor_activado": reservation.sensor_activado.nombre,
-            'placa': reservation.placa,
-            'activo': reservation.active
-        } 
-        
-        return JsonResponse(data, safe=True)
+        data = get_reservation_data_or_fail(reservacion_id)
+
+        return HttpResponse(a_json(data), content_type='application/json')
     except Http404 as e:
         return JsonResponse({
             'status': 'error',
@@ -189,6 +363,7 @@ def getIdReservation(request, reservacion_id):
         }, status=500)
         
 @csrf_exempt
+@idempotente('reservacion/update')
 def actualizar_reservacion(request):
     if request.method != 'POST':
         return JsonResponse({
@@ -200,11 +375,12 @@ def actualizar_reservacion(request):
         data = json.loads(request.body)
         sensor_name = data.get('sensorName')
         
-        sensor = Sensor.objects.activos().get(nombre=sensor_name)
-        print(sensor)
-        
-        # Obtener la reservación activa para el sensor
-        reservacion = Reservacion.objects.filter(sensor_activado=sensor, active=True).first()
+        # Obtener la reservación activa para el sensor. Con el id en caché no hace
+        # falta leer el sensor: una reservación activa implica que está ocupado
+        sensor_id = id_sensor(sensor_name)
+        if sensor_id is None:
+            sensor_id = Sensor.objects.activos().get(nombre=sensor_name).id
+        reservacion = Reservacion.objects.filter(sensor_activado_id=sensor_id, active=True).first()
 
         if not reservacion:
             return JsonResponse({
@@ -212,12 +388,9 @@ def actualizar_reservacion(request):
                 'message': f'No hay reservación activa para el sensor con el nombre {sensor_name}'
             }, status=404)
 
-        # Desactivar la reservación
-        reservacion.active = False
-        reservacion.save(update_fields=['active'])
-        
-        sensor.estado = False 
-        sensor.save(update_fields=['estado'])
+        # Desactivar la reservación y liberar el sensor en la misma transacción
+        liberar_reservacion(reservacion)
+        logger.info('Reservación %s liberada', reservacion.id, extra={'sensor': sensor_name})
 
         return JsonResponse({
             'status': 'success',
@@ -250,20 +423,152 @@ def get_sensor_or_fail(sensor_id):
     except Sensor.DoesNotExist:
         raise Http404(f"Sensor con id {sensor_id} no encontrado")
     
-def get_reservation_or_fail(reservation_id):
+def get_reservation_row_or_fail(reservation_id, *columnas_extra):
+    # Columnas de RESERVACION_DETALLE seguidas de columnas_extra, en una consulta
     try:
-        reservation = get_object_or_404(Reservacion, pk=reservation_id)
-        return reservation
-    except:
+        rows = list(
+            Reservacion.objects.historial(pk=reservation_id)
+            .values_list(*RESERVACION_DETALLE.columnas, *columnas_extra)[:1]
+        )
+    except ValidationError:
+        rows = []
+    if not rows:
         raise Http404(f"Reservacion con id {reservation_id} no encontrado")
+    return rows[0]
+
+def get_reservation_data_or_fail(reservation_id):
+    return RESERVACION_DETALLE.fila(get_reservation_row_or_fail(reservation_id))
 
 def sensor_is_reserved(sensor):
     return Reservacion.objects.filter(sensor_activado=sensor, active=True).exists()
 
 def placa_is_reserved(placa):
-    reservaciones_activas = Reservacion.objects.select_related('sensor_activado').filter(
-        placa=placa,
-        active=True
-    )
-    print("Estoyu aca: ", reservaciones_activas)
-    return reservaciones_activas.exists()
\ No newline at end of file
+    return Reservacion.objects.filter(placa=placa, active=True).exists()
+
+
+# Variantes asíncronas (ASGI). Las operaciones que necesitan transaction.atomic
+# se ejecutan completas en un solo sync_to_async, el resto usa el ORM asíncrono.
+
+@async_csrf_exempt
+@idempotente('reservacion/save')
+async def crear_reservacion_async(request):
+    if request.method != 'POST':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Método no permitido'
+        }, status=405)
+
+    try:
+        data = json.loads(request.body)
+        username = data.get('username')
+        sensor_id = data.get('sensorId')
+        placa = data.get('placa')
+
+        logger.debug('Reservación solicitada para el sensor %s', sensor_id)
+        try:
+            uuid_sensor_id = uuid.UUID(sensor_id)
+        except (TypeError, ValueError):
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Sensor ID {sensor_id} no válido'
+            }, status=404)
+
+        try:
+            reservacion = await sync_to_async(reclamar_reservacion)(username, uuid_sensor_id, placa)
+        except ReservacionConflicto as e:
+            logger.info('Reservación rechazada: %s', str(e), extra={'sensor': str(uuid_sensor_id)})
+            return JsonResponse({
+                'status': 'error',
+                'message': str(e)
+            }, status=400)
+
+        logger.info('Reservación %s creada', reservacion.id, extra={'usuario': username, 'sensor': str(uuid_sensor_id)})
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Reservación creada con éxito',
+            'reservacion_id': reservacion.id,
+        })
+
+    except Http404 as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=404)
+
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Error al crear la reservación: {str(e)}'
+        }, status=500)
+
+@async_csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_reservacion)
+async def getIdReservation_async(request, reservacion_id):
+    if request.method != 'GET':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Método no permitido'
+        }, status=405)
+
+    try:
+        data = [row async for row in RESERVACION_DETALLE.valores(Reservacion.objects.historial(pk=reservacion_id))[:1]]
+        if not data:
+            raise Reservacion.DoesNotExist
+
+        return HttpResponse(a_json(RESERVACION_DETALLE.fila(data[0])), content_type='application/json')
+    except Reservacion.DoesNotExist:
+        return JsonResponse({
+            'status': 'error',
+            'message': f"Reservacion con id {reservacion_id} no encontrado"
+        }, status=404)
+
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Error al actualizar la reservación: {str(e)}'
+        }, status=500)
+
+@async_csrf_exempt
+@idempotente('reservacion/update')
+async def actualizar_reservacion_async(request):
+    if request.method != 'POST':
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Método no permitido'
+        }, status=405)
+
+    try:
+        data = json.loads(request.body)
+        sensor_name = data.get('sensorName')
+
+        sensor_id = await sync_to_async(id_sensor)(sensor_name)
+        if sensor_id is None:
+            sensor_id = (await Sensor.objects.activos().aget(nombre=sensor_name)).id
+        reservacion = await Reservacion.objects.filter(sensor_activado_id=sensor_id, active=True).afirst()
+
+        if not reservacion:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'No hay reservación activa para el sensor con el nombre {sensor_name}'
+            }, status=404)
+
+        await sync_to_async(liberar_reservacion)(reservacion)
+        logger.info('Reservación %s liberada', reservacion.id, extra={'sensor': sensor_name})
+
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Reservación actualizada con éxito'
+        })
+
+    except Http404 as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status=404)
+
+    except Exception as e:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Error al actualizar la reservación: {str(e)}'
+        }, status=500)
@@ -1,11 +1,23 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db import IntegrityError
+from django.db import IntegrityError, OperationalError
 from django.shortcuts import get_object_or_404
+from django.utils.http import quote_etag
 
 import json
+import logging
 
-from ..models import Sensor
+from ..models import ConflictoDeVersion, ResumenOcupacion, Sensor
+from ..serializers import RESUMEN_OCUPACION, SENSOR, a_json
+from ..services.eventos import aflujo_eventos, flujo_eventos, hub_sensores
+from ..services.ocupacion import aobtener_snapshot, get_cache, obtener_snapshot, version_actual
+from ..services.buffer_sensores import buffer_sensores
+from ..services.disponibilidad import disponibilidad
+from ..services.sensor import INVALIDO, MAX_EVENTOS_POR_LOTE, aplicar_eventos_sensor, parse_timestamp
+from ..db import lectura_en_replica
+from .decorators import async_csrf_exempt, conditional_get
+
+logger = logging.getLogger(__name__)
 
 @csrf_exempt
 def createSensor(request):
@@ -32,12 +44,7 @@ def createSensor(request):
             # Devolver los datos del sensor creado en la respuesta JSON
             return JsonResponse({
                 'mensaje': 'Sensor creado correctamente',
-                'sensor': {
-                    'id': sensor.id,
-                    'nombre': sensor.nombre,
-                    'ubicacion': sensor.ubicacion,
-                    'estado': sensor.estado
-                }
+                'sensor': SENSOR.instancia(sensor)
             }, status=201)
         
         except json.JSONDecodeError:
@@ -50,42 +57,85 @@ def createSensor(request):
     
     return JsonResponse({'error': 'Método no permitido'}, status=405)
 
+def firma_sensor(request, idSensor):
+    fila = Sensor.objects.filter(pk=idSensor).values_list('version', 'updated_at').first()
+    if fila is None:
+        return None
+    version, updated_at = fila
+    return f'sensor-{idSensor}-{version}-{updated_at.timestamp()}', updated_at
+
+def firma_sensores(request):
+    # La versión de la instantánea cambia con cada modificación de sensores
+    return f'sensores-{version_actual(get_cache())}', None
+
+def etag_sensores(version):
+    return quote_etag(f'sensores-{version}')
+
 @csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_sensor)
 def detail_one_sensors(request, idSensor):
     if request.method != 'GET':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     
-    try:
-        sensor = get_object_or_404(Sensor, pk=idSensor)
-        return JsonResponse({
-            'id': str(sensor.id),
-            'nombre': sensor.nombre,
-            'ubicacion': sensor.ubicacion,
-            'estado': sensor.estado
-        })
-    
-    except Sensor.DoesNotExist:
+    row = SENSOR.valores(Sensor.objects.filter(pk=idSensor)).first()
+    if row is None:
         return JsonResponse({'error': 'Sensor no encontrado'}, status=404)
+    return HttpResponse(a_json(SENSOR.fila(row)), content_type='application/json')
+
+@csrf_exempt
+@lectura_en_replica
+def sensor_resumen(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    # Lee los conteos materializados: una fila por ubicación, sin COUNT sobre Sensor
+    queryset = ResumenOcupacion.objects.order_by('ubicacion')
+    ubicacion = request.GET.get('ubicacion')
+    if ubicacion:
+        queryset = queryset.filter(ubicacion=ubicacion)
+    ubicaciones = RESUMEN_OCUPACION.filas(RESUMEN_OCUPACION.valores(queryset))
+    totales = {
+        categoria: sum(fila[categoria] for fila in ubicaciones)
+        for categoria in ResumenOcupacion.objects.CATEGORIAS
+    }
+    return HttpResponse(a_json({'ubicaciones': ubicaciones, 'totales': totales}), content_type='application/json')
+
+MAX_DISPONIBLES = 100
 
 @csrf_exempt
+@lectura_en_replica
+def sensor_disponibles(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        limite = int(request.GET.get('limite', 10))
+    except ValueError:
+        return JsonResponse({'error': 'El parámetro limite debe ser un entero'}, status=400)
+    if not 1 <= limite <= MAX_DISPONIBLES:
+        return JsonResponse({'error': f'El parámetro limite debe estar entre 1 y {MAX_DISPONIBLES}'}, status=400)
+
+    # Sale del índice en memoria: sin consultas mientras la versión de ocupación no cambie
+    libres, total = disponibilidad.buscar(request.GET.get('ubicacion') or None, limite)
+    sensores = [
+        {'id': str(sensor_id), 'nombre': nombre, 'ubicacion': ubicacion, 'estado': False}
+        for sensor_id, nombre, ubicacion in libres
+    ]
+    return HttpResponse(a_json({'sensores': sensores, 'libres': total}), content_type='application/json')
+
+@csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_sensores)
 def detail_sensor(request):
     if request.method != 'GET':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     
     try:
-        sensors = Sensor.objects.all()
-        
-        sensors_list = []
-        
-        for sensor in sensors:
-            sensors_list.append({
-            'id': str(sensor.id),
-            'nombre': sensor.nombre,
-            'ubicacion': sensor.ubicacion,
-            'estado': sensor.estado
-        })
-     
-        return JsonResponse(sensors_list, safe=False)
+        version, contenido = obtener_snapshot()
+        response = HttpResponse(contenido, content_type='application/json')
+        response.headers['ETag'] = etag_sensores(version)
+        return response
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -147,29 +197,121 @@ def updateSensor(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
-            print(request)
             nombre_sensor = data.get('nombre_sensor')  # Asegúrate de manejar el caso en que 'nombre_sensor' no esté presente
+            logger.debug('Actualización de estado del sensor %s', nombre_sensor)
 
-            # Obtener el sensor por su nombre
-            sensor = Sensor.objects.get(nombre=nombre_sensor)
-
-            # Cambiar el estado del sensor
-            sensor.estado = not sensor.estado  # Cambia el estado al contrario del estado actual
-
-            # Guardar el sensor actualizado en la base de datos
-            sensor.save()
+            # Con 'estado' se fija el valor (y con 'version' se hace compare-and-set);
+            # sin él se invierte el estado actual. En ambos casos es un único UPDATE
+            if 'estado' in data:
+                if not isinstance(data['estado'], bool):
+                    return JsonResponse({'error': 'El campo "estado" debe ser booleano'}, status=400)
+                sensor = Sensor.objects.fijar_estado(data['estado'], version=data.get('version'), nombre=nombre_sensor)
+            else:
+                sensor = Sensor.objects.alternar_estado(nombre=nombre_sensor)
 
             # Devolver una respuesta si es necesario
-            return JsonResponse({'message': f'Estado del sensor {nombre_sensor} actualizado correctamente a {sensor.estado}'}, status=200)
+            return JsonResponse({
+                'message': f'Estado del sensor {nombre_sensor} actualizado correctamente a {sensor.estado}',
+                'estado': sensor.estado,
+                'version': sensor.version,
+            }, status=200)
+
+        except ConflictoDeVersion as e:
+            return JsonResponse({'error': str(e), 'version': e.version_actual}, status=409)
 
         except Sensor.DoesNotExist:
             return JsonResponse({'error': f'No se encontró el sensor con nombre {nombre_sensor}'}, status=404)
 
+        except OperationalError as e:
+            # 'database is locked' y similares: el cliente puede reintentar
+            logger.warning('Actualización del sensor %s fallida: %s', nombre_sensor, e)
+            return JsonResponse({'error': str(e)}, status=503)
+
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=400)
 
     return JsonResponse({'error': 'Método no permitido'}, status=405)
 
+@csrf_exempt
+def updateSensorBatch(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        eventos = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Formato JSON inválido'}, status=400)
+
+    if not isinstance(eventos, list):
+        return JsonResponse({'error': 'Se esperaba una lista de eventos'}, status=400)
+    if len(eventos) > MAX_EVENTOS_POR_LOTE:
+        return JsonResponse({'error': f'El lote supera el máximo de {MAX_EVENTOS_POR_LOTE} eventos'}, status=400)
+
+    try:
+        return JsonResponse({'resultados': aplicar_eventos_sensor(eventos)}, status=200)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+def reportarSensor(request):
+    """
+    Ingesta de reportes frecuentes (latidos): acepta un evento o una lista y
+    responde 202; el buffer escribe solo los cambios de estado en diferido.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        eventos = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Formato JSON inválido'}, status=400)
+
+    if isinstance(eventos, dict):
+        eventos = [eventos]
+    if not isinstance(eventos, list):
+        return JsonResponse({'error': 'Se esperaba un evento o una lista de eventos'}, status=400)
+    if len(eventos) > MAX_EVENTOS_POR_LOTE:
+        return JsonResponse({'error': f'El lote supera el máximo de {MAX_EVENTOS_POR_LOTE} eventos'}, status=400)
+
+    aceptados = 0
+    invalidos = []
+    en_linea = []
+    for evento in eventos:
+        nombre = evento.get('sensor') if isinstance(evento, dict) else None
+        try:
+            if not isinstance(nombre, str) or not isinstance(evento.get('estado'), bool):
+                raise ValueError('Cada evento requiere sensor (texto) y estado (booleano)')
+            timestamp = parse_timestamp(evento.get('timestamp'))
+        except ValueError as e:
+            invalidos.append({'sensor': nombre, 'status': INVALIDO, 'message': str(e)})
+            continue
+        if buffer_sensores.reportar(nombre, evento['estado'], timestamp):
+            aceptados += 1
+        else:
+            en_linea.append(evento)
+
+    try:
+        if en_linea:
+            # Buffer lleno: estos reportes se aplican ya, igual que en sensor/update/batch/
+            aplicar_eventos_sensor(en_linea, solo_cambios=True)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+    return JsonResponse({'aceptados': aceptados + len(en_linea), 'invalidos': invalidos}, status=202)
+
+@csrf_exempt
+def sensor_eventos(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    return respuesta_sse(flujo_eventos(hub_sensores, request.headers.get('Last-Event-ID')))
+
+def respuesta_sse(flujo):
+    response = StreamingHttpResponse(flujo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
 @csrf_exempt
 def deleteSensor(request, idSensor):
     if request.method != 'DELETE':
@@ -191,5 +333,40 @@ def deleteSensor(request, idSensor):
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
-        
-    
\ No newline at end of file
+
+
+# Variantes asíncronas (ASGI)
+
+@async_csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_sensor)
+async def detail_one_sensors_async(request, idSensor):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    row = await SENSOR.valores(Sensor.objects.filter(pk=idSensor)).afirst()
+    if row is None:
+        return JsonResponse({'error': 'Sensor no encontrado'}, status=404)
+    return HttpResponse(a_json(SENSOR.fila(row)), content_type='application/json')
+
+@async_csrf_exempt
+@lectura_en_replica
+@conditional_get(firma_sensores)
+async def detail_sensor_async(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        version, contenido = await aobtener_snapshot()
+        response = HttpResponse(contenido, content_type='application/json')
+        response.headers['ETag'] = etag_sensores(version)
+        return response
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+@async_csrf_exempt
+async def sensor_eventos_async(request):
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    return respuesta_sse(aflujo_eventos(hub_sensores, request.headers.get('Last-Event-ID')))
@@ -0,0 +1,28 @@
+from functools import wraps
+
+from django.http import JsonResponse
+
+
+def async_csrf_exempt(view_func):
+    """
+    csrf_exempt de Django 4.2 envuelve la vista en una función síncrona, lo que
+    la deja de reconocer como corrutina. En vistas asíncronas basta con marcarla.
+    """
+    view_func.csrf_exempt = True
+    return view_func
+
+
+def solo_staff(view_func):
+    """
+    Exige una sesión de un usuario staff o superusuario: 401 sin sesión y 403 sin
+    permisos. La vista conserva la protección CSRF de la sesión (no usar con
+    csrf_exempt).
+    """
+    @wraps(view_func)
+    def vista(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Autenticación requerida'}, status=401)
+        if not (request.user.is_staff or request.user.is_superuser):
+            return JsonResponse({'error': 'Se requiere un usuario staff'}, status=403)
+        return view_func(request, *args, **kwargs)
+    return vista
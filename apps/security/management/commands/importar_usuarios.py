@@ -0,0 +1,39 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.security.services.aprovisionamiento import FORMATOS, LOTE, aprovisionar, leer_registros
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea usuarios desde un archivo CSV (con cabecera) o JSON (lista de objetos) '
+        'con username, email y opcionalmente password, isActive, cedula, phone, '
+        'first_name y last_name. Las contraseñas se hashean en paralelo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo')
+        parser.add_argument('--formato', choices=FORMATOS, help='Por defecto según la extensión del archivo')
+        parser.add_argument('--lote', type=int, default=LOTE, help='Usuarios por bulk_create')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser >= 1')
+        formato = options['formato'] or os.path.splitext(options['archivo'])[1].lstrip('.').lower()
+        if formato not in FORMATOS:
+            raise CommandError(f"No se reconoce el formato de {options['archivo']}, use --formato")
+
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                registros = leer_registros(archivo.read(), formato)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        resultado = aprovisionar(registros, lote=options['lote'])
+        for error in resultado['errores']:
+            self.stderr.write(json.dumps(error, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['creados']} usuarios creados, {len(resultado['errores'])} omitidos"
+        ))
@@ -0,0 +1,124 @@
+"""
+Alta masiva de usuarios desde CSV o JSON. Los registros se validan, se
+descartan los duplicados (en la entrada y en la base, con una consulta por
+lote), las contraseñas se hashean en paralelo con hashear_lote y cada lote se
+inserta con un bulk_create.
+"""
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from ..models import User
+from .contrasenas import hashear_lote
+
+FORMATOS = ('csv', 'json')
+CAMPOS_OPCIONALES = ('cedula', 'phone', 'first_name', 'last_name')
+VERDADEROS = ('1', 'true', 'si', 'sí', 'yes')
+LOTE = 1000
+
+
+def leer_registros(contenido, formato):
+    """Lista de diccionarios a partir de un documento CSV (con cabecera) o un arreglo JSON."""
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    if formato == 'json':
+        registros = json.loads(contenido)
+        if not isinstance(registros, list) or not all(isinstance(registro, dict) for registro in registros):
+            raise ValueError('Se esperaba una lista de usuarios')
+        return registros
+    if formato == 'csv':
+        return list(csv.DictReader(io.StringIO(contenido)))
+    raise ValueError(f"Formato {formato} no válido, use {', '.join(FORMATOS)}")
+
+
+def normalizar(registro):
+    username = str(registro.get('username') or '').strip()
+    email = User.objects.normalize_email(str(registro.get('email') or '').strip())
+    if not username or not email:
+        raise ValueError('username y email son obligatorios')
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f'Email {email} no válido')
+
+    activo = registro.get('isActive', registro.get('is_active', True))
+    if isinstance(activo, str):
+        activo = activo.strip().lower() in VERDADEROS
+    datos = {'username': username, 'email': email, 'is_active': bool(activo)}
+    for campo in CAMPOS_OPCIONALES:
+        valor = registro.get(campo)
+        if valor not in (None, ''):
+            datos[campo] = str(valor).strip()
+    # Sin contraseña la cuenta queda con una contraseña inutilizable (make_password(None))
+    datos['password'] = registro.get('password') or None
+    return datos
+
+
+def aprovisionar(registros, lote=LOTE):
+    """
+    Crea los usuarios válidos y devuelve {'creados': n, 'errores': [...]}, con
+    la fila (desde 1) y el motivo de cada registro omitido.
+    """
+    errores = []
+    validos = []
+    vistos = {'username': set(), 'email': set(), 'cedula': set()}
+    for fila, registro in enumerate(registros, start=1):
+        try:
+            if not isinstance(registro, dict):
+                raise ValueError('Cada usuario debe ser un objeto')
+            datos = normalizar(registro)
+            for campo, valores in vistos.items():
+                if datos.get(campo) is not None and datos[campo] in valores:
+                    raise ValueError(f'{campo} {datos[campo]} repetido en la entrada')
+        except ValueError as e:
+            errores.append({'fila': fila, 'message': str(e)})
+            continue
+        for campo, valores in vistos.items():
+            if datos.get(campo) is not None:
+                valores.add(datos[campo])
+        validos.append((fila, datos))
+
+    creados = 0
+    for inicio in range(0, len(validos), lote):
+        bloque = validos[inicio:inicio + lote]
+        existentes = {'username': set(), 'email': set(), 'cedula': set()}
+        filtro = Q(username__in=[datos['username'] for _, datos in bloque]) | Q(email__in=[datos['email'] for _, datos in bloque])
+        cedulas = [datos['cedula'] for _, datos in bloque if 'cedula' in datos]
+        if cedulas:
+            filtro |= Q(cedula__in=cedulas)
+        for username, email, cedula in User.objects.filter(filtro).values_list('username', 'email', 'cedula'):
+            existentes['username'].add(username)
+            existentes['email'].add(email)
+            existentes['cedula'].add(cedula)
+
+        nuevos = []
+        for fila, datos in bloque:
+            repetido = next(
+                (campo for campo, valores in existentes.items() if datos.get(campo) is not None and datos[campo] in valores),
+                None
+            )
+            if repetido:
+                errores.append({'fila': fila, 'message': f'Ya existe un usuario con {repetido} {datos[repetido]}'})
+            else:
+                nuevos.append((fila, datos))
+        if not nuevos:
+            continue
+
+        hashes = hashear_lote([datos['password'] for _, datos in nuevos])
+        usuarios = [User(**dict(datos, password=hash_)) for (_, datos), hash_ in zip(nuevos, hashes)]
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(usuarios)
+        except IntegrityError as e:
+            # Otra alta concurrente ocupó algún valor único: el lote completo se omite
+            errores += [{'fila': fila, 'message': f'Lote no insertado: {e}'} for fila, _ in nuevos]
+            continue
+        creados += len(usuarios)
+
+    errores.sort(key=lambda error: error['fila'])
+    return {'creados': creados, 'errores': errores}
@@ -0,0 +1,84 @@
+"""
+Hash de contraseñas fuera del hilo de la petición.
+
+make_password (PBKDF2 por defecto) consume cientos de milisegundos de CPU y
+retiene el GIL. Con settings.CONTRASENAS_PROCESOS > 0 el cálculo se envía a
+un ProcessPoolExecutor: una vista síncrona solo espera el resultado (sin el
+GIL) y una asíncrona lo espera sin bloquear el bucle de eventos. Con 0 se
+calcula en el mismo proceso.
+"""
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+
+_lock = threading.Lock()
+_pool = None
+_procesos = None
+
+
+def procesos():
+    return getattr(settings, 'CONTRASENAS_PROCESOS', 0)
+
+
+def obtener_pool():
+    """Pool compartido del proceso, o None si el hash se calcula en línea."""
+    global _pool, _procesos
+    cantidad = procesos()
+    if not cantidad:
+        return None
+    with _lock:
+        if _pool is None or _procesos != cantidad:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn y no fork: el proceso web ya tiene hilos (registro, barridos).
+            # Sin django.setup(): make_password solo lee los ajustes, que se cargan
+            # de forma perezosa con DJANGO_SETTINGS_MODULE, y así los procesos no
+            # ejecutan ready() de las aplicaciones (hilos de barrido, registro)
+            _pool = ProcessPoolExecutor(
+                max_workers=cantidad,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _procesos = cantidad
+        return _pool
+
+
+def detener():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+atexit.register(detener)
+
+
+def hashear(contrasena):
+    """make_password(contrasena) calculado en el pool."""
+    pool = obtener_pool()
+    if pool is None:
+        return make_password(contrasena)
+    return pool.submit(make_password, contrasena).result()
+
+
+async def ahashear(contrasena):
+    """Variante asíncrona de hashear."""
+    pool = obtener_pool()
+    if pool is None:
+        return make_password(contrasena)
+    return await asyncio.wrap_future(pool.submit(make_password, contrasena))
+
+
+def hashear_lote(contrasenas):
+    """Hashes de una lista de contraseñas, repartidos entre los procesos del pool."""
+    pool = obtener_pool()
+    if pool is None:
+        return [make_password(contrasena) for contrasena in contrasenas]
+    # Bloques por proceso para no pagar un viaje entre procesos por contraseña
+    bloque = max(1, len(contrasenas) // (procesos() * 4))
+    return list(pool.map(make_password, contrasenas, chunksize=bloque))
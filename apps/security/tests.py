@@ -1,3 +1,125 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.test import AsyncRequestFactory, Client, TestCase, override_settings
+from django.urls import reverse
+
+from apps.security.models import User
+from apps.security.services import contrasenas
+from apps.security.services.aprovisionamiento import aprovisionar, leer_registros
+from apps.security.views.usuario.usuario import MAX_USUARIOS_POR_PETICION, CreateUserViewAsync
+
+
+@override_settings(CONTRASENAS_PROCESOS=0)
+class CrearUsuarioTest(TestCase):
+    def crear(self, **datos):
+        return self.client.post(reverse('crear_usuario'), {
+            'username': 'cliente', 'email': 'cliente@example.com', 'password': 'secreta-123', 'isActive': True, **datos
+        }, content_type='application/json')
+
+    def test_guarda_la_contrasena_hasheada(self):
+        self.assertEqual(self.crear().status_code, 201)
+        usuario = User.objects.get(username='cliente')
+        self.assertNotEqual(usuario.password, 'secreta-123')
+        self.assertTrue(usuario.check_password('secreta-123'))
+
+    def test_campos_faltantes_y_duplicados(self):
+        self.assertEqual(self.crear(password='').status_code, 400)
+        self.crear()
+        self.assertEqual(self.crear(username='otro').status_code, 400)
+
+    async def test_variante_asincrona(self):
+        request = AsyncRequestFactory().post(
+            '/crear_usuario/', json.dumps({'username': 'async', 'email': 'async@example.com', 'password': 'clave-1'}),
+            content_type='application/json'
+        )
+        respuesta = await CreateUserViewAsync(request)
+        self.assertEqual(respuesta.status_code, 201)
+        usuario = await User.objects.aget(username='async')
+        self.assertTrue(check_password('clave-1', usuario.password))
+
+
+class PoolContrasenasTest(TestCase):
+    @override_settings(CONTRASENAS_PROCESOS=1)
+    def test_hashea_en_otro_proceso(self):
+        self.addCleanup(contrasenas.detener)
+        hashes = contrasenas.hashear_lote(['uno', 'dos'])
+        self.assertTrue(check_password('uno', hashes[0]))
+        self.assertTrue(check_password('dos', hashes[1]))
+        self.assertTrue(check_password('tres', contrasenas.hashear('tres')))
+
+
+@override_settings(CONTRASENAS_PROCESOS=0)
+class AprovisionamientoTest(TestCase):
+    def setUp(self):
+        User.objects.create(username='existente', email='existente@example.com')
+
+    def test_crea_por_lotes_y_reporta_omitidos(self):
+        registros = leer_registros(
+            'username,email,password,isActive\n'
+            'ana,ana@example.com,clave-1,1\n'
+            'beto,beto@example.com,,0\n'
+            'ana,otra@example.com,clave-2,1\n'
+            'existente,nuevo@example.com,clave-3,1\n'
+            'carla,no-es-email,clave-4,1\n'
+            'dario,dario@example.com,clave-5,true\n',
+            'csv'
+        )
+        # Por lote: una consulta de existentes y el INSERT (con su savepoint)
+        with self.assertNumQueries(8):
+            resultado = aprovisionar(registros, lote=2)
+
+        self.assertEqual(resultado['creados'], 3)
+        self.assertEqual([error['fila'] for error in resultado['errores']], [3, 4, 5])
+        self.assertTrue(User.objects.get(username='ana').check_password('clave-1'))
+        beto = User.objects.get(username='beto')
+        self.assertFalse(beto.is_active)
+        self.assertFalse(beto.has_usable_password())
+
+    def importar(self, registros, client=None):
+        return (client or self.client).post(reverse('importar_usuarios'), registros, content_type='application/json')
+
+    def test_endpoint_rechaza_a_quien_no_es_staff(self):
+        registros = [{'username': 'ana', 'email': 'ana@example.com', 'password': 'clave-1'}]
+        self.assertEqual(self.importar(registros).status_code, 401)
+
+        self.client.force_login(User.objects.get(username='existente'))
+        self.assertEqual(self.importar(registros).status_code, 403)
+        self.assertFalse(User.objects.filter(username='ana').exists())
+
+    def test_endpoint_staff_con_csrf(self):
+        staff = User.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        registros = [
+            {'username': 'ana', 'email': 'ana@example.com', 'password': 'clave-1'},
+            {'username': 'existente', 'email': 'x@example.com'},
+        ]
+
+        # La sesión exige el token CSRF
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(staff)
+        self.assertEqual(self.importar(registros, client).status_code, 403)
+        client.cookies['csrftoken'] = 'a' * 32
+        respuesta = client.post(
+            reverse('importar_usuarios'), registros, content_type='application/json', HTTP_X_CSRFTOKEN='a' * 32
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['creados'], 1)
+        self.assertEqual(len(respuesta.json()['errores']), 1)
+
+        self.client.force_login(staff)
+        demasiados = [{'username': f'u{i}', 'email': f'u{i}@example.com'} for i in range(MAX_USUARIOS_POR_PETICION + 1)]
+        self.assertEqual(self.importar(demasiados).status_code, 413)
+
+    def test_comando_desde_json(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'usuarios.json')
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                json.dump([{'username': f'u{i}', 'email': f'u{i}@example.com'} for i in range(5)], archivo)
+            salida = io.StringIO()
+            call_command('importar_usuarios', ruta, stdout=salida)
+        self.assertIn('5 usuarios creados', salida.getvalue())
+        self.assertEqual(User.objects.count(), 6)
@@ -1,8 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from apps.security.views.usuario import usuario
 
+# Bajo ASGI (settings.ASYNC_VIEWS) el alta usa la variante asíncrona
+CreateUserView = usuario.CreateUserViewAsync if settings.ASYNC_VIEWS else usuario.CreateUserView
+
 urlpatterns = []
 
 urlpatterns += [
-    path('crear_usuario/', usuario.CreateUserView, name='crear_usuario')
+    path('crear_usuario/', CreateUserView, name='crear_usuario'),
+    path('importar_usuarios/', usuario.ImportarUsuariosView, name='importar_usuarios'),  # Alta masiva (staff) desde CSV o JSON
 ]
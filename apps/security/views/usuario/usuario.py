@@ -1,24 +1,90 @@
 from apps.security.models import User
+from apps.security.services.aprovisionamiento import aprovisionar, leer_registros
+from apps.security.services.contrasenas import ahashear, hashear
+from apps.security.decorators import async_csrf_exempt, solo_staff
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login
+from django.db import IntegrityError
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
 
+CAMPOS_OBLIGATORIOS = ['username', 'email', 'password']
+# Cada contraseña cuesta cientos de milisegundos de CPU: las altas más grandes
+# van por el comando importar_usuarios
+MAX_USUARIOS_POR_PETICION = 100
+
+
+def leer_usuario(request):
+    # Convierte los datos JSON en un diccionario Python
+    data = json.loads(request.body)
+    faltantes = [campo for campo in CAMPOS_OBLIGATORIOS if not data.get(campo)]
+    if faltantes:
+        raise ValueError(f'Los campos {", ".join(faltantes)} son obligatorios')
+    return data
+
+
+def nuevo_usuario(data, password):
+    return User(
+        username=data['username'],
+        email=User.objects.normalize_email(data['email']),
+        password=password,
+        is_active=data.get('isActive', True)
+    )
+
+
 @csrf_exempt
 def CreateUserView(request):
     if request.method == 'POST':
-        # Convierte los datos JSON en un diccionario Python
-        data = json.loads(request.body)
-        
-        user = User.objects.create(
-            username=data['username'],
-            email=data['email'],
-            password=data['password'],
-            is_active=data["isActive"]
-        )
-        user.save()
+        try:
+            data = leer_usuario(request)
+            # El hash se calcula en el pool de procesos, no en el hilo de la petición
+            nuevo_usuario(data, hashear(data['password'])).save()
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Formato JSON inválido'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except IntegrityError:
+            return JsonResponse({'error': 'Ya existe un usuario con ese username, email o cédula'}, status=400)
         return JsonResponse({'message': 'Usuario creado correctamente'}, status=201)
 
     # Si la solicitud no es de tipo POST, devuelve un error de método no permitido
     return JsonResponse({'error': 'Método no permitido'}, status=405)
 
+
+@async_csrf_exempt
+async def CreateUserViewAsync(request):
+    if request.method == 'POST':
+        try:
+            data = leer_usuario(request)
+            usuario = nuevo_usuario(data, await ahashear(data['password']))
+            await sync_to_async(usuario.save)()
+        except json.JSONDecodeError:
+            return JsonResponse({'error': 'Formato JSON inválido'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        except IntegrityError:
+            return JsonResponse({'error': 'Ya existe un usuario con ese username, email o cédula'}, status=400)
+        return JsonResponse({'message': 'Usuario creado correctamente'}, status=201)
+
+    return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+
+# Sin csrf_exempt: con la sesión del staff el token CSRF es obligatorio
+@solo_staff
+def ImportarUsuariosView(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    formato = 'csv' if request.content_type == 'text/csv' else 'json'
+    try:
+        registros = leer_registros(request.body, formato)
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'error': f'Contenido {formato} inválido: {e}'}, status=400)
+    if len(registros) > MAX_USUARIOS_POR_PETICION:
+        return JsonResponse({
+            'error': f'La importación supera el máximo de {MAX_USUARIOS_POR_PETICION} usuarios; use el comando importar_usuarios'
+        }, status=413)
+
+    resultado = aprovisionar(registros)
+    return JsonResponse(resultado, status=201 if resultado['creados'] else 200)
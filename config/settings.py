@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +55,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir la latencia de toda la cadena
+    'apps.reservation.middleware.MetricasMiddleware',
+    'apps.reservation.middleware.IdPeticionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -84,6 +88,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# config/asgi.py lo activa: bajo ASGI las rutas usan las variantes asíncronas de las vistas
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
@@ -92,7 +99,132 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Base de pruebas en archivo: las pruebas concurrentes necesitan bloqueos reales de SQLite
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Perfil de producción (DJANGO_DB_PROFILE=produccion): WAL y PRAGMAs al abrir la
+# conexión (apps.reservation.db), conexiones persistentes y una conexión de
+# réplica para las vistas de lectura. La réplica es por defecto el mismo archivo:
+# con WAL los lectores no esperan al escritor. DJANGO_DB_REPLICA puede apuntar a
+# una copia replicada (p. ej. con Litestream o LiteFS)
+if os.environ.get('DJANGO_DB_PROFILE') == 'produccion':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        # Espera del módulo sqlite3 ante un bloqueo, en segundos
+        'OPTIONS': {'timeout': 20},
+    })
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DJANGO_DB_REPLICA', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['apps.reservation.db.ReplicaRouter']
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 20000,
+        'mmap_size': 268435456,
+        # Negativo: tamaño en KiB (64 MiB)
+        'cache_size': -65536,
+        'temp_store': 'MEMORY',
     }
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# La caché 'ocupacion' guarda la instantánea de sensor/list/ y las versiones que
+# firman los ETag de sensor/list/ y reservacion/list/ (y el índice de
+# sensor/available/). Con varios workers debe ser compartida: con LocMemCache un
+# cambio en un proceso no mueve las versiones de los demás y sus clientes reciben
+# 304 vencidos. manage.py check --deploy avisa (reservation.W001). Por ejemplo:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache' / 'ocupacion',
+# o 'django.core.cache.backends.db.DatabaseCache' (python manage.py createcachetable)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'ocupacion': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'ocupacion',
+    },
+}
+
+# Con varios procesos (gunicorn, uvicorn --workers) cada uno vuelca sus métricas
+# a este directorio y /metrics las suma; sin él cada proceso expone solo las suyas
+METRICAS_DIR = os.environ.get('DJANGO_METRICAS_DIR') or None
+
+# Reportes de sensores en diferido (sensor/report/): se conserva el último estado
+# por sensor y un hilo lo escribe como mucho cada ANTIGUEDAD_MAXIMA segundos.
+# CAPACIDAD limita los sensores pendientes; al llenarse el reporte se aplica en línea
+SENSOR_WRITE_BEHIND = {
+    'ANTIGUEDAD_MAXIMA': float(os.environ.get('DJANGO_SENSOR_ANTIGUEDAD_MAXIMA', 2)),
+    'CAPACIDAD': int(os.environ.get('DJANGO_SENSOR_CAPACIDAD_BUFFER', 10000)),
+}
+
+# Procesos para hashear contraseñas fuera del hilo de la petición
+# (apps.security.services.contrasenas); 0 las calcula en el mismo proceso.
+# Cada worker web tiene su propio pool: conviene un número pequeño
+CONTRASENAS_PROCESOS = int(os.environ.get('DJANGO_CONTRASENAS_PROCESOS', 2))
+
+# Tarifas por ubicación (apps.reservation.services.tarifas): bandas de hora local
+# (inicio, fin, centavos por hora) que cubren el día, cobro por fracciones
+# iniciadas de fraccion_minutos y un mínimo en centavos. '*' aplica al resto
+TARIFAS = {
+    '*': {
+        'bandas': [(0, 7, 500), (7, 22, 1000), (22, 24, 500)],
+        'fraccion_minutos': 15,
+        'minimo': 1000,
+    },
+}
+
+# Expiración de reservaciones abandonadas (apps.reservation.services.expiracion).
+# El barrido corre con "manage.py expirar_reservaciones --intervalo N" o, con
+# DJANGO_EXPIRACION_HILO=1, en un hilo de cada proceso web: con varios workers es
+# preferible el comando, los barridos simultáneos solo compiten por el bloqueo
+RESERVACION_EXPIRACION = {
+    'TTL_MINUTOS': int(os.environ.get('DJANGO_RESERVACION_TTL_MINUTOS', 120)),
+    'LOTE': 500,
+    'INTERVALO': float(os.environ.get('DJANGO_EXPIRACION_INTERVALO', 60)),
+    'HILO': os.environ.get('DJANGO_EXPIRACION_HILO') == '1',
+}
+
+
+# Registro en JSON a través de una cola (apps.reservation.logs): las peticiones
+# solo encolan y un hilo aparte formatea y escribe. Los reportes de sensores se
+# muestrean con DJANGO_LOG_MUESTREO_SENSORES (fracción de registros INFO/DEBUG)
+LOG_LEVEL = os.environ.get('DJANGO_LOG_LEVEL', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'id_peticion': {'()': 'apps.reservation.logs.IdPeticionFilter'},
+        'muestreo_sensores': {
+            '()': 'apps.reservation.logs.MuestreoFilter',
+            'tasa': float(os.environ.get('DJANGO_LOG_MUESTREO_SENSORES', 0.1)),
+        },
+    },
+    'handlers': {
+        'cola': {
+            '()': 'apps.reservation.logs.ColaHandler',
+            'archivo': os.environ.get('DJANGO_LOG_ARCHIVO') or None,
+            'filters': ['id_peticion'],
+        },
+    },
+    'loggers': {
+        'apps.reservation': {'handlers': ['cola'], 'level': LOG_LEVEL, 'propagate': False},
+        'apps.security': {'handlers': ['cola'], 'level': LOG_LEVEL, 'propagate': False},
+        'apps.reservation.views.sensor': {'filters': ['muestreo_sensores']},
+        'apps.reservation.services.sensor': {'filters': ['muestreo_sensores']},
+    },
 }
 
 
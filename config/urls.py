@@ -17,8 +17,11 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from apps.reservation.views.metricas import metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('apps.security.urls')),
-    path('api/', include('apps.reservation.urls'))
+    path('api/', include('apps.reservation.urls')),
+    path('metrics', metrics, name='metrics'),
 ]